@@ -0,0 +1,106 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from glypnirO.common import GlypnirO
+from glypnirO.synthetic import write_dataset
+
+
+def time_pipeline(component_list, trust_byonic=False, **kwargs):
+    """
+    Run ingestion, process, analyze and analyze_components on a component list and time every step.
+    :return: dictionary of step name to seconds, plus the memory in bytes held by the processed component data and by
+    the result sheets
+    """
+    timings = {}
+    a = GlypnirO(trust_byonic=trust_byonic, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in a.add_batch_component(component_list, 0):
+            pass
+        timings["ingestion"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        a.process_components()
+        timings["process"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _, r in a.components.iterrows():
+            r["component"].analyze()
+        timings["analyze"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = a.analyze_components()
+        for sheet in result:
+            result[sheet]
+        timings["analyze_components"] = time.perf_counter() - start
+    timings["components"] = len(a.components.index)
+    timings["component_memory"] = int(sum(r["component"].data.memory_usage(deep=True).sum()
+                                          for _, r in a.components.iterrows()))
+    timings["result_memory"] = int(sum(result[sheet].memory_usage(deep=True).sum() +
+                                       result[sheet].index.memory_usage(deep=True) for sheet in result))
+    return timings
+
+
+def run_benchmarks(psms=(1000,), runs=(1,), trust_modes=(False, True), directory=None, seed=0, analysis="O-glycan",
+                   callback=None, dtype_modes=(False,), **kwargs):
+    """
+    Time the pipeline on synthetic datasets for every combination of scale and trust mode.
+
+    :param psms: PSMs per run for each benchmarked scale
+    :param runs: number of runs for each benchmarked scale
+    :param directory: where the generated datasets are written, a temporary directory when not given
+    :param callback: called with every result row as soon as it is measured
+    :param dtype_modes: compact_dtypes settings to compare
+    :return: list of result rows
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as temporary:
+        if directory is None:
+            directory = temporary
+        for p in psms:
+            for n in runs:
+                start = time.perf_counter()
+                component_list = write_dataset(os.path.join(directory, "{}_{}".format(p, n)), p, n, seed=seed,
+                                               analysis=analysis)
+                generation = time.perf_counter() - start
+                for trust_byonic in trust_modes:
+                    for compact_dtypes in dtype_modes:
+                        row = {"psms": p, "runs": n, "trust_byonic": trust_byonic, "compact_dtypes": compact_dtypes,
+                               "generation": generation}
+                        row.update(time_pipeline(component_list, trust_byonic, compact_dtypes=compact_dtypes,
+                                                 **kwargs))
+                        results.append(row)
+                        if callback:
+                            callback(row)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the GlypnirO pipeline on synthetic Byonic data.")
+    parser.add_argument("--psms", type=int, nargs="+", default=[1000], help="PSMs per run")
+    parser.add_argument("--runs", type=int, nargs="+", default=[1], help="number of runs")
+    parser.add_argument("--trust-byonic", choices=["both", "yes", "no"], default="both")
+    parser.add_argument("--analysis", choices=["O-glycan", "N-glycan"], default="O-glycan")
+    parser.add_argument("--directory", help="keep the generated datasets in this directory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare-dtypes", action="store_true",
+                        help="run every benchmark with and without compact dtypes")
+    parser.add_argument("--output", help="write the results as json to this file")
+    args = parser.parse_args(argv)
+    trust_modes = {"both": (False, True), "yes": (True,), "no": (False,)}[args.trust_byonic]
+    dtype_modes = (False, True) if args.compare_dtypes else (False,)
+    results = run_benchmarks(args.psms, args.runs, trust_modes, args.directory, args.seed, args.analysis,
+                             callback=lambda row: print(json.dumps(row)), dtype_modes=dtype_modes)
+    if args.output:
+        with open(args.output, "wt") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
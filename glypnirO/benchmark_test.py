@@ -0,0 +1,22 @@
+import unittest
+
+from glypnirO.benchmark import run_benchmarks
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def test_run_benchmarks(self):
+        results = run_benchmarks(psms=(200,), runs=(2,))
+        self.assertEqual([r["trust_byonic"] for r in results], [False, True])
+        for r in results:
+            for step in ("ingestion", "process", "analyze", "analyze_components"):
+                self.assertGreater(r[step], 0)
+            self.assertGreater(r["components"], 0)
+
+    def test_dtype_comparison(self):
+        results = run_benchmarks(psms=(200,), runs=(1,), trust_modes=(False,), dtype_modes=(False, True))
+        self.assertEqual([r["compact_dtypes"] for r in results], [False, True])
+        self.assertLess(results[1]["component_memory"], results[0]["component_memory"])
+
+
+if __name__ == '__main__':
+    unittest.main()
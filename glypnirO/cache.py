@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+
+class ComponentCache:
+    """
+    Content addressed on-disk store for ingested and processed GlypnirOComponent objects and their analysis Result.
+    Keys are digests of the input file contents and of every parameter that changes the stored value, so a changed
+    input or parameter simply maps to a new entry and stale entries are never served.
+    """
+    version = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.file_digests = {}
+        self.hits = 0
+        self.misses = 0
+
+    def file_digest(self, filename, block_size=1 << 20):
+        stat = os.stat(filename)
+        signature = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+        if signature not in self.file_digests:
+            digest = hashlib.sha256()
+            with open(filename, "rb") as f:
+                for block in iter(lambda: f.read(block_size), b""):
+                    digest.update(block)
+            self.file_digests[signature] = digest.hexdigest()
+        return self.file_digests[signature]
+
+    def source_digest(self, *sources):
+        """
+        Digest of the contents of the given input files or DataFrames.
+        """
+        digests = []
+        for source in sources:
+            if type(source) == pd.DataFrame:
+                digest = hashlib.sha256(pd.util.hash_pandas_object(source, index=True).values.tobytes())
+                digest.update(json.dumps([str(c) for c in source.columns]).encode())
+                digests.append(digest.hexdigest())
+            else:
+                digests.append(self.file_digest(source))
+        return self.key(*digests)
+
+    def key(self, *parts):
+        return hashlib.sha256(json.dumps([self.version] + list(parts), default=str).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pkl")
+
+    def get(self, key):
+        path = self.path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
@@ -0,0 +1,239 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from glypnirO.common import GlypnirOComponent, ProteinIndex, protein_column_name, component_columns, \
+    spectra_columns, filter_spectra, detect_format
+
+
+def read_chunks(filename, chunk_size=50000, sheet_name="Spectra", columns=None):
+    """
+    Stream a Byonic export as DataFrames of at most chunk_size rows. xlsx files are iterated with a read-only
+    openpyxl workbook, parquet files by record batch and csv and tab separated files with pandas chunked reading.
+    :param columns: only keep these columns, all of them when not given
+    """
+    file_format = detect_format(filename)
+    if file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input requires pyarrow to be installed.")
+        parquet = pq.ParquetFile(filename)
+        names = parquet.schema_arrow.names
+        if columns is not None:
+            names = [c for c in names if c in columns]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=names):
+            yield batch.to_pandas()
+    elif file_format == "xlsx":
+        workbook = load_workbook(filename, read_only=True, data_only=True)
+        try:
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            kept = [i for i, c in enumerate(header) if columns is None or c in columns]
+            header = [header[i] for i in kept]
+            chunk = []
+            for row in rows:
+                if all(v is None for v in row):
+                    continue
+                chunk.append([row[i] for i in kept])
+                if len(chunk) == chunk_size:
+                    yield pd.DataFrame(chunk, columns=header)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header)
+        finally:
+            workbook.close()
+    else:
+        sep = "," if file_format == "csv" else "\t"
+        usecols = None
+        if columns is not None:
+            usecols = lambda c: c in columns
+        for chunk in pd.read_csv(filename, sep=sep, chunksize=chunk_size, usecols=usecols):
+            yield chunk
+
+
+class PartitionStore:
+    """
+    Per-protein partitions of filtered rows spilled to disk. Each partition is a file of pickled DataFrame chunks
+    appended in reading order, in a new directory removed by close or once the store is garbage collected.
+
+    :param directory: parent of the partition directory, the system temporary directory when not given
+    """
+    def __init__(self, directory=None):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="glypnirO_partitions_", dir=directory)
+        self.paths = {}
+        self.rows = {}
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, ignore_errors=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(str(key).encode("utf-8")).hexdigest() + ".pkl")
+
+    def append(self, key, frame):
+        if key not in self.paths:
+            self.paths[key] = self.path(key)
+            if os.path.exists(self.paths[key]):
+                os.remove(self.paths[key])
+            self.rows[key] = 0
+        with open(self.paths[key], "ab") as f:
+            pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows[key] += len(frame.index)
+
+    def write(self, key, frame):
+        """
+        Replace the content of a partition with frame.
+        """
+        if key in self.paths:
+            os.remove(self.paths[key])
+            del self.paths[key]
+        self.append(key, frame)
+
+    def read(self, key):
+        frames = []
+        with open(self.paths[key], "rb") as f:
+            while True:
+                try:
+                    frames.append(pickle.load(f))
+                except EOFError:
+                    break
+        return pd.concat(frames)
+
+    def keys(self):
+        return sorted(self.paths)
+
+    def close(self):
+        self._finalizer()
+        self.paths = {}
+        self.rows = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PartitionComponent(GlypnirOComponent):
+    """
+    Component whose rows stay in a PartitionStore partition. The partition is read when the data is first used and
+    release writes it back and drops it, so only the components being worked on are held in memory. Copies and
+    pickles are plain GlypnirOComponent objects holding the data.
+    """
+    def __init__(self, store, key, replicate_id, condition_id, protein_name, trust_byonic=False, legacy=False):
+        self.store = store
+        self.key = key
+        self._set_data(None, replicate_id, condition_id, protein_name, trust_byonic, legacy)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self.store.read(self.key)
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def rows(self):
+        if self._data is None:
+            return self.store.rows[self.key]
+        return len(self._data.index)
+
+    def release(self):
+        if self._data is not None:
+            self.store.write(self.key, self._data)
+            self._data = None
+
+    def compact(self):
+        loaded = self.loaded
+        GlypnirOComponent.compact(self)
+        if not loaded:
+            self.release()
+
+    def shipping_copy(self):
+        component = PartitionComponent.__new__(PartitionComponent)
+        component.__dict__.update(self.__dict__)
+        component.pickle_columns = component_columns
+        return component
+
+    def __reduce__(self):
+        state = self.__dict__.copy()
+        for name in ("store", "key", "_data"):
+            del state[name]
+        data = self._data
+        if data is None:
+            data = self.store.read(self.key)
+        if self.pickle_columns is not None:
+            data = data[[c for c in data.columns if c in self.pickle_columns or str(c).endswith("_position")]]
+        state["data"] = data
+        return GlypnirOComponent.__new__, (GlypnirOComponent,), state
+
+
+def spill_partitions(filename, scan_index, store, minimum_score=0, combine_uniprot_isoform=True,
+                     chunk_size=50000, columns=None):
+    """
+    Read a Byonic export chunk by chunk, join each chunk to the area tables through scan_index, apply the area, score,
+    decoy and contaminant filters and append the remaining rows to their protein partition in store.
+
+    :param columns: columns kept in the partitions, the columns used by process and analyze when not given
+    :return: number of rows read and the [accession, protein name] pairs for the protein annotation table
+    """
+    if columns is None:
+        columns = component_columns
+    protein_list = []
+    seen = set()
+    offset = 0
+    rows = 0
+    for chunk in read_chunks(filename, chunk_size, columns=spectra_columns):
+        rows += len(chunk.index)
+        if combine_uniprot_isoform:
+            for accession, header in ProteinIndex(chunk[protein_column_name]).accession_pairs():
+                if (accession, header) not in seen:
+                    seen.add((accession, header))
+                    protein_list.append([accession, header])
+        chunk = filter_spectra(chunk, minimum_score)
+        chunk["Scan number"] = pd.to_numeric(chunk["Scan #"].str.extract(r"scan=(\d+)", expand=False))
+        merged = scan_index.join(chunk)
+        merged.index = pd.RangeIndex(offset, offset + len(merged.index))
+        offset += len(merged.index)
+        merged = merged[merged["Area"].notnull()]
+        if combine_uniprot_isoform:
+            merged["protein_id"] = ProteinIndex(merged[protein_column_name]).master_ids()
+        else:
+            merged["protein_id"] = merged[protein_column_name]
+        for protein_id, g in merged.groupby("protein_id"):
+            store.append(protein_id, g[[c for c in g.columns if c in columns]])
+    return rows, protein_list
+
+
+def load_chunked_components(r, scan_index, minimum_score=0, trust_byonic=False, legacy=False,
+                            combine_uniprot_isoform=True, chunk_size=50000, spill_directory=None, columns=None):
+    """
+    Build the components of one manifest row through spill_partitions. The partitions stay on disk as
+    PartitionComponent objects, which are loaded one at a time by process_components and analyze_components and
+    removed once the components are garbage collected.
+    :return: component dictionaries, protein list and number of rows read
+    """
+    components = []
+    store = PartitionStore(spill_directory)
+    rows, protein_list = spill_partitions(r["filename"], scan_index, store, minimum_score,
+                                          combine_uniprot_isoform, chunk_size, columns)
+    for u in store.keys():
+        comp = PartitionComponent(store, u, r["replicate_id"], r["condition_id"], u, trust_byonic, legacy)
+        components.append({"filename": r["filename"], "area_filename": r["area_filename"],
+                           "condition_id": r["condition_id"], "replicate_id": r["replicate_id"], "Protein": u,
+                           "component": comp})
+    return components, protein_list, rows
@@ -0,0 +1,79 @@
+import contextlib
+import gc
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from glypnirO.chunked import PartitionComponent, PartitionStore, read_chunks
+from glypnirO.common import GlypnirO, GlypnirOComponent
+from glypnirO.equivalence import EquivalenceHarness, pipeline_engine
+from glypnirO.synthetic import write_dataset
+
+
+class ChunkedIngestionCase(unittest.TestCase):
+    def test_read_chunks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_dataset(directory, psms=250, runs=1)
+            chunks = list(read_chunks(job[0]["filename"], chunk_size=100))
+        self.assertEqual([len(c.index) for c in chunks], [100, 100, 50])
+        self.assertIn("Scan #", chunks[0].columns)
+
+    def test_matches_in_memory_ingestion(self):
+        for trust_byonic in (False, True):
+            harness = EquivalenceHarness(
+                pipeline_engine(trust_byonic=trust_byonic, batch_options={"chunk_size": 97}),
+                trust_byonic=trust_byonic)
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = harness.run_synthetic(psms=600, runs=2)
+            self.assertTrue(report.equivalent, report)
+
+    def test_partitions_are_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = PartitionStore(os.path.join(directory, "spill"))
+            with store:
+                store.append("P1", pd.DataFrame({"Area": [1.0]}))
+                store.append("P1", pd.DataFrame({"Area": [2.0]}))
+                self.assertEqual(list(store.read("P1")["Area"]), [1.0, 2.0])
+                self.assertEqual(store.keys(), ["P1"])
+            self.assertEqual(os.listdir(os.path.join(directory, "spill")), [])
+
+    def test_one_partition_loaded_at_a_time(self):
+        loaded = []
+
+        def count_loaded(method):
+            def wrapped(component, *args, **kwargs):
+                result = method(component, *args, **kwargs)
+                loaded.append(sum(c.loaded for c in components))
+                return result
+            return wrapped
+
+        with tempfile.TemporaryDirectory() as directory:
+            spill = os.path.join(directory, "spill")
+            job = write_dataset(directory, psms=300, runs=2)
+            a = GlypnirO()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in a.add_batch_component(job, 0, chunk_size=97, spill_directory=spill):
+                    pass
+                components = list(a.components["component"])
+                self.assertTrue(all(type(c) == PartitionComponent for c in components))
+                self.assertFalse(any(c.loaded for c in components))
+                with mock.patch.object(GlypnirOComponent, "process", count_loaded(GlypnirOComponent.process)), \
+                        mock.patch.object(GlypnirOComponent, "analyze", count_loaded(GlypnirOComponent.analyze)):
+                    a.process_components()
+                    result = a.analyze_components()
+                    self.assertFalse(result["Occupancy"].empty)
+            self.assertEqual(len(loaded), 2 * len(components))
+            self.assertEqual(set(loaded), {1})
+            self.assertFalse(any(c.loaded for c in components))
+            self.assertEqual(len(os.listdir(spill)), 2)
+            del a, result, components
+            gc.collect()
+            self.assertEqual(os.listdir(spill), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
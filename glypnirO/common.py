@@ -1,11 +1,23 @@
 from io import StringIO
-from copy import deepcopy
+from collections.abc import ItemsView, KeysView, ValuesView
+import csv
+import os
+from copy import copy, deepcopy
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import re
-
-from glypnirO_GUI.get_uniprot import UniprotParser
-from sequal.sequence import Sequence
+import threading
+
+from glypnirO.cache import ComponentCache
+from glypnirO.instrumentation import Instrumentation
+from glypnirO.mass_index import GlycanMassIndex
+from glypnirO.progress import ProgressTracker, CancellationToken
+from glypnirO.scan_index import ScanIndex, comment_column, spectrum_file_column
+from glypnirO.shared import process_shared
+from glypnirO_GUI.get_uniprot import UniprotParser, UniprotCache, UniprotIndex, UniprotLocalParser
+from sequal.glycan import composition_regex as glycan_regex, tolerance_units
+from sequal.sequence import parse_sequence, parse_cache
 from sequal.resources import glycan_block_dict
 
 sequence_column_name = "Peptide\n< ProteinMetrics Confidential >"
@@ -16,13 +28,26 @@ observed_mz = "Calc.\nmass (M+H)"
 protein_column_name = "Protein Name"
 rt = "Scan Time"
 selected_aa = {"N", "S", "T"}
+processed_columns = {glycans_column_name, "stripped_seq", "origin_start", "Ending Position", "position_to_glycan",
+                     "glycoprofile", "glycosylation_status"}
+component_columns = {sequence_column_name, starting_position_column_name, protein_column_name, observed_mz, "z", "Area",
+                     "Score"} | processed_columns
+spectra_columns = {sequence_column_name, glycans_column_name, starting_position_column_name, modifications_column_name,
+                   observed_mz, protein_column_name, rt, "Scan #", "Score", "z", comment_column}
+area_columns = {"First Scan", "Area", spectrum_file_column}
+contaminant_suffix = "(Common contaminant protein)"
+format_extensions = {".xlsx": "xlsx", ".xlsm": "xlsx", ".csv": "csv", ".tsv": "tsv", ".txt": "tsv", ".tab": "tsv",
+                     ".parquet": "parquet", ".pq": "parquet"}
+categorical_columns = [protein_column_name, sequence_column_name, "stripped_seq", "position_to_glycan", "glycoprofile"]
+integer_columns = ["z", "Scan number", "First Scan", starting_position_column_name]
+summary_categorical_columns = ["Protein", "Protein names", "Label", "condition_id", "replicate_id", "Glycans",
+                               "Peptides", "Position", "Glycosylated positions in peptide"]
 
 regex_glycan_number_pattern = "\d+"
 glycan_number_regex = re.compile(regex_glycan_number_pattern)
 regex_pattern = "\.[\[\]\w\.\+\-]*\."
 sequence_regex = re.compile(regex_pattern)
 uniprot_regex = re.compile("(?P<accession>[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9]([A-Z][A-Z0-9]{2}[0-9]){1,2})(?P<isoform>-\d)?")
-glycan_regex = re.compile("(\w+)\((\d+)\)")
 
 
 def filter_U_only(df):
@@ -51,6 +76,234 @@ def get_mod_value(amino_acid):
         return 0
 
 
+def detect_format(filename):
+    """
+    Format of a table file, xlsx, csv, tsv or parquet, from its extension or, for unknown extensions, from its magic
+    bytes and a sniff of the delimiter.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in format_extensions:
+        return format_extensions[extension]
+    with open(filename, "rb") as f:
+        head = f.read(65536)
+    if head.startswith(b"PK\x03\x04"):
+        return "xlsx"
+    if head.startswith(b"PAR1"):
+        return "parquet"
+    text = head.decode("utf-8", errors="ignore")
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=",\t").delimiter
+    except csv.Error:
+        delimiter = "," if text.count(",") > text.count("\t") else "\t"
+    return "csv" if delimiter == "," else "tsv"
+
+
+def read_table(filename, columns=None, sheet_name=0):
+    """
+    Read an xlsx, csv, tab separated or parquet table, parsing only the given columns.
+    :param columns: columns to read, all of them when not given
+    :param sheet_name: sheet read from xlsx files
+    """
+    file_format = detect_format(filename)
+    usecols = None
+    if columns is not None:
+        usecols = lambda c: c in columns
+    if file_format == "xlsx":
+        return pd.read_excel(filename, sheet_name=sheet_name, usecols=usecols)
+    if file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input requires pyarrow to be installed.")
+        names = pq.read_schema(filename).names
+        if columns is not None:
+            names = [c for c in names if c in columns]
+        return pd.read_parquet(filename, columns=names).reset_index(drop=True)
+    return pd.read_csv(filename, sep="," if file_format == "csv" else "\t", usecols=usecols)
+
+
+def read_spectra(filename, columns=None):
+    """
+    Read the Spectra table of a Byonic export, the Spectra sheet of an xlsx file or a csv, tab separated or parquet
+    export of it, parsing only the columns used by the pipeline.
+    :param columns: columns to read, spectra_columns when not given
+    """
+    if columns is None:
+        columns = spectra_columns
+    return read_table(filename, columns, "Spectra")
+
+
+def area_filenames(area_filename):
+    """
+    Area files of a manifest entry, several files of a multi-fraction search are separated by semicolons. Paths and
+    DataFrames are a single area table.
+    """
+    if not isinstance(area_filename, str):
+        return [area_filename]
+    return [f.strip() for f in area_filename.split(";") if f.strip()]
+
+
+def read_area(area_filename, columns=None):
+    """
+    Read an area file, parsing only the columns used by the pipeline.
+    :param columns: columns to read, area_columns when not given
+    """
+    if columns is None:
+        columns = area_columns
+    return read_table(area_filename, columns)
+
+
+def filter_spectra(data, minimum_score=None, decoy=True, contaminant=True):
+    """
+    Drop PSMs below minimum_score, decoy PSMs and contaminant PSMs, so they never reach the merge with the area table.
+    """
+    mask = pd.Series(True, index=data.index)
+    if minimum_score is not None:
+        mask &= data["Score"] >= minimum_score
+    if decoy:
+        mask &= ~data[protein_column_name].str.contains(">Reverse")
+    if contaminant:
+        mask &= ~data[protein_column_name].str.endswith(contaminant_suffix)
+    return data[mask]
+
+
+class ProteinIndex:
+    """
+    Dictionary encoded protein column with the row positions of every protein name, so the rows of a protein are
+    selected by header or UniProt accession lookup instead of matching every row.
+    """
+    def __init__(self, proteins):
+        """
+        :param proteins: protein name column, rows are addressed by position
+        """
+        self.codes, headers = pd.factorize(proteins)
+        self.headers = list(headers)
+        counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.headers))
+        order = np.argsort(self.codes, kind="stable")
+        self.order = order[len(order) - counts.sum():]
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.by_header = {}
+        self.by_accession = {}
+        self.accessions = []
+        self.isoforms = []
+        for code, header in enumerate(self.headers):
+            self.by_header.setdefault(header.lstrip(">"), []).append(code)
+            search = uniprot_regex.search(header)
+            accession = None
+            isoform = 1
+            if search:
+                groups = search.groupdict(default="")
+                accession = groups["accession"]
+                self.by_accession.setdefault(accession, []).append(code)
+                if groups["isoform"]:
+                    isoform = int(groups["isoform"][1:])
+                    self.by_accession.setdefault(accession + groups["isoform"], []).append(code)
+            self.accessions.append(accession)
+            self.isoforms.append(isoform)
+
+    def match(self, protein_name):
+        """
+        Codes of the headers matching protein_name: the header itself, with or without the leading >, else the
+        headers carrying it as UniProt accession, else the headers containing it as literal text.
+        """
+        name = protein_name.lstrip(">")
+        if name in self.by_header:
+            return self.by_header[name]
+        if protein_name in self.by_accession:
+            return self.by_accession[protein_name]
+        return [code for code, header in enumerate(self.headers) if protein_name in header]
+
+    def rows(self, protein_name):
+        """
+        Positions of the rows of protein_name, in row order.
+        """
+        rows = [self.order[self.offsets[c]:self.offsets[c + 1]] for c in self.match(protein_name)]
+        if not rows:
+            return np.array([], dtype=np.int64)
+        return np.sort(np.concatenate(rows))
+
+    def select(self, data, protein_name):
+        """
+        Rows of protein_name from data, the frame the index was built from.
+        """
+        return data.iloc[self.rows(protein_name)]
+
+    def master_ids(self):
+        """
+        Protein id of every row, the UniProt accession without isoform, or the header for decoys, contaminants and
+        headers without accession.
+        """
+        ids = []
+        for header, accession in zip(self.headers, self.accessions):
+            if accession is None or header.startswith(">Reverse") or header.endswith(contaminant_suffix):
+                ids.append(header)
+            else:
+                ids.append(accession)
+        return self._per_row(ids)
+
+    def isoform_numbers(self):
+        return self._per_row(self.isoforms)
+
+    def _per_row(self, values):
+        values = np.array(values + [np.nan], dtype=object)
+        return values[self.codes]
+
+    def accession_pairs(self):
+        """
+        [accession, header] of every target header with a UniProt accession, in order of first occurrence.
+        """
+        return [[accession, header] for header, accession in zip(self.headers, self.accessions)
+                if accession is not None and not header.startswith(">Reverse") and
+                not header.endswith(contaminant_suffix)]
+
+
+def compact_frame(df, categorical=(), integer=()):
+    """
+    Convert the given string columns of df to categoricals, dropping unused categories of columns that already are,
+    and downcast the given integer columns to the smallest integer type holding their values.
+    """
+    for c in categorical:
+        if c in df.columns:
+            if isinstance(df[c].dtype, pd.CategoricalDtype):
+                df[c] = df[c].cat.remove_unused_categories()
+            elif df[c].dtype == object:
+                df[c] = df[c].astype("category")
+    for c in integer:
+        if c in df.columns and df[c].dtype.kind in "iu":
+            df[c] = pd.to_numeric(df[c], downcast="integer")
+    return df
+
+
+def parallel_map(function, items, workers, chunk_size=None, progress=None):
+    """
+    Apply function to every item in a process pool, sending items to the workers in chunks and returning the results
+    in input order.
+    :param progress: ProgressTracker advanced for every result, pending items are dropped when it raises
+    """
+    if chunk_size is None:
+        chunk_size = max(1, len(items) // (workers * 4))
+    results = []
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for result in executor.map(function, items, chunksize=chunk_size):
+            results.append(result)
+            if progress is not None:
+                progress.advance()
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return results
+
+
+def process_component(component):
+    component.process()
+    return component
+
+
+def analyze_component(args):
+    component, max_sites, combine_d_u, splitting_sites = args
+    return component.analyze(max_sites, combine_d_u, splitting_sites)
+
+
 def load_fasta(fasta_file_path, selected=None, selected_prefix=""):
     with open(fasta_file_path, "rt") as fasta_file:
         result = {}
@@ -111,31 +364,42 @@ class Result:
 
 
 class GlypnirOComponent:
+    mass_tolerance = None
+    tolerance_unit = "ppm"
+
     def __init__(self, filename, area_filename, replicate_id, condition_id, protein_name, minimum_score=0, trust_byonic=False, legacy=False):
         if type(filename) == pd.DataFrame:
             data = filename.copy()
         else:
-            data = pd.read_excel(filename, sheet_name="Spectra")
-        if type(area_filename) == pd.DataFrame:
-            file_with_area = area_filename
+            data = read_spectra(filename)
+        if isinstance(area_filename, ScanIndex):
+            scan_index = area_filename
+        elif type(area_filename) == pd.DataFrame:
+            scan_index = ScanIndex([area_filename])
         else:
-            if area_filename.endswith("xlsx"):
-                file_with_area = pd.read_excel(area_filename)
-            else:
-                file_with_area = pd.read_csv(area_filename, sep="\t")
-        data["Scan number"] = pd.to_numeric(data["Scan #"].str.extract("scan=(\d+)", expand=False))
-        data = pd.merge(data, file_with_area, left_on="Scan number", right_on="First Scan")
+            scan_index = ScanIndex([read_area(f) for f in area_filenames(area_filename)])
+        data = filter_spectra(data, minimum_score, contaminant=False)
+        data = ProteinIndex(data[protein_column_name]).select(data, protein_name)
+        data["Scan number"] = pd.to_numeric(data["Scan #"].str.extract(r"scan=(\d+)", expand=False))
+        data = scan_index.join(data)
+        self._set_data(data[data["Area"].notnull()], replicate_id, condition_id, protein_name, trust_byonic, legacy)
+
+    @classmethod
+    def from_filtered(cls, data, replicate_id, condition_id, protein_name, trust_byonic=False, legacy=False):
+        """
+        Create a component from rows already merged with their areas and filtered, e.g. a partition spilled by
+        chunked ingestion.
+        """
+        component = cls.__new__(cls)
+        component._set_data(data, replicate_id, condition_id, protein_name, trust_byonic, legacy)
+        return component
+
+    def _set_data(self, data, replicate_id, condition_id, protein_name, trust_byonic=False, legacy=False):
         self.protein_name = protein_name
-        self.data = data.sort_values(by=['Area'], ascending=False)
         self.replicate_id = replicate_id
         self.condition_id = condition_id
-        self.data = data[data["Area"].notnull()]
-        self.data = self.data[(self.data["Score"] >= minimum_score) &
-                         (self.data[protein_column_name].str.contains(protein_name))
-                         # (data["Protein Name"] == ">"+protein_name) &
-                         ]
-        self.data = self.data[~self.data[protein_column_name].str.contains(">Reverse")]
-        if len(self.data.index) > 0:
+        self.data = data
+        if self.rows() > 0:
             self.empty = False
         else:
             self.empty = True
@@ -146,6 +410,54 @@ class GlypnirOComponent:
         self.legacy = legacy
         self.sequon_glycosites = set()
         self.glycosylated_seq = set()
+        self.processed = False
+        self.cache_key = None
+        self.pickle_columns = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if state.get("pickle_columns") is not None:
+            state["data"] = self.data[[c for c in self.data.columns
+                                       if c in self.pickle_columns or str(c).endswith("_position")]]
+        return state
+
+    def rows(self):
+        return len(self.data.index)
+
+    def release(self):
+        """
+        Drop the data once the component is done with for now, a no-op for components held in memory.
+        """
+
+    def compact(self):
+        """
+        Store the repeated string columns as categoricals and downcast the integer columns. The glycan column is only
+        converted once the component is processed, as process rewrites it.
+        """
+        categorical = list(categorical_columns)
+        if self.processed:
+            categorical.append(glycans_column_name)
+        self.data = compact_frame(self.data, categorical, integer_columns)
+
+    def shipping_copy(self):
+        """
+        Shallow copy that only pickles the data columns used by process and analyze, for sending to worker processes.
+        """
+        component = copy(self)
+        component.pickle_columns = component_columns
+        return component
+
+    def update_from(self, component):
+        """
+        Apply the data columns and glycosite state of a component processed elsewhere, e.g. a worker's copy.
+        """
+        for c in component.data.columns:
+            self.data[c] = component.data[c]
+        self.sequon_glycosites = component.sequon_glycosites
+        self.glycosylated_seq = component.glycosylated_seq
+        self.row_to_glycans = component.row_to_glycans
+        self.glycan_to_row = component.glycan_to_row
+        self.processed = component.processed
 
     def calculate_glycan(self, glycan):
         current_mass = 0
@@ -161,6 +473,30 @@ class GlypnirOComponent:
                 current_string = ""
         return current_mass
 
+    def _assign_glycans(self):
+        """
+        Glycan of every modified residue whose mass is within mass_tolerance of one of the glycans of its row, as a
+        dictionary of (row, residue) to glycan.
+        """
+        rows = []
+        residues = []
+        masses = []
+        row_glycans = {}
+        for i, peptide, glycans in zip(self.data.index, self.data[sequence_column_name], self.data[glycans_column_name]):
+            search = sequence_regex.search(peptide)
+            if not search or pd.isnull(glycans):
+                continue
+            row_glycans[i] = glycans.split(",")
+            seq = parse_sequence(search.group(0))
+            for aa in range(1, len(seq) - 1):
+                if seq[aa].mods:
+                    rows.append(i)
+                    residues.append(aa)
+                    masses.append(float(seq[aa].mods[0].value))
+        index = GlycanMassIndex(g for glycans in row_glycans.values() for g in glycans)
+        assigned = index.assign(masses, rows, row_glycans, self.mass_tolerance, self.tolerance_unit)
+        return {(i, aa): g for i, aa, g in zip(rows, residues, assigned) if g is not None}
+
     def process(self):
         # entries_number = len(self.data.index)
         # if analysis == "N-glycan":
@@ -176,10 +512,13 @@ class GlypnirOComponent:
         #     self.data["total_number_of_modded_ser_thr"] = pd.Series([0]*entries_number, index=self.data.index, dtype=int)
         #     self.data["total_number_of_unmodded_ser_or_thr"] = pd.Series([0]*entries_number, index=self.data.index, dtype=int)
         #     self.data["o_glycosylation_status"] = pd.Series([False]*entries_number, index=self.data.index, dtype=bool)
+        assignments = None
+        if self.trust_byonic and self.mass_tolerance is not None:
+            assignments = self._assign_glycans()
         for i, r in self.data.iterrows():
             glycan_dict = {}
             search = sequence_regex.search(r[sequence_column_name])
-            seq = Sequence(search.group(0))
+            seq = parse_sequence(search.group(0))
             stripped_seq = seq.to_stripped_string()
             # modifications = {}
             # if pd.notnull(r[modifications_column_name]):
@@ -287,16 +626,18 @@ class GlypnirOComponent:
                                     # if modifications[str_mod_value][seq[aa].value]['number'] > 0:
                                     #     modifications[str_mod_value][seq[aa].value]['number'] -= 1
                                     #     seq[aa].mods[0].mass = mod_value
-                            round_3 = round(mod_value, 3)
-                            if str(round_3) in glycan_dict:
-                                seq[aa].extra = "Glycosylated"
+                            if assignments is None:
+                                glycan = glycan_dict.get(str(round(mod_value, 3)))
+                            else:
+                                glycan = assignments.get((i, aa))
+                            if glycan is not None:
                                 pos = int(r[starting_position_column_name]) + aa - 2
                                 self.sequon_glycosites.add(pos + 1)
                                 position = "{}_position".format(str(glycosylation_count))
                                 self.data.at[i, position] = seq[aa].value + str(pos + 1)
                                 glycosylated_site.append(self.data.at[i, position] + "_" + str(round_mod_value))
                                 glycosylation_count += 1
-                                glycan_reordered.append(glycan_dict[str(round_3)])
+                                glycan_reordered.append(glycan)
                     if glycan_reordered:
                         self.data.at[i, "position_to_glycan"] = ",".join(glycan_reordered)
                     self.data.at[i, "glycoprofile"] = ";".join(glycosylated_site)
@@ -397,10 +738,14 @@ class GlypnirOComponent:
                         self.data.at[i, glycans_column_name] = ",".join(glycans)
                         self.data.at[i, "glycosylation_status"] = True
                         self.glycosylated_seq.add(self.data.at[i, "stripped_seq"])
+        self.processed = True
 
     def analyze(self, max_sites=0, combine_d_u=True, splitting_sites=False):
         result = []
         temp = self.data.sort_values(["Area", "Score"], ascending=False)
+        if isinstance(temp[glycans_column_name].dtype, pd.CategoricalDtype) and \
+                "None" not in temp[glycans_column_name].cat.categories:
+            temp[glycans_column_name] = temp[glycans_column_name].cat.add_categories("None")
         temp[glycans_column_name] = temp[glycans_column_name].fillna("None")
         out = []
 
@@ -413,7 +758,7 @@ class GlypnirOComponent:
                 #     temp = temp[(0 < temp["total_number_of_n-linked_sequon"])]
                 # else:
                 #     temp = temp[(0 < temp["total_number_of_n-linked_sequon"]) & (temp["total_number_of_n-linked_sequon"]<= max_sites) ]
-            for i, g in temp.groupby(["stripped_seq", "z", "glycoprofile", observed_mz]):
+            for i, g in temp.groupby(["stripped_seq", "z", "glycoprofile", observed_mz], observed=True):
                 seq_within = []
                 unique_row = g.loc[g["Area"].idxmax()]
                 #
@@ -523,7 +868,8 @@ class GlypnirOComponent:
             # if max_sites != 0:
             #     temp = temp[temp['total_number_of_hex'] <= max_sites]
 
-            for i, g in temp.groupby(["stripped_seq", "z", glycans_column_name, starting_position_column_name, observed_mz]):
+            for i, g in temp.groupby(["stripped_seq", "z", glycans_column_name, starting_position_column_name, observed_mz],
+                                      observed=True):
                 unique_row = g.loc[g["Area"].idxmax()]
                 if unique_row[glycans_column_name] != "None":
                     result.append({"Peptides": i[0], "Glycans": i[2], "Value": unique_row["Area"], "Position": i[3]})
@@ -574,76 +920,362 @@ class GlypnirOComponent:
         return Result(out)
 
 
+class SummarySheets(dict):
+    """
+    Result sheets of GlypnirO.analyze_components, computed on first access and kept afterwards. The per component
+    summaries are concatenated and annotated with protein names once and shared by the sheets built from them,
+    Occupancy_Without_Proportion_U reuses the Glycoforms and Occupancy_With_U sheets. It is a dict, as returned
+    before the sheets became lazy, so sheets can still be assigned, updated or removed, and reading the values
+    through items, values, get, copy or dict() computes them.
+    """
+    sheet_names = ["Glycoforms", "Occupancy", "Occupancy_With_U", "Occupancy_Without_Proportion_U"]
+
+    def __init__(self, glypnir, occupancy, glycoform):
+        """
+        :param glypnir: GlypnirO instance that produced the summaries
+        :param occupancy: per component summaries with U counted in the proportions
+        :param glycoform: per component summaries without U in the proportions
+        """
+        super().__init__()
+        self.names = list(self.sheet_names)
+        self.glypnir = glypnir
+        self.summaries = {"occupancy": occupancy, "glycoform": glycoform}
+        # the sheets are built with the settings and protein names at the time of the analysis, not of the access
+        self.trust_byonic = glypnir.trust_byonic
+        self.compact_dtypes = glypnir.compact_dtypes
+        proteins = [s["Protein"] for s in occupancy + glycoform]
+        self.uniprot_data = glypnir._uniprot_annotations(pd.unique(pd.concat(proteins)) if proteins else [])
+        self.intermediates = {}
+
+    def _intermediate(self, name):
+        if name not in self.intermediates:
+            self.intermediates[name] = self.glypnir._summary_data(self.summaries[name], self.uniprot_data,
+                                                                  self.compact_dtypes)
+        return self.intermediates[name]
+
+    def _compute(self, sheet):
+        a = self.glypnir
+        if sheet == "Glycoforms":
+            return a._summary_frame(self._intermediate("glycoform"), trust_byonic=self.trust_byonic,
+                                    compact_dtypes=self.compact_dtypes)
+        if sheet == "Occupancy":
+            return a._summary_frame(self._intermediate("occupancy"), trust_byonic=self.trust_byonic,
+                                    compact_dtypes=self.compact_dtypes)
+        if sheet == "Occupancy_With_U":
+            return a._summary_frame(self._intermediate("occupancy"), filter_with_U, True, self.trust_byonic,
+                                    self.compact_dtypes)
+        return a._occupancy_without_proportion_u(self["Glycoforms"], self["Occupancy_With_U"], self.trust_byonic,
+                                                 self.compact_dtypes)
+
+    def __getitem__(self, sheet):
+        if sheet not in self.names:
+            raise KeyError(sheet)
+        if not dict.__contains__(self, sheet):
+            with self.glypnir.instrumentation.stage("summary", sheet=sheet):
+                dict.__setitem__(self, sheet, self._compute(sheet))
+        return dict.__getitem__(self, sheet)
+
+    def __setitem__(self, sheet, value):
+        if sheet not in self.names:
+            self.names.append(sheet)
+        dict.__setitem__(self, sheet, value)
+
+    def __delitem__(self, sheet):
+        if sheet not in self.names:
+            raise KeyError(sheet)
+        self.names.remove(sheet)
+        if dict.__contains__(self, sheet):
+            dict.__delitem__(self, sheet)
+
+    def __contains__(self, sheet):
+        return sheet in self.names
+
+    def __iter__(self):
+        return iter(list(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return "SummarySheets({}, computed={})".format(self.names, self.computed())
+
+    def __eq__(self, other):
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __reduce__(self):
+        return dict, (self.to_dict(),)
+
+    def keys(self):
+        return KeysView(self)
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+    def get(self, sheet, default=None):
+        if sheet in self.names:
+            return self[sheet]
+        return default
+
+    def update(self, *args, **kwargs):
+        for sheet, value in dict(*args, **kwargs).items():
+            self[sheet] = value
+
+    def setdefault(self, sheet, default=None):
+        if sheet not in self.names:
+            self[sheet] = default
+        return self[sheet]
+
+    def pop(self, sheet, *default):
+        if sheet not in self.names:
+            if default:
+                return default[0]
+            raise KeyError(sheet)
+        value = self[sheet]
+        del self[sheet]
+        return value
+
+    def popitem(self):
+        if not self.names:
+            raise KeyError("popitem(): SummarySheets is empty")
+        sheet = self.names[-1]
+        return sheet, self.pop(sheet)
+
+    def clear(self):
+        self.names.clear()
+        dict.clear(self)
+
+    def copy(self):
+        return self.to_dict()
+
+    def computed(self):
+        """
+        Names of the sheets computed so far.
+        """
+        return [sheet for sheet in self.names if dict.__contains__(self, sheet)]
+
+    def to_dict(self):
+        """
+        Compute every sheet and return them as a plain dictionary.
+        """
+        return {sheet: self[sheet] for sheet in self.names}
+
+
 class GlypnirO:
-    def __init__(self, trust_byonic=False, get_uniprot=False):
+    def __init__(self, trust_byonic=False, get_uniprot=False, uniprot_cache=None, uniprot_index=None, cache=None,
+                 instrumentation=None, compact_dtypes=False, progress_callback=None, cancellation_token=None,
+                 mass_tolerance=None, tolerance_unit="ppm"):
+        """
+        :param compact_dtypes: keep the repeated string columns of the components and summary tables as categoricals
+        and downcast integer columns
+        :param progress_callback: callable or list of callables receiving a progress event for every finished
+        component of the ingestion, process and analyze stages
+        :param cancellation_token: CancellationToken stopping the analysis with AnalysisCancelled between components
+        :param mass_tolerance: assign glycans to modified residues within this tolerance of the glycan masses when
+        trusting Byonic, instead of matching the masses rounded to 3 decimals exactly
+        :param tolerance_unit: ppm or da
+        """
         self.trust_byonic = trust_byonic
+        self.compact_dtypes = compact_dtypes
+        if tolerance_unit.lower() not in tolerance_units:
+            raise ValueError("Tolerance unit {} is not one of ppm or da.".format(tolerance_unit))
+        self.mass_tolerance = mass_tolerance
+        self.tolerance_unit = tolerance_unit
         self.components = None
         self.uniprot_parsed_data = pd.DataFrame([])
-        self.get_uniprot = get_uniprot
+        if type(uniprot_cache) == str:
+            uniprot_cache = UniprotCache(uniprot_cache)
+        self.uniprot_cache = uniprot_cache
+        if type(uniprot_index) == str:
+            uniprot_index = UniprotIndex(uniprot_index)
+        self.uniprot_index = uniprot_index
+        self.get_uniprot = get_uniprot or uniprot_index is not None
+        if type(cache) == str:
+            cache = ComponentCache(cache)
+        self.cache = cache
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        self.instrumentation = instrumentation
+        self.scan_indexes = {}
+        self._scan_index_lock = threading.Lock()
+        if progress_callback is None:
+            progress_callback = []
+        elif callable(progress_callback):
+            progress_callback = [progress_callback]
+        self.progress_callbacks = progress_callback
+        if cancellation_token is None:
+            cancellation_token = CancellationToken()
+        self.cancellation_token = cancellation_token
+
+    def cancel(self):
+        """
+        Stop the running analysis at the next component, it raises AnalysisCancelled.
+        """
+        self.cancellation_token.cancel()
+
+    def _tolerance_key(self):
+        if self.mass_tolerance is None:
+            return ()
+        return self.mass_tolerance, self.tolerance_unit.lower()
+
+    def configure(self, component):
+        """
+        Apply the glycan assignment settings to a component before it is processed.
+        """
+        component.mass_tolerance = self.mass_tolerance
+        component.tolerance_unit = self.tolerance_unit
+        return component
+
+    def _progress(self, stage, total):
+        return ProgressTracker(stage, total, self.progress_callbacks, self.cancellation_token)
 
     def add_component(self, filename, area_filename, replicate_id, sample_id):
         component = GlypnirOComponent(filename, area_filename, replicate_id, sample_id)
 
-    def add_batch_component(self, component_list, minimum_score, protein=None, combine_uniprot_isoform=True, legacy=False):
+    def add_batch_component(self, component_list, minimum_score, protein=None, combine_uniprot_isoform=True, legacy=False,
+                            chunk_size=None, spill_directory=None):
+        """
+        :param chunk_size: stream the Spectra tables in chunks of this many rows, spilling the filtered rows of each
+        protein to disk instead of loading whole files, only used when protein is not given
+        :param spill_directory: directory for the spilled partitions, a temporary directory when not given
+        """
         self.load_dataframe(component_list)
         protein_list = []
+        progress = self._progress("ingestion", len(self.components.index))
         if protein is not None:
             self.components["Protein"] = pd.Series([protein]*len(self.components.index), index=self.components.index)
             for i, r in self.components.iterrows():
-                comp = GlypnirOComponent(r["filename"], r["area_filename"], r["replicate_id"], condition_id=r["condition_id"], protein_name=protein, minimum_score=minimum_score, trust_byonic=self.trust_byonic, legacy=legacy)
+                comp = None
+                if self.cache is not None:
+                    key = self.cache.key("component", self.cache.source_digest(r["filename"], *area_filenames(r["area_filename"])),
+                                         protein, minimum_score, self.trust_byonic, legacy, *self._tolerance_key())
+                    comp = self.cache.get(key)
+                if comp is not None:
+                    comp.replicate_id = r["replicate_id"]
+                    comp.condition_id = r["condition_id"]
+                else:
+                    with self.instrumentation.stage("ingestion", **self._component_fields(r)) as stage:
+                        comp = GlypnirOComponent(r["filename"], self.scan_index(r["area_filename"]), r["replicate_id"], condition_id=r["condition_id"], protein_name=protein, minimum_score=minimum_score, trust_byonic=self.trust_byonic, legacy=legacy)
+                        stage["rows"] = len(comp.data.index)
+                    if self.cache is not None:
+                        comp.cache_key = key
+                        self.cache.set(key, comp)
+                if self.compact_dtypes:
+                    comp.compact()
                 self.components.at[i, "component"] = comp
                 print("{} - {}, {} peptides has been successfully loaded".format(r["condition_id"], r["replicate_id"], str(len(comp.data.index))))
+                progress.advance(self._component_fields(r), len(comp.data.index))
 
         else:
             components = []
             for i, r in self.components.iterrows():
-                data = pd.read_excel(r["filename"], sheet_name="Spectra")
-                protein_id_column = protein_column_name
-                if combine_uniprot_isoform:
-                    protein_id_column = "master_id"
-                    for i2, r2 in data.iterrows():
-                        search = uniprot_regex.search(r2[protein_column_name])
-                        if not r2[protein_column_name].startswith(">Reverse") and not r2[protein_column_name].endswith("(Common contaminant protein)"):
-                            if search:
-                                data.at[i2, "master_id"] = search.groupdict(default="")["accession"]
-                                if not self.get_uniprot:
-                                    protein_list.append([search.groupdict(default="")["accession"], r2[protein_column_name]])
-                                if search.groupdict(default="")["isoform"] != "":
-                                    data.at[i2, "isoform"] = int(search.groupdict(default="")["isoform"][1:])
-                                else:
-                                    data.at[i2, "isoform"] = 1
-
-                            else:
-                                data.at[i2, "master_id"] = r2[protein_column_name]
-                                data.at[i2, "isoform"] = 1
-                        else:
-                            data.at[i2, "master_id"] = r2[protein_column_name]
-                            data.at[i2, "isoform"] = 1
-
-                if r["area_filename"].endswith("xlsx"):
-                    file_with_area = pd.read_excel(r["area_filename"])
-                else:
-                    file_with_area = pd.read_csv(r["area_filename"], sep="\t")
-
-                for index, g in data.groupby([protein_id_column]):
-
-                    u = index
-                    if not u.startswith(">Reverse") and not u.endswith("(Common contaminant protein)"):
-                        comp = GlypnirOComponent(g, file_with_area, r["replicate_id"],
-                                                 condition_id=r["condition_id"], protein_name=u,
-                                                 minimum_score=minimum_score, trust_byonic=self.trust_byonic, legacy=legacy)
-                        if not comp.empty:
-                            components.append({"filename": r["filename"], "area_filename": r["area_filename"], "condition_id": r["condition_id"], "replicate_id": r["replicate_id"], "Protein": u, "component": comp})
+                loaded = None
+                if self.cache is not None:
+                    source_key = self.cache.key("source", self.cache.source_digest(r["filename"], *area_filenames(r["area_filename"])),
+                                                minimum_score, self.trust_byonic, legacy, combine_uniprot_isoform,
+                                                *self._tolerance_key())
+                    loaded = self._load_cached_components(r, source_key)
+                if loaded is None:
+                    loaded = self._load_components(r, minimum_score, combine_uniprot_isoform, legacy, chunk_size,
+                                                   spill_directory)
+                    if self.cache is not None:
+                        for c in loaded[0]:
+                            c["component"].cache_key = self.cache.key(source_key, c["Protein"])
+                            self.cache.set(c["component"].cache_key, c["component"])
+                        self.cache.set(source_key, {"proteins": [c["Protein"] for c in loaded[0]],
+                                                    "protein_list": loaded[1]})
+                components += loaded[0]
+                if not self.get_uniprot:
+                    protein_list += loaded[1]
+                progress.advance({"condition_id": r["condition_id"], "replicate_id": r["replicate_id"]},
+                                 sum(c["component"].rows() for c in loaded[0]))
                 yield i, r
                 print(
                     "{} - {} peptides has been successfully loaded".format(r["condition_id"],
                                                                                       r["replicate_id"]))
             self.components = pd.DataFrame(components, columns=list(self.components.columns) + ["component", "Protein"])
+            if self.compact_dtypes:
+                for comp in self.components["component"]:
+                    comp.compact()
             if not self.get_uniprot:
                 protein_df = pd.DataFrame(protein_list, columns=["Entry", "Protein names"])
                 self.uniprot_parsed_data = protein_df
                 #print(self.uniprot_parsed_data)
 
+    def _load_components(self, r, minimum_score, combine_uniprot_isoform=True, legacy=False, chunk_size=None,
+                         spill_directory=None):
+        components = []
+        protein_list = []
+        if chunk_size:
+            from glypnirO.chunked import load_chunked_components
+            with self.instrumentation.stage("ingestion", filename=r["filename"], area_filename=r["area_filename"],
+                                            chunk_size=chunk_size) as stage:
+                components, protein_list, stage["rows"] = load_chunked_components(
+                    r, self.scan_index(r["area_filename"]), minimum_score, self.trust_byonic, legacy,
+                    combine_uniprot_isoform, chunk_size, spill_directory)
+            return components, protein_list
+        with self.instrumentation.stage("ingestion", filename=r["filename"], area_filename=r["area_filename"]) as stage:
+            data = read_spectra(r["filename"])
+            scan_index = self.scan_index(r["area_filename"])
+            stage["rows"] = len(data.index)
+        data = filter_spectra(data)
+        protein_id_column = protein_column_name
+        if combine_uniprot_isoform:
+            protein_id_column = "master_id"
+            protein_index = ProteinIndex(data[protein_column_name])
+            data["master_id"] = protein_index.master_ids()
+            data["isoform"] = pd.to_numeric(protein_index.isoform_numbers())
+            protein_list = protein_index.accession_pairs()
+
+        data = filter_spectra(data, minimum_score, decoy=False, contaminant=False)
+        data["Scan number"] = pd.to_numeric(data["Scan #"].str.extract(r"scan=(\d+)", expand=False))
+        with self.instrumentation.stage("merge", condition_id=r["condition_id"], replicate_id=r["replicate_id"]) \
+                as stage:
+            data = scan_index.join(data)
+            data = data[data["Area"].notnull()]
+            stage["rows"] = len(data.index)
+        for index, g in data.groupby([protein_id_column]):
+
+            u = index
+            if not u.startswith(">Reverse") and not u.endswith("(Common contaminant protein)"):
+                comp = GlypnirOComponent.from_filtered(g, r["replicate_id"], r["condition_id"], u, self.trust_byonic,
+                                                       legacy)
+                if not comp.empty:
+                    components.append({"filename": r["filename"], "area_filename": r["area_filename"], "condition_id": r["condition_id"], "replicate_id": r["replicate_id"], "Protein": u, "component": comp})
+        return components, protein_list
+
+    def _load_cached_components(self, r, source_key):
+        cached = self.cache.get(source_key)
+        if cached is None:
+            return None
+        components = []
+        for u in cached["proteins"]:
+            comp = self.cache.get(self.cache.key(source_key, u))
+            if comp is None:
+                return None
+            comp.replicate_id = r["replicate_id"]
+            comp.condition_id = r["condition_id"]
+            components.append({"filename": r["filename"], "area_filename": r["area_filename"], "condition_id": r["condition_id"], "replicate_id": r["replicate_id"], "Protein": u, "component": comp})
+        return components, cached["protein_list"]
+
+    def scan_index(self, area_filename):
+        """
+        ScanIndex over the area files of a manifest entry, built once and shared by every row using the same files,
+        also when rows are read from several threads.
+        """
+        key = tuple(area_filenames(area_filename))
+        if any(type(f) == pd.DataFrame for f in key):
+            return ScanIndex([f if type(f) == pd.DataFrame else read_area(f) for f in key])
+        with self._scan_index_lock:
+            if key not in self.scan_indexes:
+                self.scan_indexes[key] = ScanIndex([read_area(f) for f in key])
+            return self.scan_indexes[key]
+
     def load_dataframe(self, component_list):
         if type(component_list) == list:
             self.components = pd.DataFrame(component_list)
@@ -661,12 +1293,56 @@ class GlypnirO:
         else:
             raise ValueError("Input have to be list, pandas dataframe, or csv, xlsx, or tabulated txt filepath.")
 
-    def process_components(self):
+    def process_components(self, workers=None, chunk_size=None, shared=False):
+        """
+        :param workers: number of worker processes, components are processed serially when not given
+        :param chunk_size: number of components sent to a worker at a time
+        :param shared: place the component data in shared memory and only send each worker its row ranges
+        """
+        if workers and workers > 1:
+            pending = [self.configure(r["component"]) for i, r in self.components.iterrows()
+                       if not r["component"].processed]
+            progress = self._progress("process", len(pending))
+            with self.instrumentation.stage("process", components=len(pending), workers=workers) as stage:
+                if shared:
+                    process_shared(pending, workers, chunk_size, component_columns, processed_columns, progress)
+                else:
+                    processed = parallel_map(process_component, [c.shipping_copy() for c in pending], workers,
+                                             chunk_size, progress)
+                    for component, result in zip(pending, processed):
+                        component.update_from(result)
+                for component in pending:
+                    if self.compact_dtypes:
+                        component.compact()
+                    if self.cache is not None and component.cache_key is not None:
+                        self.cache.set(component.cache_key, component)
+                    component.release()
+                stage["rows"] = sum(c.rows() for c in pending)
+            return
+        progress = self._progress("process", sum(not c.processed for c in self.components["component"]))
         for i, r in self.components.iterrows():
             # print("Processing {} - {} {} for {}".format(r["condition_id"], r["replicate_id"], r["Protein"], analysis))
-            r["component"].process()
-
-    def analyze_components(self):
+            if not r["component"].processed:
+                with self.instrumentation.stage("process", **self._component_fields(r)) as stage:
+                    parses = parse_cache.stats()
+                    self.configure(r["component"]).process()
+                    if self.compact_dtypes:
+                        r["component"].compact()
+                    stage["rows"] = r["component"].rows()
+                    stage["parse_hits"] = parse_cache.hits - parses["hits"]
+                    stage["parse_misses"] = parse_cache.misses - parses["misses"]
+                if self.cache is not None and r["component"].cache_key is not None:
+                    self.cache.set(r["component"].cache_key, r["component"])
+                r["component"].release()
+                progress.advance(self._component_fields(r), r["component"].rows())
+
+    def analyze_components(self, workers=None, chunk_size=None, analysis_results=None):
+        """
+        :param workers: number of worker processes analyzing the components, serial when not given
+        :param chunk_size: number of components sent to a worker at a time
+        :param analysis_results: Result of every component row computed beforehand, e.g. by the asyncio pipeline
+        :return: SummarySheets mapping sheet names to DataFrames, each sheet is computed when first accessed
+        """
         # template = self.components[["Protein", "condition_id", "replicate_id"]].sort_values(["Protein", "condition_id", "replicate_id"])
         # template["label"] = pd.Series(["Raw"]*len(template.index), index=template.index)
         # template_proportion = template.copy()
@@ -676,36 +1352,65 @@ class GlypnirO:
         result = []
         result_without_u = []
         result_occupancy_no_calculation_u = []
-        for i, r in self.components.iterrows():
+        if analysis_results is None and workers and workers > 1:
+            analysis_results = self._analyze_parallel(workers, chunk_size)
+        progress = None
+        if analysis_results is None:
+            progress = self._progress("analyze", len(self.components.index))
+        for n, (i, r) in enumerate(self.components.iterrows()):
             print("Analyzing", r["Protein"], r["condition_id"], r["replicate_id"], r["component"].protein_name)
-            analysis_result = r["component"].analyze()
+            if analysis_results is not None:
+                self.cancellation_token.check()
+                analysis_result = analysis_results[n]
+            else:
+                with self.instrumentation.stage("analyze", **self._component_fields(r)) as stage:
+                    analysis_result = self._analyze_component(r["component"])
+                    r["component"].release()
+                    stage["rows"] = len(analysis_result.df.index)
+                progress.advance(self._component_fields(r), len(analysis_result.df.index))
             if not analysis_result.empty:
+                with self.instrumentation.stage("proportion", **self._component_fields(r)):
+                    pro = analysis_result.calculate_proportion()
+                    pro_without_u = analysis_result.calculate_proportion(occupancy=False)
 
-                a = analysis_result.to_summary(name="Raw", trust_byonic=self.trust_byonic)
-                pro = analysis_result.calculate_proportion()
-                b = analysis_result.to_summary(pro, "Proportion", trust_byonic=self.trust_byonic)
-                temp_df = self._summary(a, r, b)
-                result.append(temp_df)
+                with self.instrumentation.stage("summary", **self._component_fields(r)):
+                    a = analysis_result.to_summary(name="Raw", trust_byonic=self.trust_byonic)
+                    b = analysis_result.to_summary(pro, "Proportion", trust_byonic=self.trust_byonic)
+                    temp_df = self._summary(a, r, b)
+                    result.append(temp_df)
 
-                a_without_u = analysis_result.to_summary(name="Raw", trust_byonic=self.trust_byonic, occupancy=False)
-                pro_without_u = analysis_result.calculate_proportion(occupancy=False)
-                b_without_u = analysis_result.to_summary(pro_without_u, "Proportion", trust_byonic=self.trust_byonic, occupancy=False)
-                temp_df_without_u = self._summary(a_without_u, r, b_without_u)
-                result_without_u.append(temp_df_without_u)
+                    a_without_u = analysis_result.to_summary(name="Raw", trust_byonic=self.trust_byonic, occupancy=False)
+                    b_without_u = analysis_result.to_summary(pro_without_u, "Proportion", trust_byonic=self.trust_byonic, occupancy=False)
+                    temp_df_without_u = self._summary(a_without_u, r, b_without_u)
+                    result_without_u.append(temp_df_without_u)
 
-                temp_df_no_calculation_u = self._summary(a, r, b_without_u)
-                result_occupancy_no_calculation_u.append(temp_df_no_calculation_u)
-
-        result_occupancy = self._summary_format(result)
-        result_occupancy_with_u = self._summary_format(result, filter_with_U, True)
-        result_glycoform = self._summary_format(result_without_u)
+                    temp_df_no_calculation_u = self._summary(a, r, b_without_u)
+                    result_occupancy_no_calculation_u.append(temp_df_no_calculation_u)
 
+        # result = result.stack("Protein")
+        # result = result.swaplevel("Protein", "Peptides")
+        # result = result.swaplevel("Glycans", "Peptides")
+        print("Finished analysis.")
+        return SummarySheets(self, result, result_without_u)
+
+    def _occupancy_without_proportion_u(self, result_glycoform, result_occupancy_with_u, trust_byonic=None,
+                                        compact_dtypes=None):
+        """
+        :param trust_byonic: layout of the sheets, the current setting when not given
+        :param compact_dtypes: compact the combined sheet, the current setting when not given
+        """
+        if trust_byonic is None:
+            trust_byonic = self.trust_byonic
+        if compact_dtypes is None:
+            compact_dtypes = self.compact_dtypes
         tempdf_index_reset_result_occupancy_with_u = result_occupancy_with_u.reset_index()
         tempdf_index_reset_result_glycoform = result_glycoform.reset_index()
         result_occupancy_glycoform_sep = pd.concat(
             [tempdf_index_reset_result_glycoform, tempdf_index_reset_result_occupancy_with_u])
+        if compact_dtypes:
+            result_occupancy_glycoform_sep = compact_frame(result_occupancy_glycoform_sep, summary_categorical_columns)
 
-        if self.trust_byonic:
+        if trust_byonic:
             result_occupancy_glycoform_sep = result_occupancy_glycoform_sep.set_index(["Protein", "Protein names",
                                                                                        # "Isoform",
                                                                                        "Glycosylated positions in peptide", "Glycans"])
@@ -723,55 +1428,96 @@ class GlypnirO:
                 level=["Protein", "Protein names",
                        # "Isoform",
                        "Position peptide N-terminus", "Peptides"])
-
-        # result = result.stack("Protein")
-        # result = result.swaplevel("Protein", "Peptides")
-        # result = result.swaplevel("Glycans", "Peptides")
-        print("Finished analysis.")
-        return {"Glycoforms":
-                    result_glycoform,
-                "Occupancy":
-                    result_occupancy,
-                "Occupancy_With_U":
-                    result_occupancy_with_u,
-                "Occupancy_Without_Proportion_U":
-                    result_occupancy_glycoform_sep}
+        return result_occupancy_glycoform_sep
+
+    @staticmethod
+    def _component_fields(r):
+        return {"protein": r["Protein"], "condition_id": r["condition_id"], "replicate_id": r["replicate_id"]}
+
+    def _analysis_key(self, component, max_sites=0, combine_d_u=True, splitting_sites=False):
+        if self.cache is None or component.cache_key is None:
+            return None
+        return self.cache.key(component.cache_key, "analyze", max_sites, combine_d_u, splitting_sites)
+
+    def _analyze_component(self, component, max_sites=0, combine_d_u=True, splitting_sites=False):
+        key = self._analysis_key(component, max_sites, combine_d_u, splitting_sites)
+        if key is None:
+            return component.analyze(max_sites, combine_d_u, splitting_sites)
+        analysis_result = self.cache.get(key)
+        if analysis_result is None:
+            analysis_result = component.analyze(max_sites, combine_d_u, splitting_sites)
+            self.cache.set(key, analysis_result)
+        return analysis_result
+
+    def _analyze_parallel(self, workers, chunk_size=None, max_sites=0, combine_d_u=True, splitting_sites=False):
+        components = list(self.components["component"])
+        analysis_results = [None] * len(components)
+        pending = []
+        for n, component in enumerate(components):
+            key = self._analysis_key(component, max_sites, combine_d_u, splitting_sites)
+            if key is not None:
+                analysis_results[n] = self.cache.get(key)
+            if analysis_results[n] is None:
+                pending.append(n)
+        progress = self._progress("analyze", len(pending))
+        with self.instrumentation.stage("analyze", components=len(pending), workers=workers) as stage:
+            tasks = [(components[n].shipping_copy(), max_sites, combine_d_u, splitting_sites) for n in pending]
+            for n, analysis_result in zip(pending, parallel_map(analyze_component, tasks, workers, chunk_size,
+                                                                progress)):
+                analysis_results[n] = analysis_result
+                key = self._analysis_key(components[n], max_sites, combine_d_u, splitting_sites)
+                if key is not None:
+                    self.cache.set(key, analysis_result)
+            stage["rows"] = sum(len(analysis_results[n].df.index) for n in pending)
+        return analysis_results
 
     def _summary_format(self, result, filter_method=filter_U_only, select_for_u=False):
-        result_data = pd.concat(result)
-        result_data = result_data.reset_index(drop=True)
-        accessions = result_data["Protein"].unique()
-
+        result_data = self._summary_data(result, self._uniprot_annotations(pd.concat(result)["Protein"].unique()),
+                                         self.compact_dtypes)
+        return self._summary_frame(result_data, filter_method, select_for_u, self.trust_byonic, self.compact_dtypes)
+
+    def _uniprot_annotations(self, accessions):
+        """
+        Entry and Protein names of the proteins, fetched from UniProt when no annotations were loaded yet.
+        """
         if self.uniprot_parsed_data.empty:
             if self.get_uniprot:
-                parser = UniprotParser(accessions, True)
-
-                data = []
-                for i in parser.parse("tab"):
-                    frame = pd.read_csv(StringIO(i), sep="\t")
-                    frame = frame.rename(columns={frame.columns[-1]: "query"})
-                    data.append(frame)
-                self.uniprot_parsed_data = pd.concat(data, ignore_index=True)
+                with self.instrumentation.stage("uniprot", rows=len(accessions)):
+                    self.uniprot_parsed_data = self._fetch_uniprot(accessions)
                 #
                 self.uniprot_parsed_data = self.uniprot_parsed_data[['Entry', 'Protein names']]
         else:
             self.uniprot_parsed_data = self.uniprot_parsed_data.groupby(["Entry"]).head(1).reset_index().drop(["index"], axis=1)
+        return self.uniprot_parsed_data
 
-        result_data = result_data.merge(self.uniprot_parsed_data, left_on="Protein", right_on="Entry")
+    def _summary_data(self, result, uniprot_data, compact_dtypes=False):
+        """
+        :param uniprot_data: Entry and Protein names of the proteins in result
+        """
+        result_data = pd.concat(result)
+        result_data = result_data.reset_index(drop=True)
+        result_data = result_data.merge(uniprot_data, left_on="Protein", right_on="Entry")
         result_data.drop("Entry", 1, inplace=True)
+        if compact_dtypes:
+            result_data = compact_frame(result_data, summary_categorical_columns)
+        return result_data
 
-        if self.trust_byonic:
+    def _summary_frame(self, result_data, filter_method=filter_U_only, select_for_u=False, trust_byonic=False,
+                       compact_dtypes=False):
+        if trust_byonic:
             groups = result_data.groupby(by=["Protein", "Protein names",
                                              # "Isoform",
-                                             "Position"])
+                                             "Position"], observed=True)
         else:
             groups = result_data.groupby(by=["Protein", "Protein names",
                                              # "Isoform",
-                                             "Position", "Peptides"])
+                                             "Position", "Peptides"], observed=True)
         result_data = groups.filter(filter_method)
         if select_for_u:
             result_data = result_data[result_data["Glycans"] == "U"]
-        if self.trust_byonic:
+        if compact_dtypes:
+            result_data = compact_frame(result_data, summary_categorical_columns)
+        if trust_byonic:
             result_data = result_data.rename({"Position": "Glycosylated positions in peptide"}, axis="columns")
             result_data = result_data.set_index(
                 ["Label", "condition_id", "replicate_id", "Protein", "Protein names",
@@ -786,7 +1532,7 @@ class GlypnirO:
         result_data = result_data.unstack(["Label", "condition_id", "replicate_id"])
         result_data = result_data.sort_index(level=["Label", "condition_id", "replicate_id"], axis=1)
         #result_data.to_csv("test.txt", sep="\t")
-        if self.trust_byonic:
+        if trust_byonic:
             result_data = result_data.sort_index(level=["Protein", "Protein names",
                                                         # "Isoform",
                                                         "Glycosylated positions in peptide"])
@@ -798,6 +1544,41 @@ class GlypnirO:
         result_data.columns = result_data.columns.droplevel()
         return result_data
 
+    def _fetch_uniprot(self, accessions):
+        data = []
+        if self.uniprot_cache is not None:
+            cached = self.uniprot_cache.get(accessions)
+            records = [r for r in cached.values() if r is not None]
+            if records:
+                data.append(pd.DataFrame(records).drop_duplicates("Entry"))
+            missing = [a for a in accessions if a in cached and cached[a] is None]
+            if missing and self.uniprot_index is not None:
+                # the local dump names proteins it does not have after their accession
+                data.append(pd.DataFrame({"Entry": missing, "Protein names": missing}))
+            accessions = [a for a in accessions if a not in cached]
+        if len(accessions) > 0:
+            if self.uniprot_index is not None:
+                parser = UniprotLocalParser(accessions, True, self.uniprot_index)
+            else:
+                parser = UniprotParser(accessions, True)
+            returned = set()
+            for i in parser.parse("tab"):
+                frame = pd.read_csv(StringIO(i), sep="\t")
+                frame = frame.rename(columns={frame.columns[-1]: "query"})
+                if self.uniprot_cache is not None:
+                    # placeholder rows of accessions missing from a local dump are cached as negative entries
+                    found = frame[~frame["query"].isin(getattr(parser, "missing", ()))]
+                    self.uniprot_cache.update_frame(found)
+                    returned.update(found["Entry"].dropna().astype(str))
+                    for query in found["query"].dropna().astype(str):
+                        returned.update(a.strip() for a in query.split(","))
+                data.append(frame)
+            if self.uniprot_cache is not None:
+                self.uniprot_cache.update_missing([a for a in accessions if str(a) not in returned])
+        if not data:
+            return pd.DataFrame(columns=["Entry", "Protein names"])
+        return pd.concat(data, ignore_index=True)
+
     def _summary(self, a, r, b):
         temp_df = pd.concat([a, b], axis=1)
 
@@ -1,5 +1,16 @@
+import os
+import pathlib
+import pickle
+import tempfile
 import unittest
-from glypnirO.common import GlypnirOComponent, GlypnirO, load_fasta
+from unittest import mock
+from glypnirO.common import GlypnirOComponent, GlypnirO, load_fasta, sequence_column_name, glycans_column_name, \
+    starting_position_column_name, observed_mz, protein_column_name, read_spectra, read_area, filter_spectra, \
+    ProteinIndex
+from glypnirO.instrumentation import Instrumentation
+from glypnirO.progress import AnalysisCancelled, CancellationToken
+from glypnirO.synthetic import write_dataset
+from glypnirO_GUI.get_uniprot import UniprotCache
 import pandas as pd
 
 o_glycan_file = r"C:\Users\localadmin\PycharmProjects\glypnirO\Olink_10_20ppm_TN_CSF_062617_04_A_R2.raw_Byonic.xlsx"
@@ -61,6 +72,41 @@ job_N = [
     }
 ]
 
+apoe = ">sp|P02649|APOE_HUMAN Apolipoprotein E OS=Homo sapiens OX=9606 GN=APOE PE=1 SV=1"
+co3 = ">sp|P01024|CO3_HUMAN Complement C3 OS=Homo sapiens OX=9606 GN=C3 PE=1 SV=2"
+
+
+def write_small_job(directory, runs=(("R1", "A"), ("R2", "A"), ("R1", "H"))):
+    spectra = pd.DataFrame([
+        [1, "K.TES[+656.228]TPR.G", "HexNAc(1)Hex(1)NeuAc(1)", 10, apoe, 1000.0],
+        [2, "K.TESTPR.G", None, 10, apoe, 1000.0],
+        [3, "K.TEST[+365.132]PR.G", "HexNAc(1)Hex(1)", 10, apoe, 1100.0],
+        [4, "R.AN[+203.079]STK.L", "HexNAc(1)", 50, co3, 1000.0],
+        [5, "R.ANSTK.L", None, 50, co3, 1000.0],
+        [6, "R.ANSTK.L", None, 50, ">Reverse sp|P01024|CO3_HUMAN", 1000.0],
+    ], columns=["scan", sequence_column_name, glycans_column_name, starting_position_column_name,
+                protein_column_name, observed_mz])
+    spectra["Scan #"] = "controllerType=0 controllerNumber=1 scan=" + spectra["scan"].astype(str)
+    spectra["Score"] = 300.0
+    spectra["z"] = 2
+    spectra = spectra.drop(columns=["scan"])
+    area = pd.DataFrame({"First Scan": [1, 2, 3, 4, 5, 6], "Area": [10.0, 5.0, 3.0, 8.0, 2.0, 1.0]})
+    filename = os.path.join(directory, "spectra.xlsx")
+    area_filename = os.path.join(directory, "area.txt")
+    spectra.to_excel(filename, sheet_name="Spectra", index=False)
+    area.to_csv(area_filename, sep="\t", index=False)
+    return [{"filename": filename, "area_filename": area_filename, "replicate_id": r, "condition_id": c}
+            for r, c in runs]
+
+
+def run_small_job(job, trust_byonic=False, **kwargs):
+    a = GlypnirO(trust_byonic=trust_byonic, **kwargs)
+    for _ in a.add_batch_component(job, 0):
+        pass
+    a.process_components()
+    return a, a.analyze_components()
+
+
 class CommonTest(unittest.TestCase):
     def test_load_fasta(self):
         a = load_fasta(fasta_file)
@@ -112,5 +158,296 @@ class GlynirNCase(unittest.TestCase):
             result.to_excel(writer)
 
 
+class UniprotProviderCase(unittest.TestCase):
+    def test_cached_accessions_are_not_fetched(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = UniprotCache(os.path.join(directory, "uniprot.sqlite"))
+            cache.update([("P02649", {"Entry": "P02649", "Protein names": "Apolipoprotein E"})])
+            a = GlypnirO(get_uniprot=True, uniprot_cache=cache)
+            with mock.patch("glypnirO.common.UniprotParser") as parser:
+                data = a._fetch_uniprot(["P02649"])
+                parser.assert_not_called()
+            self.assertEqual(list(data["Protein names"]), ["Apolipoprotein E"])
+            cache.close()
+
+    def test_unknown_accessions_are_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = UniprotCache(os.path.join(directory, "uniprot.sqlite"))
+            a = GlypnirO(get_uniprot=True, uniprot_cache=cache)
+            response = "Entry\tProtein names\tyourlist\nP02649\tApolipoprotein E\tP02649\n"
+            with mock.patch("glypnirO.common.UniprotParser") as parser:
+                parser.return_value.parse.return_value = [response]
+                a._fetch_uniprot(["P02649", "P99999"])
+                self.assertEqual(parser.call_count, 1)
+                data = a._fetch_uniprot(["P02649", "P99999"])
+                self.assertEqual(parser.call_count, 1)
+            self.assertEqual(list(data["Entry"]), ["P02649"])
+            self.assertEqual(cache.missing(["P99999"]), [])
+            cache.close()
+
+    def test_local_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "uniprot.tab")
+            with open(path, "wt") as f:
+                f.write("Entry\tProtein names\nP02649\tApolipoprotein E\n")
+            a = GlypnirO(uniprot_index=path)
+            self.assertTrue(a.get_uniprot)
+            with mock.patch("glypnirO.common.UniprotParser") as parser:
+                data = a._fetch_uniprot(["P02649"])
+                parser.assert_not_called()
+            self.assertEqual(list(data["Protein names"]), ["Apolipoprotein E"])
+            data = a._fetch_uniprot(["P01024"])
+            self.assertEqual(list(data["Entry"]), ["P01024"])
+            self.assertEqual(list(data["Protein names"]), ["P01024"])
+            a.uniprot_index.close()
+        self.assertEqual(list(GlypnirO()._fetch_uniprot([]).columns), ["Entry", "Protein names"])
+
+    def test_local_index_missing_are_negative_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "uniprot.tab")
+            with open(path, "wt") as f:
+                f.write("Entry\tProtein names\nP02649\tApolipoprotein E\n")
+            cache = UniprotCache(os.path.join(directory, "uniprot.sqlite"))
+            a = GlypnirO(uniprot_index=path, uniprot_cache=cache)
+            data = a._fetch_uniprot(["P02649", "P01024"])
+            self.assertEqual(list(data["Protein names"]), ["Apolipoprotein E", "P01024"])
+            self.assertEqual(cache.get(["P02649", "P01024"])["P01024"], None)
+            with mock.patch("glypnirO.common.UniprotLocalParser") as parser:
+                data = a._fetch_uniprot(["P02649", "P01024"])
+                parser.assert_not_called()
+            self.assertEqual(list(data["Protein names"]), ["Apolipoprotein E", "P01024"])
+            a.uniprot_index.close()
+            cache.close()
+
+
+class ComponentCacheCase(unittest.TestCase):
+    def test_rerun_uses_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_small_job(directory)
+            cache_directory = os.path.join(directory, "cache")
+            for trust_byonic in (False, True):
+                _, expected = run_small_job(job, trust_byonic)
+                _, first = run_small_job(job, trust_byonic, cache=cache_directory)
+                with mock.patch("glypnirO.common.pd.read_excel") as read_excel, \
+                        mock.patch("glypnirO.common.GlypnirOComponent.process") as process, \
+                        mock.patch("glypnirO.common.GlypnirOComponent.analyze") as analyze:
+                    a, second = run_small_job(job, trust_byonic, cache=cache_directory)
+                    read_excel.assert_not_called()
+                    process.assert_not_called()
+                    analyze.assert_not_called()
+                for k in expected:
+                    pd.testing.assert_frame_equal(expected[k], first[k])
+                    pd.testing.assert_frame_equal(expected[k], second[k])
+
+    def test_new_run_is_the_only_one_computed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_small_job(directory)
+            cache_directory = os.path.join(directory, "cache")
+            run_small_job(job, cache=cache_directory)
+            new_directory = os.path.join(directory, "new")
+            os.makedirs(new_directory)
+            new_run = write_small_job(new_directory, runs=[("R3", "A")])
+            area = pd.read_csv(new_run[0]["area_filename"], sep="\t")
+            area["Area"] = area["Area"] * 2
+            area.to_csv(new_run[0]["area_filename"], sep="\t", index=False)
+            process = GlypnirOComponent.process
+            with mock.patch.object(GlypnirOComponent, "process", autospec=True, side_effect=process) as patched:
+                _, result = run_small_job(job + new_run, cache=cache_directory)
+                self.assertEqual(patched.call_count, 2)
+            self.assertIn("R3", result["Occupancy"].columns.get_level_values("replicate_id"))
+
+
+class ReadingCase(unittest.TestCase):
+    def test_read_only_used_columns(self):
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_dataset(directory, psms=100)
+            data = read_spectra(job[0]["filename"])
+            area = read_area(job[0]["area_filename"])
+        self.assertNotIn("Query #:z", data.columns)
+        self.assertIn("Scan #", data.columns)
+        self.assertEqual(set(area.columns), {"First Scan", "Area", "Spectrum File"})
+        filtered = filter_spectra(data, 100)
+        self.assertTrue((filtered["Score"] >= 100).all())
+        self.assertFalse(filtered[protein_column_name].str.contains("Reverse|contaminant").any())
+
+
+class ProteinIndexCase(unittest.TestCase):
+    def test_match(self):
+        proteins = pd.Series([apoe, co3, ">sp|P02649-2|APOE_HUMAN Isoform 2 of Apolipoprotein E (Fragment)", apoe,
+                              ">Protein (unknown) x|y", None])
+        index = ProteinIndex(proteins)
+        self.assertEqual(list(index.rows("P02649")), [0, 2, 3])
+        self.assertEqual(list(index.rows("P02649-2")), [2])
+        self.assertEqual(list(index.rows(apoe)), [0, 3])
+        self.assertEqual(list(index.rows("Protein (unknown) x|y")), [4])
+        self.assertEqual(list(index.rows("(unknown)")), [4])
+        self.assertEqual(list(index.rows("Q99999")), [])
+        self.assertEqual(list(index.master_ids()[:5]), ["P02649", "P01024", "P02649", "P02649",
+                                                        ">Protein (unknown) x|y"])
+        self.assertEqual(list(index.isoform_numbers()[:3]), [1, 1, 2])
+        self.assertEqual([a for a, _ in index.accession_pairs()], ["P02649", "P01024", "P02649"])
+
+
+class ParallelCase(unittest.TestCase):
+    def test_workers_match_serial(self):
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_small_job(directory)
+            for trust_byonic in (False, True):
+                _, expected = run_small_job(job, trust_byonic)
+                for shared in (False, True):
+                    a = GlypnirO(trust_byonic=trust_byonic)
+                    for _ in a.add_batch_component(job, 0):
+                        pass
+                    a.process_components(workers=2, chunk_size=2, shared=shared)
+                    result = a.analyze_components(workers=2)
+                    for k in expected:
+                        pd.testing.assert_frame_equal(expected[k], result[k])
+
+    def test_shipping_copy_prunes_columns(self):
+        with tempfile.TemporaryDirectory() as directory:
+            a, _ = run_small_job(write_small_job(directory))
+        component = a.components["component"].iloc[0]
+        shipped = pickle.loads(pickle.dumps(component.shipping_copy()))
+        self.assertNotIn("Scan #", shipped.data.columns)
+        self.assertIn("stripped_seq", shipped.data.columns)
+        self.assertIn("Scan #", pickle.loads(pickle.dumps(component)).data.columns)
+
+
+class ManifestPathCase(unittest.TestCase):
+    def test_path_manifest(self):
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_small_job(directory)
+            _, expected = run_small_job(job)
+            paths = [dict(r, filename=pathlib.Path(r["filename"]), area_filename=pathlib.Path(r["area_filename"]))
+                     for r in job]
+            _, result = run_small_job(paths, cache=os.path.join(directory, "cache"))
+            _, cached = run_small_job(paths, cache=os.path.join(directory, "cache"))
+        for sheet in expected:
+            pd.testing.assert_frame_equal(expected[sheet], result[sheet])
+            pd.testing.assert_frame_equal(expected[sheet], cached[sheet])
+
+
+class ProgressCase(unittest.TestCase):
+    def test_events(self):
+        events = []
+        with tempfile.TemporaryDirectory() as directory:
+            a, _ = run_small_job(write_small_job(directory), progress_callback=events.append)
+        components = len(a.components.index)
+        for stage, total in (("ingestion", 3), ("process", components), ("analyze", components)):
+            stage_events = [e for e in events if e["stage"] == stage]
+            self.assertEqual([e["done"] for e in stage_events], list(range(1, total + 1)))
+            self.assertEqual(stage_events[-1]["total"], total)
+            self.assertEqual(stage_events[-1]["eta"], 0)
+
+    def test_cancel(self):
+        token = CancellationToken()
+
+        def cancel(event):
+            if event["stage"] == "process":
+                token.cancel()
+
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_small_job(directory)
+            with self.assertRaises(AnalysisCancelled):
+                run_small_job(job, progress_callback=cancel, cancellation_token=token)
+            a = GlypnirO(progress_callback=cancel, cancellation_token=token)
+            with self.assertRaises(AnalysisCancelled):
+                for _ in a.add_batch_component(job, 0):
+                    pass
+
+
+class SummarySheetsCase(unittest.TestCase):
+    def test_lazy_sheets(self):
+        with tempfile.TemporaryDirectory() as directory:
+            a, result = run_small_job(write_small_job(directory))
+            expected = a._summary_format(result.summaries["occupancy"])
+            with mock.patch.object(a, "_summary_data", wraps=a._summary_data) as summary_data:
+                pd.testing.assert_frame_equal(expected, result["Occupancy"])
+                self.assertEqual(result.computed(), ["Occupancy"])
+                result["Occupancy_With_U"]
+                self.assertEqual(summary_data.call_count, 1)
+                result["Occupancy_Without_Proportion_U"]
+                self.assertEqual(summary_data.call_count, 2)
+        self.assertEqual(result.computed(), list(result))
+        self.assertIs(result["Glycoforms"], result.to_dict()["Glycoforms"])
+        with self.assertRaises(KeyError):
+            result["Missing"]
+
+    def test_dict_consumers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            a, expected = run_small_job(write_small_job(directory))
+            expected = expected.to_dict()
+            result = a.analyze_components()
+            self.assertIsInstance(result, dict)
+            # the GUI writes every sheet of the returned dictionary to one workbook
+            path = os.path.join(directory, "result.xlsx")
+            with pd.ExcelWriter(path) as writer:
+                for name in result:
+                    result[name].to_excel(writer, sheet_name=name)
+            self.assertEqual(list(pd.read_excel(path, sheet_name=None)), list(expected))
+            result = a.analyze_components()
+            self.assertEqual(result.computed(), [])
+            copied = dict(result)
+            self.assertEqual(list(copied), list(expected))
+            for name, sheet in result.items():
+                pd.testing.assert_frame_equal(expected[name], sheet)
+                self.assertIs(copied[name], sheet)
+            extra = pd.DataFrame({"x": [1]})
+            result.update({"Extra": extra})
+            result["Glycoforms"] = extra
+            self.assertIs(result.get("Glycoforms"), extra)
+            self.assertEqual(list(result), list(expected) + ["Extra"])
+            self.assertIs(result.pop("Extra"), extra)
+            self.assertNotIn("Extra", result)
+            unpickled = pickle.loads(pickle.dumps(result))
+            self.assertEqual(type(unpickled), dict)
+            self.assertEqual(list(unpickled), list(expected))
+
+    def test_settings_captured(self):
+        with tempfile.TemporaryDirectory() as directory:
+            a, expected = run_small_job(write_small_job(directory))
+            expected = expected.to_dict()
+            result = a.analyze_components()
+        a.trust_byonic = True
+        a.compact_dtypes = True
+        a.uniprot_parsed_data = pd.DataFrame({"Entry": ["P02649"], "Protein names": ["Changed"]})
+        for sheet in result:
+            pd.testing.assert_frame_equal(expected[sheet], result[sheet])
+
+
+class MassToleranceCase(unittest.TestCase):
+    def test_glycan_within_tolerance(self):
+        glycan = "HexNAc(1)Hex(1)NeuAc(1)"
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_small_job(directory)
+            spectra = pd.read_excel(job[0]["filename"], sheet_name="Spectra")
+            # 656.232 is 6.7 ppm above the 656.2276 of HexNAc(1)Hex(1)NeuAc(1)
+            spectra[sequence_column_name] = spectra[sequence_column_name].replace("K.TES[+656.228]TPR.G",
+                                                                                  "K.TES[+656.232]TPR.G")
+            spectra.to_excel(job[0]["filename"], sheet_name="Spectra", index=False)
+            glycans = {}
+            for tolerance, unit in ((10, "ppm"), (0.01, "Da"), (2, "ppm"), (None, "ppm")):
+                _, result = run_small_job(job, trust_byonic=True, mass_tolerance=tolerance, tolerance_unit=unit)
+                glycans[tolerance] = set(result["Glycoforms"].index.get_level_values("Glycans"))
+        self.assertIn(glycan, glycans[10])
+        self.assertIn(glycan, glycans[0.01])
+        self.assertNotIn(glycan, glycans[2])
+        self.assertNotIn(glycan, glycans[None])
+        self.assertIn("HexNAc(1)Hex(1)", glycans[2])
+
+
+class InstrumentationCase(unittest.TestCase):
+    def test_stages(self):
+        events = []
+        with tempfile.TemporaryDirectory() as directory:
+            a, _ = run_small_job(write_small_job(directory), instrumentation=Instrumentation(callbacks=[events.append]))
+        stages = a.instrumentation.report()["stages"]
+        for stage in ("ingestion", "merge", "process", "analyze", "proportion", "summary"):
+            self.assertIn(stage, stages)
+        self.assertEqual(stages["ingestion"]["calls"], 3)
+        self.assertEqual(stages["process"]["calls"], 6)
+        self.assertEqual(len(events), sum(s["calls"] for s in stages.values()))
+
+
 if __name__ == '__main__':
     unittest.main()
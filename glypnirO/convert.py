@@ -0,0 +1,77 @@
+import argparse
+import os
+
+import pandas as pd
+
+from glypnirO.common import GlypnirO, detect_format, read_table
+
+output_extensions = {"parquet": ".parquet", "csv": ".csv", "tsv": ".txt"}
+
+
+def parquet_safe(frame):
+    """
+    Store object columns mixing strings and numbers, which pyarrow cannot type, as strings.
+    """
+    for c in frame.columns:
+        if frame[c].dtype == object and pd.api.types.infer_dtype(frame[c], skipna=True).startswith("mixed"):
+            frame[c] = frame[c].where(frame[c].isnull(), frame[c].astype(str))
+    return frame
+
+
+def convert_file(filename, output=None, format="parquet", sheet_name="Spectra"):
+    """
+    Convert one xlsx table, all of its columns, into a parquet, csv or tab separated file.
+
+    :param output: path of the converted file, filename with the extension of format when not given
+    :param sheet_name: sheet to convert, the Byonic Spectra sheet by default
+    :return: path of the converted file
+    """
+    if format not in output_extensions:
+        raise ValueError("Output format has to be one of {}.".format(", ".join(output_extensions)))
+    if output is None:
+        output = os.path.splitext(filename)[0] + output_extensions[format]
+    frame = read_table(filename, sheet_name=sheet_name)
+    if format == "parquet":
+        parquet_safe(frame).to_parquet(output, index=False)
+    else:
+        frame.to_csv(output, sep="," if format == "csv" else "\t", index=False)
+    return output
+
+
+def convert_manifest(component_list, format="parquet", area=True, output=None):
+    """
+    Convert the xlsx Byonic exports, and the xlsx area files when area is set, of a component list. Files that are
+    not xlsx are kept as they are.
+
+    :param component_list: component list in any form accepted by GlypnirO.load_dataframe
+    :param output: path the converted component list is written to as csv
+    :return: component list pointing at the converted files
+    """
+    a = GlypnirO()
+    a.load_dataframe(component_list)
+    components = a.components.copy()
+    for i, r in components.iterrows():
+        if detect_format(r["filename"]) == "xlsx":
+            components.at[i, "filename"] = convert_file(r["filename"], format=format)
+        if area and detect_format(r["area_filename"]) == "xlsx":
+            components.at[i, "area_filename"] = convert_file(r["area_filename"], format=format, sheet_name=0)
+        print("Converted {} - {}".format(r["condition_id"], r["replicate_id"]))
+    if output:
+        components.to_csv(output, index=False)
+    return components
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the xlsx Byonic exports of a component list into a faster "
+                                                 "format.")
+    parser.add_argument("manifest", help="csv, xlsx or tab separated txt file with filename, area_filename, "
+                                         "replicate_id and condition_id columns")
+    parser.add_argument("-f", "--format", choices=list(output_extensions), default="parquet")
+    parser.add_argument("-o", "--output", help="write the converted component list as csv to this file")
+    parser.add_argument("--keep-area", action="store_true", help="do not convert xlsx area files")
+    args = parser.parse_args(argv)
+    return convert_manifest(args.manifest, args.format, not args.keep_area, args.output)
+
+
+if __name__ == "__main__":
+    main()
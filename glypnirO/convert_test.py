@@ -0,0 +1,48 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from glypnirO.common import detect_format, read_spectra
+from glypnirO.convert import convert_manifest
+from glypnirO.equivalence import pipeline_engine
+from glypnirO.synthetic import write_dataset
+
+
+class ConvertCase(unittest.TestCase):
+    def test_detect_format(self):
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_dataset(directory, psms=50)
+            spectra = pd.read_excel(job[0]["filename"], sheet_name="Spectra")
+            for name, format in (("spectra.bin", "xlsx"), ("spectra_csv", "csv"), ("spectra_tsv", "tsv"),
+                                 ("spectra_parquet", "parquet")):
+                path = os.path.join(directory, name)
+                if format == "xlsx":
+                    shutil.copy(job[0]["filename"], path)
+                elif format == "parquet":
+                    spectra.to_parquet(path)
+                else:
+                    spectra.to_csv(path, sep="," if format == "csv" else "\t", index=False)
+                self.assertEqual(detect_format(path), format)
+                pd.testing.assert_frame_equal(read_spectra(path), read_spectra(job[0]["filename"]))
+
+    def test_converted_manifest_gives_same_result(self):
+        engine = pipeline_engine()
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_dataset(directory, psms=300, runs=2)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for format in ("parquet", "tsv"):
+                    converted = convert_manifest(job, format)
+                    self.assertTrue(all(detect_format(f) == format for f in converted["filename"]))
+                    expected = engine(job)
+                    result = engine(converted)
+                    for sheet in expected:
+                        pd.testing.assert_frame_equal(expected[sheet], result[sheet])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,272 @@
+import contextlib
+import io
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from glypnirO.common import GlypnirO
+from glypnirO.synthetic import write_dataset
+
+sheets = ["Glycoforms", "Occupancy", "Occupancy_With_U", "Occupancy_Without_Proportion_U"]
+position_levels = ["Glycosylated positions in peptide", "Position peptide N-terminus"]
+baseline_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline")
+baseline_datasets = [(300, 2), (400, 3), (600, 2)]
+mismatch_columns = ["sheet", "kind", "Protein", "Position", "Peptides", "Glycans", "column", "expected", "actual"]
+
+
+def _row_fields(index_names, key):
+    if type(key) != tuple:
+        key = (key,)
+    fields = dict(zip(index_names, key))
+    position = None
+    for level in position_levels:
+        if level in fields:
+            position = fields[level]
+    return {"Protein": fields.get("Protein"), "Position": position, "Peptides": fields.get("Peptides"),
+            "Glycans": fields.get("Glycans")}
+
+
+def _column_label(column):
+    if type(column) == tuple:
+        return "/".join(str(c) for c in column)
+    return str(column)
+
+
+def compare_sheet(expected, actual, sheet="", rtol=1e-9, atol=1e-12):
+    """
+    Compare two result sheets cell by cell.
+
+    :return: DataFrame with one row per mismatching cell, row or column
+    """
+    mismatches = []
+    if list(expected.index.names) != list(actual.index.names):
+        mismatches.append({"sheet": sheet, "kind": "index",
+                           "expected": list(expected.index.names), "actual": list(actual.index.names)})
+        return pd.DataFrame(mismatches, columns=mismatch_columns)
+
+    for kind, keys in (("missing_row", expected.index.difference(actual.index)),
+                       ("extra_row", actual.index.difference(expected.index))):
+        for key in keys:
+            row = {"sheet": sheet, "kind": kind}
+            row.update(_row_fields(expected.index.names, key))
+            mismatches.append(row)
+    for kind, keys in (("missing_column", expected.columns.difference(actual.columns)),
+                       ("extra_column", actual.columns.difference(expected.columns))):
+        for key in keys:
+            mismatches.append({"sheet": sheet, "kind": kind, "column": _column_label(key)})
+
+    index = expected.index.intersection(actual.index)
+    columns = expected.columns.intersection(actual.columns)
+    left = expected.reindex(index=index, columns=columns)
+    right = actual.reindex(index=index, columns=columns)
+    left_values = left.to_numpy()
+    right_values = right.to_numpy()
+    try:
+        equal = np.isclose(left_values.astype(float), right_values.astype(float), rtol=rtol, atol=atol,
+                           equal_nan=True)
+    except (TypeError, ValueError):
+        equal = (left_values == right_values) | (pd.isnull(left_values) & pd.isnull(right_values))
+    for r, c in zip(*np.nonzero(~equal)):
+        row = {"sheet": sheet, "kind": "value", "column": _column_label(columns[c]),
+               "expected": left_values[r, c], "actual": right_values[r, c]}
+        row.update(_row_fields(index.names, index[r]))
+        mismatches.append(row)
+    return pd.DataFrame(mismatches, columns=mismatch_columns)
+
+
+class EquivalenceReport:
+    def __init__(self, mismatches, timings=None):
+        self.mismatches = mismatches
+        if timings is None:
+            timings = {}
+        self.timings = timings
+
+    @property
+    def equivalent(self):
+        return self.mismatches.empty
+
+    def summary(self):
+        """
+        Number of mismatches for each sheet, kind and protein.
+        """
+        if self.mismatches.empty:
+            return pd.DataFrame([], columns=["sheet", "kind", "Protein", "mismatches"])
+        return self.mismatches.fillna({"Protein": ""}).groupby(["sheet", "kind", "Protein"]).size()\
+            .rename("mismatches").reset_index()
+
+    def __repr__(self):
+        if self.equivalent:
+            return "Equivalent"
+        return "{} mismatches\n{}".format(len(self.mismatches.index), self.summary().to_string(index=False))
+
+
+def compare_results(expected, actual, rtol=1e-9, atol=1e-12, timings=None):
+    """
+    Compare all four analyze_components sheets.
+    """
+    frames = []
+    for sheet in sheets:
+        if sheet not in expected or sheet not in actual:
+            frames.append(pd.DataFrame([{"sheet": sheet, "kind": "missing_sheet"}], columns=mismatch_columns))
+            continue
+        frames.append(compare_sheet(expected[sheet], actual[sheet], sheet, rtol, atol))
+    return EquivalenceReport(pd.concat(frames, ignore_index=True), timings)
+
+
+def pipeline_engine(minimum_score=0, trust_byonic=False, process_options=None, analyze_options=None,
+                    batch_options=None, **options):
+    """
+    Build an engine running the GlypnirO pipeline on a component list.
+
+    :param batch_options: keyword arguments for add_batch_component
+    :param process_options: keyword arguments for process_components
+    :param analyze_options: keyword arguments for analyze_components
+    :param options: keyword arguments for GlypnirO
+    :return: callable taking a component list and returning the analyze_components sheets
+    """
+    if process_options is None:
+        process_options = {}
+    if analyze_options is None:
+        analyze_options = {}
+    if batch_options is None:
+        batch_options = {}
+
+    def engine(component_list):
+        a = GlypnirO(trust_byonic=trust_byonic, **options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in a.add_batch_component(component_list, minimum_score, **batch_options):
+                pass
+            a.process_components(**process_options)
+            result = a.analyze_components(**analyze_options)
+            return {sheet: result[sheet] for sheet in sheets}
+    return engine
+
+
+_legacy_script = """
+import pickle
+import sys
+
+from glypnirO.common import GlypnirO
+
+with open(sys.argv[1], "rb") as f:
+    component_list, minimum_score, trust_byonic = pickle.load(f)
+a = GlypnirO(trust_byonic=trust_byonic)
+for _ in a.add_batch_component(component_list, minimum_score):
+    pass
+a.process_components()
+result = a.analyze_components()
+with open(sys.argv[2], "wb") as f:
+    pickle.dump({sheet: result[sheet] for sheet in sys.argv[3:]}, f)
+"""
+
+
+def legacy_engine(source, minimum_score=0, trust_byonic=False):
+    """
+    Build an engine running the GlypnirO pipeline from another checkout, such as the release before the
+    performance work, in a separate interpreter.
+
+    :param source: directory holding the glypnirO and sequal packages to run
+    :return: callable taking a component list and returning the analyze_components sheets
+    """
+    def engine(component_list):
+        with tempfile.TemporaryDirectory() as directory:
+            job = os.path.join(directory, "job.pkl")
+            output = os.path.join(directory, "result.pkl")
+            with open(job, "wb") as f:
+                pickle.dump((component_list, minimum_score, trust_byonic), f)
+            env = dict(os.environ)
+            env["PYTHONPATH"] = os.path.abspath(source)
+            env["PYTHONWARNINGS"] = "ignore"
+            subprocess.run([sys.executable, "-c", _legacy_script, job, output] + sheets, cwd=source, env=env,
+                           stdout=subprocess.DEVNULL, check=True)
+            with open(output, "rb") as f:
+                return pickle.load(f)
+    return engine
+
+
+def baseline_path(psms, runs, seed=0, analysis="O-glycan", trust_byonic=False):
+    """
+    Location of the checked-in reference output for a synthetic dataset.
+    """
+    return os.path.join(baseline_directory, "{}_{}x{}_seed{}_{}.pkl".format(
+        analysis.lower().replace("-", ""), psms, runs, seed, "trusted" if trust_byonic else "untrusted"))
+
+
+def record_baselines(source, datasets=None, seed=0, analysis="O-glycan"):
+    """
+    Regenerate the checked-in reference outputs by running the synthetic datasets through another checkout.
+
+    :param source: directory holding the reference glypnirO and sequal packages
+    :param datasets: list of (psms, runs) tuples, by default baseline_datasets
+    """
+    if datasets is None:
+        datasets = baseline_datasets
+    os.makedirs(baseline_directory, exist_ok=True)
+    for trust_byonic in (False, True):
+        harness = EquivalenceHarness(None, legacy_engine(source, trust_byonic=trust_byonic))
+        for psms, runs in datasets:
+            with tempfile.TemporaryDirectory() as directory:
+                component_list = write_dataset(directory, psms, runs, seed=seed, analysis=analysis)
+                harness.record(component_list, baseline_path(psms, runs, seed, analysis, trust_byonic))
+
+
+class EquivalenceHarness:
+    """
+    Run a reference engine and a candidate engine side by side on the same data and diff their output sheets.
+    Without a reference engine synthetic datasets are checked against the outputs recorded from the original
+    pipeline under glypnirO/baseline.
+    """
+    def __init__(self, candidate, reference=None, rtol=1e-9, atol=1e-12, trust_byonic=False):
+        self.candidate = candidate
+        self.reference = reference
+        self.rtol = rtol
+        self.atol = atol
+        self.trust_byonic = trust_byonic
+
+    def _reference(self, component_list):
+        if self.reference is None:
+            raise ValueError("No reference engine given, only recorded synthetic datasets can be checked")
+        return self.reference(component_list)
+
+    def run(self, component_list):
+        timings = {}
+        start = time.perf_counter()
+        expected = self._reference(component_list)
+        timings["reference"] = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = self.candidate(component_list)
+        timings["candidate"] = time.perf_counter() - start
+        return compare_results(expected, actual, self.rtol, self.atol, timings)
+
+    def run_synthetic(self, psms=1000, runs=2, seed=0, analysis="O-glycan"):
+        with tempfile.TemporaryDirectory() as directory:
+            component_list = write_dataset(directory, psms, runs, seed=seed, analysis=analysis)
+            if self.reference is None:
+                return self.run_recorded(component_list,
+                                         baseline_path(psms, runs, seed, analysis, self.trust_byonic))
+            return self.run(component_list)
+
+    def record(self, component_list, path):
+        """
+        Store the reference output for a dataset so later candidates can be checked without rerunning it.
+        """
+        result = self._reference(component_list)
+        with open(path, "wb") as f:
+            pickle.dump(result, f)
+        return result
+
+    def run_recorded(self, component_list, path):
+        if not os.path.exists(path):
+            raise ValueError("No recorded output found at {}".format(path))
+        with open(path, "rb") as f:
+            expected = pickle.load(f)
+        start = time.perf_counter()
+        actual = self.candidate(component_list)
+        return compare_results(expected, actual, self.rtol, self.atol,
+                               {"candidate": time.perf_counter() - start})
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from glypnirO.equivalence import EquivalenceHarness, baseline_path, pipeline_engine, compare_results
+from glypnirO.synthetic import write_dataset
+
+
+class EquivalenceTestCase(unittest.TestCase):
+    def test_matches_baseline(self):
+        for trust_byonic in (False, True):
+            harness = EquivalenceHarness(pipeline_engine(trust_byonic=trust_byonic), trust_byonic=trust_byonic)
+            report = harness.run_synthetic(psms=300, runs=2)
+            self.assertTrue(report.equivalent, report)
+            self.assertIn("candidate", report.timings)
+
+    def test_baseline_is_not_the_candidate(self):
+        harness = EquivalenceHarness(pipeline_engine(trust_byonic=False), trust_byonic=True)
+        self.assertFalse(harness.run_synthetic(psms=300, runs=2).equivalent)
+        self.assertTrue(os.path.exists(baseline_path(300, 2, trust_byonic=True)))
+        with self.assertRaises(ValueError):
+            harness.run_synthetic(psms=10, runs=1)
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                harness.run(write_dataset(directory, 10, 1))
+
+    def test_mismatches_are_located(self):
+        with tempfile.TemporaryDirectory() as directory:
+            component_list = write_dataset(directory, 300, 2)
+            harness = EquivalenceHarness(pipeline_engine(trust_byonic=True), pipeline_engine(trust_byonic=True))
+            path = os.path.join(directory, "golden.pkl")
+            expected = harness.record(component_list, path)
+            self.assertTrue(harness.run_recorded(component_list, path).equivalent)
+
+        actual = {k: v.copy() for k, v in expected.items()}
+        actual["Occupancy"].iloc[0, 0] = actual["Occupancy"].iloc[0, 0] + 1
+        actual["Glycoforms"] = actual["Glycoforms"].iloc[1:]
+        report = compare_results(expected, actual)
+        self.assertFalse(report.equivalent)
+        value = report.mismatches[report.mismatches["kind"] == "value"]
+        self.assertEqual(len(value.index), 1)
+        self.assertEqual(value["Protein"].iloc[0], expected["Occupancy"].index[0][0])
+        self.assertEqual(value["Position"].iloc[0], expected["Occupancy"].index[0][2])
+        self.assertEqual(list(report.mismatches["kind"]).count("missing_row"), 1)
+        self.assertEqual(set(report.summary()["sheet"]), {"Occupancy", "Glycoforms"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import os
+import time
+
+import pandas as pd
+
+delimiters = {"csv": ",", "tsv": "\t"}
+
+
+class ExportStats:
+    def __init__(self, sheet, path):
+        self.sheet = sheet
+        self.path = path
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        if self.seconds:
+            return self.rows / self.seconds
+        return 0.0
+
+    @property
+    def bytes_per_second(self):
+        if self.seconds:
+            return self.bytes / self.seconds
+        return 0.0
+
+    def to_dict(self):
+        return {"sheet": self.sheet, "path": self.path, "rows": self.rows, "bytes": self.bytes,
+                "seconds": self.seconds, "rows_per_second": self.rows_per_second,
+                "bytes_per_second": self.bytes_per_second}
+
+    def __repr__(self):
+        return "{}: {} rows, {} bytes in {:.3f}s ({:.0f} rows/s, {:.0f} bytes/s)".format(
+            self.sheet, self.rows, self.bytes, self.seconds, self.rows_per_second, self.bytes_per_second)
+
+
+def iter_chunks(frame, chunk_size):
+    """
+    Yield consecutive row slices of frame without copying the whole frame.
+    """
+    for start in range(0, len(frame.index), chunk_size):
+        yield frame.iloc[start: start + chunk_size]
+
+
+def header_rows(frame):
+    """
+    Header rows laid out the same way DataFrame.to_csv writes them, one row per column level followed by the index
+    names when the columns are a MultiIndex.
+    """
+    index_names = ["" if n is None else n for n in frame.index.names]
+    if isinstance(frame.columns, pd.MultiIndex):
+        rows = []
+        for level, name in enumerate(frame.columns.names):
+            rows.append(["" if name is None else name] + [""] * (len(index_names) - 1) +
+                        list(frame.columns.get_level_values(level)))
+        rows.append(index_names + [""] * len(frame.columns))
+        return rows
+    return [index_names + list(frame.columns)]
+
+
+def _cell(value):
+    if pd.isnull(value):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def _write_delimited(frame, path, sep, chunk_size, stats, callback):
+    with open(path, "wt", newline="") as f:
+        pd.DataFrame(header_rows(frame)).to_csv(f, sep=sep, header=False, index=False)
+        for chunk in iter_chunks(frame, chunk_size):
+            chunk.to_csv(f, sep=sep, header=False)
+            stats.rows += len(chunk.index)
+            stats.bytes = f.tell()
+            if callback:
+                callback(stats)
+
+
+def _write_parquet(frame, path, chunk_size, stats, callback):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow to be installed.")
+    writer = None
+    try:
+        for chunk in iter_chunks(frame, chunk_size):
+            chunk = chunk.reset_index()
+            chunk.columns = ["|".join(str(i) for i in c if i != "") if type(c) == tuple else str(c)
+                             for c in chunk.columns]
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+            stats.rows += len(chunk.index)
+            if callback:
+                callback(stats)
+    finally:
+        if writer is not None:
+            writer.close()
+    stats.bytes = os.path.getsize(path)
+
+
+def _write_xlsx(sheets, path, chunk_size, all_stats, callback):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImportError("Excel export requires openpyxl to be installed.")
+    workbook = Workbook(write_only=True)
+    for (name, frame), stats in zip(sheets, all_stats):
+        start = time.perf_counter()
+        worksheet = workbook.create_sheet(title=name[:31])
+        for row in header_rows(frame):
+            worksheet.append([_cell(v) for v in row])
+        multi_index = isinstance(frame.index, pd.MultiIndex)
+        for chunk in iter_chunks(frame, chunk_size):
+            for index, values in zip(chunk.index, chunk.itertuples(index=False, name=None)):
+                if not multi_index:
+                    index = (index,)
+                worksheet.append([_cell(v) for v in index] + [_cell(v) for v in values])
+            stats.rows += len(chunk.index)
+            if callback:
+                callback(stats)
+        stats.seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    workbook.save(path)
+    saving = time.perf_counter() - start
+    total_rows = sum(s.rows for s in all_stats) or 1
+    size = os.path.getsize(path)
+    for stats in all_stats:
+        stats.seconds += saving * stats.rows / total_rows
+        stats.bytes = int(size * stats.rows / total_rows)
+
+
+def export_results(result, path, format=None, chunk_size=10000, sheets=None, callback=None):
+    """
+    Write the sheets returned by GlypnirO.analyze_components row chunk by row chunk.
+
+    :param result: dictionary of sheet name to DataFrame
+    :param path: output path. For xlsx all sheets are written into this workbook, for csv, tsv and parquet one file
+    per sheet is written next to it with the sheet name appended to the file name
+    :param format: one of xlsx, csv, tsv or parquet, inferred from the path extension when not given
+    :param chunk_size: number of rows converted at a time
+    :param sheets: names of the sheets to write, all sheets when not given
+    :param callback: called with the ExportStats of the current sheet after every chunk
+    :return: list of ExportStats, one per sheet
+    """
+    root, ext = os.path.splitext(path)
+    if format is None:
+        format = ext.lstrip(".").lower()
+        if format == "txt":
+            format = "tsv"
+    if sheets is None:
+        sheets = list(result.keys())
+    selected = [(name, result[name]) for name in sheets]
+
+    if format == "xlsx":
+        all_stats = [ExportStats(name, path) for name, _ in selected]
+        _write_xlsx(selected, path, chunk_size, all_stats, callback)
+        return all_stats
+
+    all_stats = []
+    for name, frame in selected:
+        if format in ("csv", "tsv"):
+            sheet_path = "{}_{}.{}".format(root, name, format)
+        elif format == "parquet":
+            sheet_path = "{}_{}.parquet".format(root, name)
+        else:
+            raise ValueError("Export format have to be xlsx, csv, tsv or parquet.")
+        stats = ExportStats(name, sheet_path)
+        start = time.perf_counter()
+        if format == "parquet":
+            _write_parquet(frame, sheet_path, chunk_size, stats, callback)
+        else:
+            _write_delimited(frame, sheet_path, delimiters[format], chunk_size, stats, callback)
+        stats.seconds = time.perf_counter() - start
+        all_stats.append(stats)
+    return all_stats
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from glypnirO.export import export_results
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+def summary_frame(rows=25):
+    index = pd.MultiIndex.from_tuples([("P{}".format(i // 5), "Protein {}".format(i // 5), "S{}".format(i), "U")
+                                       for i in range(rows)],
+                                      names=["Protein", "Protein names", "Glycosylated positions in peptide", "Glycans"])
+    columns = pd.MultiIndex.from_tuples([("Proportion", "A", "R1"), ("Raw", "A", "R1")],
+                                        names=["Label", "condition_id", "replicate_id"])
+    values = np.arange(rows * 2, dtype=float).reshape(rows, 2)
+    values[3, 0] = np.nan
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+class ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.result = {"Glycoforms": summary_frame(), "Occupancy": summary_frame(7)}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_csv_matches_to_csv(self):
+        stats = export_results(self.result, os.path.join(self.directory.name, "result.csv"), chunk_size=4)
+        self.assertEqual([s.rows for s in stats], [25, 7])
+        for s in stats:
+            with open(s.path, "rt", newline="") as f:
+                self.assertEqual(f.read(), self.result[s.sheet].to_csv())
+            self.assertEqual(s.bytes, os.path.getsize(s.path))
+
+    def test_xlsx(self):
+        path = os.path.join(self.directory.name, "result.xlsx")
+        stats = export_results(self.result, path, chunk_size=4, sheets=["Occupancy"])
+        self.assertEqual(len(stats), 1)
+        data = pd.read_excel(path, sheet_name=None, header=None)
+        self.assertEqual(list(data), ["Occupancy"])
+        self.assertEqual(len(data["Occupancy"].index), 7 + 4)
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet(self):
+        stats = export_results(self.result, os.path.join(self.directory.name, "result.parquet"), chunk_size=4)
+        data = pd.read_parquet(stats[0].path)
+        self.assertEqual(len(data.index), 25)
+        self.assertIn("Raw|A|R1", data.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger("glypnirO")
+
+
+class Instrumentation:
+    """
+    Collects structured timing, memory and row count events for the stages of a GlypnirO run. Every event is a
+    dictionary passed to the registered callbacks and logged on the "glypnirO" logger at debug level. Stages can be
+    timed from several threads at once, each thread nests its own stages and events are recorded under a lock.
+    """
+    def __init__(self, callbacks=None, trace_memory=False):
+        """
+        :param callbacks: list of callables receiving each event dictionary
+        :param trace_memory: sample the peak python memory allocated within each stage using tracemalloc
+        """
+        if callbacks is None:
+            callbacks = []
+        self.callbacks = list(callbacks)
+        self.trace_memory = trace_memory
+        self.events = []
+        self.started = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def emit(self, event, **fields):
+        fields["event"] = event
+        fields["elapsed"] = time.perf_counter() - self.started
+        with self._lock:
+            self.events.append(fields)
+            for callback in self.callbacks:
+                callback(fields)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(json.dumps(fields, default=str))
+        return fields
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """
+        Time the enclosed block as one occurrence of the named stage. The yielded dictionary can be updated with
+        extra fields, e.g. row counts, before the stage event is emitted.
+        """
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame = {"baseline": current, "peak": current}
+        else:
+            frame = {"baseline": 0, "peak": 0}
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            fields["seconds"] = time.perf_counter() - start
+            self._stack.pop()
+            if self.trace_memory:
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                fields["peak_memory"] = peak - frame["baseline"]
+                if self._stack:
+                    self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            self.emit("stage", stage=name, **fields)
+
+    def report(self):
+        """
+        Summary of the collected events: per stage call counts, total and maximum seconds, peak memory and rows, and
+        the row counts recorded for each component stage.
+        """
+        stages = {}
+        components = []
+        with self._lock:
+            events = list(self.events)
+        for e in events:
+            if e["event"] == "stage":
+                s = stages.setdefault(e["stage"], {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0})
+                s["calls"] += 1
+                s["seconds"] += e["seconds"]
+                s["max_seconds"] = max(s["max_seconds"], e["seconds"])
+                s["rows"] += e.get("rows", 0)
+                if "peak_memory" in e:
+                    s["peak_memory"] = max(s.get("peak_memory", 0), e["peak_memory"])
+                if "protein" in e and "rows" in e:
+                    components.append({k: e.get(k) for k in ("stage", "protein", "condition_id", "replicate_id",
+                                                             "rows")})
+        return {"elapsed": time.perf_counter() - self.started, "stages": stages, "components": components}
+
+    def to_json(self, path=None):
+        report = json.dumps(self.report(), indent=2, default=str)
+        if path is not None:
+            with open(path, "wt") as f:
+                f.write(report)
+        return report
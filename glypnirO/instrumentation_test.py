@@ -0,0 +1,57 @@
+import json
+import threading
+import unittest
+
+from glypnirO.instrumentation import Instrumentation
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    def test_stage_events(self):
+        events = []
+        instrumentation = Instrumentation(callbacks=[events.append], trace_memory=True)
+        with instrumentation.stage("process", protein="P02649", condition_id="A", replicate_id="R1") as stage:
+            with instrumentation.stage("analyze"):
+                data = [0] * 100000
+            stage["rows"] = len(data)
+        self.assertEqual([e["stage"] for e in events], ["analyze", "process"])
+        self.assertGreaterEqual(events[1]["peak_memory"], events[0]["peak_memory"])
+        self.assertGreater(events[0]["peak_memory"], 0)
+
+        report = json.loads(instrumentation.to_json())
+        self.assertEqual(report["stages"]["process"]["calls"], 1)
+        self.assertEqual(report["stages"]["process"]["rows"], 100000)
+        self.assertEqual(report["components"], [{"stage": "process", "protein": "P02649", "condition_id": "A",
+                                                 "replicate_id": "R1", "rows": 100000}])
+
+    def test_stage_event_on_error(self):
+        events = []
+        instrumentation = Instrumentation(callbacks=[events.append])
+        with self.assertRaises(ValueError):
+            with instrumentation.stage("ingestion"):
+                raise ValueError
+        self.assertEqual(events[0]["stage"], "ingestion")
+
+    def test_threads(self):
+        instrumentation = Instrumentation(trace_memory=True)
+        barrier = threading.Barrier(2)
+        depths = []
+
+        def read(n):
+            with instrumentation.stage("ingestion", replicate_id=n):
+                barrier.wait()
+                with instrumentation.stage("merge", replicate_id=n):
+                    depths.append(len(instrumentation._stack))
+                barrier.wait()
+
+        threads = [threading.Thread(target=read, args=(n,)) for n in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(depths, [2, 2])
+        self.assertEqual(instrumentation._stack, [])
+        self.assertEqual(instrumentation.report()["stages"]["merge"]["calls"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from sequal.glycan import composition_mass, tolerance_window
+
+
+class GlycanMassIndex:
+    """
+    Sorted mass array of glycan compositions for assigning observed modification masses to glycans within a ppm or
+    Da tolerance. Each observed mass is only assigned one of the glycans reported for its own row, the closest in
+    mass when several are within the tolerance.
+    """
+    def __init__(self, glycans):
+        """
+        :param glycans: iterable of glycan composition strings, duplicates are ignored
+        """
+        names = pd.unique(np.asarray(list(glycans), dtype=object))
+        masses = np.array([composition_mass(g) for g in names], dtype=float)
+        order = np.argsort(masses, kind="stable")
+        self.glycans = names[order]
+        self.masses = masses[order]
+        self.codes = {g: n for n, g in enumerate(self.glycans)}
+
+    def window(self, masses, tolerance, unit="ppm"):
+        """
+        Index range [lower, upper) of the glycans within the tolerance of each mass.
+        """
+        masses = np.asarray(masses, dtype=float)
+        delta = tolerance_window(masses, tolerance, unit)
+        lower = np.searchsorted(self.masses, masses - delta, side="left")
+        upper = np.searchsorted(self.masses, masses + delta, side="right")
+        return lower, upper
+
+    def assign(self, masses, rows, row_glycans, tolerance, unit="ppm"):
+        """
+        Assign every observed mass to a glycan of its row in one call.
+        :param masses: observed modification masses
+        :param rows: row label of each mass
+        :param row_glycans: dictionary of row label to the glycans reported for that row
+        :return: object array of the assigned glycans, None where no glycan of the row is within the tolerance
+        """
+        masses = np.asarray(masses, dtype=float)
+        assigned = np.full(len(masses), None, dtype=object)
+        if len(masses) == 0 or len(self.glycans) == 0:
+            return assigned
+        row_codes, row_labels = pd.factorize(pd.Series(rows, dtype=object))
+        n = len(self.glycans)
+        allowed = np.unique(np.array([code * n + self.codes[g]
+                                      for code, label in enumerate(row_labels)
+                                      for g in row_glycans.get(label, []) if g in self.codes], dtype=np.int64))
+        lower, upper = self.window(masses, tolerance, unit)
+        width = upper - lower
+
+        single = np.flatnonzero(width == 1)
+        found = np.isin(row_codes[single].astype(np.int64) * n + lower[single], allowed)
+        assigned[single[found]] = self.glycans[lower[single[found]]]
+
+        for q in np.flatnonzero(width > 1):
+            candidates = np.arange(lower[q], upper[q])
+            candidates = candidates[np.isin(row_codes[q] * n + candidates, allowed)]
+            if len(candidates):
+                assigned[q] = self.glycans[candidates[np.argmin(np.abs(self.masses[candidates] - masses[q]))]]
+        return assigned
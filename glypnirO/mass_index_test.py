@@ -0,0 +1,37 @@
+import unittest
+
+import numpy as np
+
+from glypnirO.mass_index import GlycanMassIndex
+from sequal.glycan import composition_mass
+from sequal.resources import glycan_block_dict
+
+
+class GlycanMassIndexCase(unittest.TestCase):
+    def setUp(self):
+        self.index = GlycanMassIndex(["HexNAc(1)Hex(1)", "HexNAc(1)", "HexNAc(1)Hex(1)NeuAc(1)", "HexNAc(1)"])
+        self.core1 = glycan_block_dict["HexNAc"] + glycan_block_dict["Hex"]
+
+    def test_sorted(self):
+        self.assertEqual(list(self.index.glycans), ["HexNAc(1)", "HexNAc(1)Hex(1)", "HexNAc(1)Hex(1)NeuAc(1)"])
+        self.assertTrue(np.all(np.diff(self.index.masses) > 0))
+        self.assertAlmostEqual(composition_mass("HexNAc(1)Hex(1)"), self.core1)
+
+    def test_assign(self):
+        row_glycans = {0: ["HexNAc(1)Hex(1)"], 1: ["HexNAc(1)"]}
+        masses = [round(self.core1, 2), self.core1 * (1 + 15e-6), self.core1, 203.08]
+        assigned = self.index.assign(masses, [0, 0, 1, 1], row_glycans, 10, "ppm")
+        self.assertEqual(list(assigned), ["HexNAc(1)Hex(1)", None, None, "HexNAc(1)"])
+        assigned = self.index.assign(masses, [0, 0, 1, 1], row_glycans, 0.01, "da")
+        self.assertEqual(list(assigned), ["HexNAc(1)Hex(1)", "HexNAc(1)Hex(1)", None, "HexNAc(1)"])
+        with self.assertRaises(ValueError):
+            self.index.assign(masses, [0, 0, 1, 1], row_glycans, 10, "mmu")
+
+    def test_closest(self):
+        index = GlycanMassIndex(["Sulfo(1)", "Phospho(1)"])
+        assigned = index.assign([79.966, 79.957], [0, 0], {0: ["Sulfo(1)", "Phospho(1)"]}, 0.02, "da")
+        self.assertEqual(list(assigned), ["Phospho(1)", "Sulfo(1)"])
+
+
+if __name__ == '__main__':
+    unittest.main()
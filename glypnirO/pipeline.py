@@ -0,0 +1,130 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from glypnirO.common import GlypnirO
+
+
+def process_and_analyze(component):
+    component.process()
+    return component, component.analyze()
+
+
+class AsyncPipeline:
+    """
+    Run a batch with its stages overlapped: while one manifest row is being read, the components of the rows already
+    read are processed and analyzed in worker processes and the UniProt annotations of their proteins are fetched.
+    File reading runs in a thread pool, UniProt requests in their own thread, so the cache and local index connections
+    are used by one thread at a time, and process and analyze in a process pool. The wall time approaches that of the
+    slowest stage instead of the sum of all of them. The component cache is not used.
+    """
+    def __init__(self, glypnir=None, workers=None, io_workers=2, **options):
+        """
+        :param glypnir: GlypnirO instance to run, created from options when not given
+        :param workers: number of worker processes for process and analyze
+        :param io_workers: number of threads reading files, also the number of manifest rows read ahead
+        """
+        if glypnir is None:
+            glypnir = GlypnirO(**options)
+        self.glypnir = glypnir
+        self.workers = workers
+        self.io_workers = io_workers
+
+    async def run(self, component_list, minimum_score=0, combine_uniprot_isoform=True, legacy=False):
+        """
+        At most io_workers manifest rows are read ahead of the one being waited on. Progress is reported for the
+        ingestion stage per manifest row and for the analyze stage per component. When the cancellation token fires,
+        the reads and analyses not started yet are cancelled and AnalysisCancelled is raised.
+        :return: the analyze_components sheets
+        """
+        a = self.glypnir
+        a.load_dataframe(component_list)
+        columns = list(a.components.columns)
+        loop = asyncio.get_running_loop()
+        components = []
+        protein_list = []
+        results = []
+        analyses = {}
+        fetches = []
+        seen = set()
+        rows = (r for _, r in a.components.iterrows())
+        reads = deque()
+        ingestion = a._progress("ingestion", len(a.components.index))
+        analyze = a._progress("analyze", 0)
+        io = ThreadPoolExecutor(self.io_workers)
+        uniprot = ThreadPoolExecutor(1)
+        cpu = ProcessPoolExecutor(self.workers)
+
+        def read_ahead():
+            while len(reads) < self.io_workers:
+                r = next(rows, None)
+                if r is None:
+                    return
+                reads.append((r, loop.run_in_executor(io, a._load_components, r, minimum_score,
+                                                      combine_uniprot_isoform, legacy)))
+
+        try:
+            with a.instrumentation.stage("pipeline", rows=len(a.components.index)):
+                read_ahead()
+                while reads or analyses:
+                    waiting = set(analyses)
+                    if reads:
+                        waiting.add(reads[0][1])
+                    done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                    a.cancellation_token.check()
+                    for analysis in done & set(analyses):
+                        n = analyses.pop(analysis)
+                        results[n] = analysis.result()
+                        analyze.advance(a._component_fields(components[n]), len(results[n][1].df.index))
+                    if not reads or not reads[0][1].done():
+                        continue
+                    r, read = reads.popleft()
+                    read_ahead()
+                    loaded, proteins = read.result()
+                    print("{} - {} peptides has been successfully loaded".format(r["condition_id"], r["replicate_id"]))
+                    protein_list += proteins
+                    new = [c["Protein"] for c in loaded if c["Protein"] not in seen]
+                    seen.update(new)
+                    if a.get_uniprot and new:
+                        fetches.append(loop.run_in_executor(uniprot, a._fetch_uniprot, new))
+                    analyze.total += len(loaded)
+                    for c in loaded:
+                        if a.compact_dtypes:
+                            c["component"].compact()
+                        analysis = loop.run_in_executor(cpu, process_and_analyze,
+                                                        a.configure(c["component"]).shipping_copy())
+                        analyses[analysis] = len(components)
+                        components.append(c)
+                        results.append(None)
+                    ingestion.advance({"condition_id": r["condition_id"], "replicate_id": r["replicate_id"]},
+                                      sum(c["component"].rows() for c in loaded))
+                annotations = await asyncio.gather(*fetches)
+        finally:
+            for future in [read for _, read in reads] + list(analyses) + fetches:
+                future.cancel()
+            for executor in (io, uniprot, cpu):
+                executor.shutdown(cancel_futures=True)
+
+        for c, (processed, _) in zip(components, results):
+            c["component"].update_from(processed)
+            if a.compact_dtypes:
+                c["component"].compact()
+        a.components = pd.DataFrame(components, columns=columns + ["component", "Protein"])
+        if a.get_uniprot:
+            if annotations:
+                a.uniprot_parsed_data = pd.concat(annotations, ignore_index=True)[["Entry", "Protein names"]]
+        else:
+            a.uniprot_parsed_data = pd.DataFrame(protein_list, columns=["Entry", "Protein names"])
+        return a.analyze_components(analysis_results=[analysis for _, analysis in results])
+
+
+def run_pipeline(component_list, minimum_score=0, workers=None, io_workers=2, combine_uniprot_isoform=True,
+                 legacy=False, **options):
+    """
+    Run AsyncPipeline on a component list from synchronous code.
+    :param options: keyword arguments for GlypnirO
+    """
+    pipeline = AsyncPipeline(workers=workers, io_workers=io_workers, **options)
+    return asyncio.run(pipeline.run(component_list, minimum_score, combine_uniprot_isoform, legacy))
@@ -0,0 +1,74 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from glypnirO.common_test import write_small_job, run_small_job
+from glypnirO.equivalence import EquivalenceHarness, sheets
+from glypnirO.instrumentation import Instrumentation
+from glypnirO.pipeline import run_pipeline
+from glypnirO.progress import AnalysisCancelled, CancellationToken
+
+
+class AsyncPipelineCase(unittest.TestCase):
+    def test_matches_serial_pipeline(self):
+        for trust_byonic in (False, True):
+            def engine(component_list):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = run_pipeline(component_list, workers=2, trust_byonic=trust_byonic)
+                return {sheet: result[sheet] for sheet in sheets}
+
+            harness = EquivalenceHarness(engine, trust_byonic=trust_byonic)
+            report = harness.run_synthetic(psms=400, runs=3)
+            self.assertTrue(report.equivalent, report)
+
+    def test_uniprot_prefetch(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "uniprot.tab")
+            with open(path, "wt") as f:
+                f.write("Entry\tProtein names\nP02649\tApolipoprotein E\nP01024\tComplement C3\n")
+            job = write_small_job(directory)
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, expected = run_small_job(job, uniprot_index=path)
+                result = run_pipeline(job, workers=2, uniprot_index=path)
+        for sheet in sheets:
+            pd.testing.assert_frame_equal(expected[sheet], result[sheet])
+
+    def test_progress(self):
+        events = []
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_small_job(directory)
+            with contextlib.redirect_stdout(io.StringIO()):
+                a, _ = run_small_job(job)
+                run_pipeline(job, workers=2, progress_callback=events.append)
+        components = len(a.components.index)
+        for stage, total in (("ingestion", 3), ("analyze", components)):
+            stage_events = [e for e in events if e["stage"] == stage]
+            self.assertEqual([e["done"] for e in stage_events], list(range(1, total + 1)))
+            self.assertEqual(stage_events[-1]["total"], total)
+            self.assertEqual(stage_events[-1]["eta"], 0)
+
+    def test_cancel(self):
+        token = CancellationToken()
+        instrumentation = Instrumentation()
+        events = []
+
+        def cancel(event):
+            events.append(event)
+            token.cancel()
+
+        with tempfile.TemporaryDirectory() as directory:
+            job = write_small_job(directory)
+            with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(AnalysisCancelled):
+                run_pipeline(job, workers=2, io_workers=1, progress_callback=cancel, cancellation_token=token,
+                             instrumentation=instrumentation)
+        self.assertEqual([e["stage"] for e in events], ["ingestion"])
+        # the third row was never read, the second at most finished the read it had started
+        self.assertLess(instrumentation.report()["stages"]["ingestion"]["calls"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import threading
+import time
+
+
+class AnalysisCancelled(Exception):
+    pass
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag shared between the thread running an analysis and the one stopping it. The
+    analysis checks the token between components and raises AnalysisCancelled once it is cancelled.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise AnalysisCancelled("Analysis was cancelled.")
+
+
+class ProgressTracker:
+    """
+    Counts the finished items of one stage and reports every step to the callbacks as a dictionary with stage,
+    component, done, total, rows, elapsed and eta in seconds.
+    """
+    def __init__(self, stage, total, callbacks=None, token=None):
+        """
+        :param callbacks: list of callables receiving each progress event
+        :param token: CancellationToken checked on every step
+        """
+        self.stage = stage
+        self.total = total
+        if callbacks is None:
+            callbacks = []
+        self.callbacks = callbacks
+        self.token = token
+        self.done = 0
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.check()
+
+    def check(self):
+        if self.token is not None:
+            self.token.check()
+
+    def advance(self, component=None, rows=0, steps=1):
+        """
+        Record finished items, report them and stop the analysis if it was cancelled meanwhile.
+        :param component: dictionary describing the finished component
+        """
+        self.done += steps
+        self.rows += rows
+        elapsed = time.perf_counter() - self.started
+        eta = None
+        if self.done:
+            eta = elapsed / self.done * max(self.total - self.done, 0)
+        event = {"stage": self.stage, "component": component, "done": self.done, "total": self.total,
+                 "rows": self.rows, "elapsed": elapsed, "eta": eta}
+        for callback in self.callbacks:
+            callback(event)
+        self.check()
+        return event
@@ -0,0 +1,103 @@
+import argparse
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from glypnirO.cache import ComponentCache
+from glypnirO.common import GlypnirO, area_filenames
+from glypnirO.export import export_results
+
+
+def row_key(cache, row, minimum_score, trust_byonic, protein=None, legacy=False):
+    return cache.key("runner", cache.source_digest(row["filename"], *area_filenames(row["area_filename"])), minimum_score,
+                     trust_byonic, protein, legacy)
+
+
+def run_manifest_row(row, checkpoint_dir, minimum_score=0, trust_byonic=False, protein=None, legacy=False):
+    """
+    Ingest, process and analyze the components of one manifest row, checkpointing every finished piece.
+    :return: instrumentation events of the row
+    """
+    cache = ComponentCache(checkpoint_dir)
+    a = GlypnirO(trust_byonic=trust_byonic, cache=cache)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in a.add_batch_component([row], minimum_score, protein, legacy=legacy):
+            pass
+        a.process_components()
+        for _, r in a.components.iterrows():
+            with a.instrumentation.stage("analyze", **a._component_fields(r)):
+                a._analyze_component(r["component"])
+    cache.set(row_key(cache, row, minimum_score, trust_byonic, protein, legacy), True)
+    return a.instrumentation.events
+
+
+def run(manifest, checkpoint_dir, output=None, workers=1, minimum_score=0, trust_byonic=False, protein=None,
+        legacy=False, get_uniprot=False, uniprot_cache=None, uniprot_index=None, report=None):
+    """
+    Run a whole manifest headlessly. Manifest rows are processed by a pool of worker processes, each finished row is
+    checkpointed in checkpoint_dir and skipped when the run is resumed. The summary sheets are assembled from the
+    checkpoints once every row is done.
+
+    :param manifest: component list in any form accepted by GlypnirO.load_dataframe
+    :param output: path the result sheets are exported to with export_results
+    :return: dictionary of sheet name to DataFrame
+    """
+    a = GlypnirO(trust_byonic=trust_byonic, get_uniprot=get_uniprot, uniprot_cache=uniprot_cache,
+                 uniprot_index=uniprot_index, cache=checkpoint_dir)
+    a.load_dataframe(manifest)
+    rows = [r.to_dict() for _, r in a.components.iterrows()]
+    pending = [r for r in rows
+               if row_key(a.cache, r, minimum_score, trust_byonic, protein, legacy) not in a.cache]
+    print("{} of {} manifest rows already completed".format(len(rows) - len(pending), len(rows)))
+
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_manifest_row, r, checkpoint_dir, minimum_score, trust_byonic, protein,
+                                       legacy): r for r in pending}
+            for n, future in enumerate(as_completed(futures), 1):
+                r = futures[future]
+                a.instrumentation.events += future.result()
+                print("{} - {} completed ({}/{})".format(r["condition_id"], r["replicate_id"], n, len(pending)))
+    else:
+        for n, r in enumerate(pending, 1):
+            a.instrumentation.events += run_manifest_row(r, checkpoint_dir, minimum_score, trust_byonic, protein,
+                                                         legacy)
+            print("{} - {} completed ({}/{})".format(r["condition_id"], r["replicate_id"], n, len(pending)))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in a.add_batch_component(manifest, minimum_score, protein, legacy=legacy):
+            pass
+        a.process_components()
+        result = a.analyze_components()
+    if output:
+        for stats in export_results(result, output):
+            print(stats)
+    if report:
+        a.instrumentation.to_json(report)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a GlypnirO analysis from a component manifest.")
+    parser.add_argument("manifest", help="csv, xlsx or tab separated txt file with filename, area_filename, "
+                                         "replicate_id and condition_id columns")
+    parser.add_argument("-o", "--output", default="glypnirO_result.xlsx",
+                        help="output file, xlsx, csv, tsv or parquet")
+    parser.add_argument("-c", "--checkpoint-dir", default="glypnirO_checkpoint",
+                        help="directory holding completed components, reused when resuming")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--minimum-score", type=float, default=0)
+    parser.add_argument("--trust-byonic", action="store_true")
+    parser.add_argument("--protein", help="only analyze this protein")
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--get-uniprot", action="store_true", help="annotate proteins from uniprot.org")
+    parser.add_argument("--uniprot-cache", help="SQLite file caching UniProt annotations")
+    parser.add_argument("--uniprot-index", help="local UniProt tab or FASTA dump used instead of uniprot.org")
+    parser.add_argument("--report", help="write the instrumentation report as json to this file")
+    args = parser.parse_args(argv)
+    run(args.manifest, args.checkpoint_dir, args.output, args.workers, args.minimum_score, args.trust_byonic,
+        args.protein, args.legacy, args.get_uniprot, args.uniprot_cache, args.uniprot_index, args.report)
+
+
+if __name__ == "__main__":
+    main()
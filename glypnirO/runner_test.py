@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from glypnirO.common import GlypnirOComponent
+from glypnirO.equivalence import pipeline_engine, compare_results
+from glypnirO.runner import main, run
+from glypnirO.synthetic import write_dataset
+
+
+class RunnerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.component_list = write_dataset(os.path.join(self.directory.name, "data"), 300, 3)
+        self.manifest = os.path.join(self.directory.name, "manifest.csv")
+        pd.DataFrame(self.component_list).to_csv(self.manifest, index=False)
+        self.checkpoint = os.path.join(self.directory.name, "checkpoint")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_parallel_run_matches_pipeline(self):
+        output = os.path.join(self.directory.name, "result.csv")
+        report = os.path.join(self.directory.name, "report.json")
+        main([self.manifest, "-o", output, "-c", self.checkpoint, "-w", "2", "--trust-byonic", "--report", report])
+        for sheet in ("Glycoforms", "Occupancy", "Occupancy_With_U", "Occupancy_Without_Proportion_U"):
+            self.assertTrue(os.path.exists(os.path.join(self.directory.name, "result_{}.csv".format(sheet))))
+        with open(report) as f:
+            self.assertEqual(json.load(f)["stages"]["ingestion"]["calls"], 3)
+        expected = pipeline_engine(trust_byonic=True)(self.component_list)
+        result = run(self.manifest, self.checkpoint, trust_byonic=True)
+        self.assertTrue(compare_results(expected, result).equivalent)
+
+    def test_resume_skips_completed_rows(self):
+        run(self.manifest, self.checkpoint, workers=1)
+        with mock.patch.object(GlypnirOComponent, "process", side_effect=RuntimeError) as process, \
+                mock.patch("glypnirO.runner.run_manifest_row") as run_manifest_row:
+            run(self.manifest, self.checkpoint, workers=1)
+            process.assert_not_called()
+            run_manifest_row.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+comment_column = "Comment"
+spectrum_file_column = "Spectrum File"
+raw_extensions = {".raw", ".mzml", ".mzxml", ".mgf", ".d", ".wiff"}
+logger = logging.getLogger("glypnirO")
+comment_regex = re.compile(r"^(?P<raw>.+)\.(?P<first>\d+)\.(?P<last>\d+)\.(?P<charge>\d+)$")
+
+
+def raw_name(filename):
+    """
+    Raw file name without directory and raw data extension, as used to match Byonic comments to area tables.
+    """
+    if not isinstance(filename, str):
+        return None
+    name = os.path.basename(filename.replace("\\", "/"))
+    root, extension = os.path.splitext(name)
+    if extension.lower() in raw_extensions:
+        return root
+    return name
+
+
+def comment_raw_names(comments):
+    """
+    Raw file names from Byonic comments of the form raw.first_scan.last_scan.charge, None where it cannot be parsed.
+    """
+    names = {}
+    for c in pd.unique(comments):
+        search = comment_regex.search(c) if isinstance(c, str) else None
+        names[c] = raw_name(search.group("raw")) if search else None
+    return comments.map(names)
+
+
+class ScanIndex:
+    """
+    Hashed index of one or more area tables on (raw file, scan number). Raw files come from the Spectrum File column
+    of the area tables and the Comment column of the Byonic output. PSMs whose raw file cannot be parsed or is not in
+    the area tables fall back to the scan number alone, and only to scans found in a single raw file, so rows are
+    never joined across fractions.
+    """
+    def __init__(self, areas):
+        """
+        :param areas: list of area DataFrames with First Scan and Area columns
+        """
+        self.area = pd.concat(areas, ignore_index=True) if len(areas) > 1 else areas[0].reset_index(drop=True)
+        self.scans = pd.to_numeric(self.area["First Scan"], errors="coerce").to_numpy(dtype=float)
+        self.raw_codes = np.full(len(self.area.index), -1, dtype=np.int64)
+        self.raw_names = {}
+        if spectrum_file_column in self.area.columns:
+            codes, names = pd.factorize(self.area[spectrum_file_column].map(raw_name))
+            self.raw_codes = codes.astype(np.int64)
+            self.raw_names = {n: i for i, n in enumerate(names)}
+        scan_keys = self._keys(self.scans)
+        # a scan number found in more than one raw file cannot be matched without the raw file
+        files = pd.Series(self.raw_codes).groupby(scan_keys).nunique()
+        ambiguous = pd.Series(scan_keys).map(files).to_numpy() > 1
+        self.ambiguous_scans = np.unique(scan_keys[ambiguous])
+        scan_keys = np.where(ambiguous, -1, scan_keys)
+        keys = np.concatenate([self._keys(self.scans, self.raw_codes), scan_keys])
+        positions = np.tile(np.arange(len(self.area.index)), 2)
+        self.index = pd.Index(keys[keys >= 0])
+        self.positions = positions[keys >= 0]
+
+    @staticmethod
+    def _keys(scans, raw_codes=None):
+        """
+        Scan number keys, or (raw file, scan number) keys above 2**32 when raw_codes is given, -1 where the scan
+        number or raw file is missing.
+        """
+        keys = np.where(np.isnan(scans), -1, scans).astype(np.int64)
+        if raw_codes is not None:
+            keys = np.where((keys >= 0) & (raw_codes >= 0), ((raw_codes.astype(np.int64) + 1) << 32) | keys, -1)
+        return keys
+
+    def query_keys(self, data):
+        """
+        Keys of the PSMs in data, on the raw file of their Comment and Scan number when the raw file is in the area
+        tables, on the Scan number alone for the other rows.
+        """
+        scans = pd.to_numeric(data["Scan number"], errors="coerce").to_numpy(dtype=float)
+        codes = np.full(len(scans), -1, dtype=np.int64)
+        if self.raw_names and comment_column in data.columns and len(data.index) > 0:
+            codes = comment_raw_names(data[comment_column]).map(self.raw_names).fillna(-1).to_numpy(dtype=np.int64)
+        fallback = codes < 0
+        scan_keys = self._keys(scans)
+        if self.raw_names and fallback.any():
+            # without a raw file a scan number is only left out when several raw files have it
+            dropped = np.isin(scan_keys[fallback], self.ambiguous_scans).sum()
+            if dropped:
+                logger.warning("%d PSMs without a raw file have scan numbers found in several raw files of the area "
+                               "tables and were left out", dropped)
+            logger.debug("%d of %d PSMs have no raw file found in the area tables, matched on scan number only",
+                         fallback.sum(), len(scans))
+        return np.where(fallback, scan_keys, self._keys(scans, codes))
+
+    def join(self, data):
+        """
+        Inner join of data with the area tables, equivalent to pd.merge of data on Scan number with the area tables
+        on First Scan but keyed on raw file as well when possible. Rows of data keep their order.
+        """
+        keys = self.query_keys(data)
+        if not self.index.is_unique:
+            return pd.merge(data.assign(_scan_key=keys),
+                            self.area.iloc[self.positions].assign(_scan_key=self.index.to_numpy()),
+                            on="_scan_key").drop(columns=["_scan_key"]).reset_index(drop=True)
+        positions = self.index.get_indexer(keys)
+        found = (positions >= 0) & (keys >= 0)
+        left = data[found].reset_index(drop=True)
+        right = self.area.iloc[self.positions[positions[found]]].reset_index(drop=True)
+        overlap = left.columns.intersection(right.columns)
+        if len(overlap) > 0:
+            left = left.rename(columns={c: "{}_x".format(c) for c in overlap})
+            right = right.rename(columns={c: "{}_y".format(c) for c in overlap})
+        return pd.concat([left, right], axis=1)
@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from glypnirO.scan_index import ScanIndex, raw_name
+from glypnirO.synthetic import generate_dataset
+
+
+def scan_numbers(spectra):
+    spectra = spectra.copy()
+    spectra["Scan number"] = pd.to_numeric(spectra["Scan #"].str.extract(r"scan=(\d+)", expand=False))
+    return spectra
+
+
+class ScanIndexCase(unittest.TestCase):
+    def test_raw_name(self):
+        self.assertEqual(raw_name("C:\\data\\fraction_01.raw"), "fraction_01")
+        self.assertEqual(raw_name("fraction_01.mzML"), "fraction_01")
+        self.assertEqual(raw_name("fraction_01"), "fraction_01")
+
+    def test_single_area_matches_merge(self):
+        run = generate_dataset(psms=300)[0]
+        spectra = scan_numbers(run["spectra"])
+        expected = pd.merge(spectra, run["area"], left_on="Scan number", right_on="First Scan")
+        pd.testing.assert_frame_equal(ScanIndex([run["area"]]).join(spectra), expected)
+        with self.assertNoLogs("glypnirO", level="WARNING"):
+            joined = ScanIndex([run["area"]]).join(spectra.drop(columns=["Comment"]))
+        pd.testing.assert_frame_equal(joined, expected.drop(columns=["Comment"]))
+
+    def test_multiple_raw_files(self):
+        runs = generate_dataset(psms=300, runs=3)
+        self.assertTrue(np.intersect1d(runs[0]["area"]["First Scan"], runs[1]["area"]["First Scan"]).size > 0)
+        index = ScanIndex([r["area"] for r in runs])
+        combined = index.join(scan_numbers(pd.concat([r["spectra"] for r in runs], ignore_index=True)))
+        expected = pd.concat([pd.merge(scan_numbers(r["spectra"]), r["area"], left_on="Scan number",
+                                       right_on="First Scan") for r in runs], ignore_index=True)
+        pd.testing.assert_frame_equal(combined, expected)
+
+    def test_same_scan_in_two_fractions(self):
+        areas = [pd.DataFrame({"First Scan": [100, 200], "Spectrum File": "fraction_01.raw", "Area": [1.0, 2.0]}),
+                 pd.DataFrame({"First Scan": [100, 300], "Spectrum File": "fraction_02.raw", "Area": [10.0, 30.0]})]
+        spectra = pd.DataFrame({"Scan number": [100, 100, 100, 200, 300],
+                                "Comment": ["fraction_01.100.100.2", "fraction_02.100.100.2", "unparseable",
+                                            "fraction_03.200.200.2", None]})
+        with self.assertLogs("glypnirO", level="WARNING"):
+            joined = ScanIndex(areas).join(spectra)
+        # scan 100 without a raw file is in both fractions and is left out instead of joined to both
+        self.assertEqual(joined["Area"].tolist(), [1.0, 10.0, 2.0, 30.0])
+        self.assertEqual(joined["Comment"].tolist(), ["fraction_01.100.100.2", "fraction_02.100.100.2",
+                                                      "fraction_03.200.200.2", None])
+
+        areas[1] = pd.concat([areas[1], areas[1].iloc[:1].assign(Area=20.0)], ignore_index=True)
+        with self.assertLogs("glypnirO", level="WARNING"):
+            joined = ScanIndex(areas).join(spectra)
+        self.assertEqual(joined["Area"].tolist(), [1.0, 10.0, 20.0, 2.0, 30.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,261 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+_attached = None
+
+
+def stacked_dtype(dtypes):
+    """
+    dtype of a column stacked from frames holding it with the given dtypes, as given by pandas.concat, or None when
+    the column is dictionary encoded.
+    """
+    kinds = {d.kind if isinstance(d, np.dtype) else "O" for d in dtypes}
+    if not kinds or not kinds <= set("biuf") or ("b" in kinds and len(kinds) > 1):
+        return None
+    return np.result_type(*dtypes)
+
+
+def _object_array(values):
+    array = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        array[i] = v
+    return array
+
+
+class SharedFrame:
+    """
+    Columnar copy of DataFrames held in shared memory, stacked one after the other. Numeric and boolean columns are
+    stored as raw arrays, other columns are dictionary encoded into integer codes, with the unique values of all of
+    them pickled into one more shared buffer. Worker processes attach to the frame from its spec and read row ranges
+    without the data being pickled.
+    """
+    def __init__(self, frame=None, columns=None, spec=None):
+        """
+        :param frame: DataFrame to copy into shared memory
+        :param columns: columns of frame to store, all of them when not given
+        :param spec: description of an existing shared frame, used by attach
+        """
+        self.buffers = {}
+        self.owner = spec is None
+        if spec is None:
+            if columns is not None:
+                frame = frame[[c for c in frame.columns if c in columns]]
+            self._allocate(len(frame.index), frame.index.dtype, frame.dtypes.items())
+            self.write(0, frame)
+            self.share_categories()
+        else:
+            self.spec = spec
+            for column in [spec["index"]] + spec["columns"]:
+                self._attach_buffer(column["buffer"])
+            self._attach_buffer(spec["categories"]["buffer"])
+            self.categories = pickle.loads(self.buffers[spec["categories"]["buffer"]].buf[:spec["categories"]["size"]])
+
+    @classmethod
+    def allocate(cls, length, index_dtype, dtypes):
+        """
+        Empty shared frame to be filled with write and made available to workers with share_categories.
+
+        :param length: total number of rows
+        :param dtypes: (column, dtype) pairs, with a dtype of None for dictionary encoded columns
+        """
+        shared = cls.__new__(cls)
+        shared.buffers = {}
+        shared.owner = True
+        shared._allocate(length, index_dtype, dtypes)
+        return shared
+
+    def _allocate(self, length, index_dtype, dtypes):
+        self.spec = {"length": length, "columns": [], "index": None, "categories": None}
+        self.categories = {}
+        self.dictionaries = {}
+        self.spec["index"] = self._create(None, stacked_dtype([index_dtype]), length)
+        for name, dtype in dtypes:
+            if dtype is not None:
+                dtype = stacked_dtype([dtype])
+            self.spec["columns"].append(self._create(name, dtype, length))
+
+    def _create(self, name, dtype, length):
+        column = {"name": name, "dictionary": dtype is None}
+        if dtype is None:
+            dtype = np.dtype(np.int32)
+            self.categories[name] = []
+            self.dictionaries[name] = {}
+        buffer = shared_memory.SharedMemory(create=True, size=max(1, dtype.itemsize * length))
+        self.buffers[buffer.name] = buffer
+        column["buffer"] = buffer.name
+        column["dtype"] = dtype.str
+        return column
+
+    def _array(self, column):
+        return np.ndarray(self.spec["length"], dtype=column["dtype"], buffer=self.buffers[column["buffer"]].buf)
+
+    def write(self, start, frame):
+        """
+        Copy the rows of frame into the rows from start on. Columns of the shared frame missing from frame are
+        filled with NaN.
+        """
+        stop = start + len(frame.index)
+        for column in [self.spec["index"]] + self.spec["columns"]:
+            if column["name"] is None:
+                values = frame.index.to_numpy()
+            elif column["name"] in frame.columns:
+                values = frame[column["name"]].to_numpy()
+            else:
+                values = np.full(stop - start, np.nan, dtype=object if column["dictionary"] else column["dtype"])
+            if column["dictionary"]:
+                values = self._encode(column["name"], values)
+            self._array(column)[start:stop] = values
+
+    def _encode(self, name, values):
+        codes, uniques = pd.factorize(values)
+        dictionary = self.dictionaries[name]
+        categories = self.categories[name]
+        lookup = np.empty(len(uniques) + 1, dtype=np.int32)
+        lookup[-1] = -1
+        for i, u in enumerate(uniques):
+            if u not in dictionary:
+                dictionary[u] = len(categories)
+                categories.append(u)
+            lookup[i] = dictionary[u]
+        return lookup[codes]
+
+    def share_categories(self):
+        """
+        Place the unique values of the dictionary encoded columns in shared memory, once every row is written.
+        """
+        self.categories = {name: _object_array(values) for name, values in self.categories.items()}
+        self.dictionaries = {}
+        payload = pickle.dumps(self.categories, protocol=pickle.HIGHEST_PROTOCOL)
+        buffer = shared_memory.SharedMemory(create=True, size=max(1, len(payload)))
+        buffer.buf[:len(payload)] = payload
+        self.buffers[buffer.name] = buffer
+        self.spec["categories"] = {"buffer": buffer.name, "size": len(payload)}
+
+    def _attach_buffer(self, name):
+        self.buffers[name] = shared_memory.SharedMemory(name=name)
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(spec=spec)
+
+    @property
+    def columns(self):
+        return [c["name"] for c in self.spec["columns"]]
+
+    def __len__(self):
+        return self.spec["length"]
+
+    def _values(self, column, start, stop):
+        values = self._array(column)[start:stop]
+        values.flags.writeable = False
+        if not column["dictionary"]:
+            return values
+        decoded = self.categories[column["name"]].take(np.maximum(values, 0))
+        decoded[values < 0] = np.nan
+        return decoded
+
+    def rows(self, start=0, stop=None):
+        """
+        DataFrame of the rows between start and stop, with the original index.
+        """
+        if stop is None:
+            stop = len(self)
+        index = pd.Index(self._values(self.spec["index"], start, stop))
+        return pd.DataFrame({c["name"]: self._values(c, start, stop) for c in self.spec["columns"]}, index=index,
+                            copy=False)
+
+    def close(self):
+        for buffer in self.buffers.values():
+            buffer.close()
+        if self.owner:
+            for buffer in self.buffers.values():
+                buffer.unlink()
+        self.buffers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def share_components(components, columns=None):
+    """
+    Copy the data of several components one after the other into a SharedFrame. The buffers are allocated from the
+    total row count and each component is written into its own row range, loading and releasing one component at a
+    time.
+
+    :return: the shared frame and the (start, stop) row range of each component
+    """
+    ranges = []
+    start = 0
+    index_dtypes = []
+    dtypes = {}
+    for component in components:
+        data = component.data
+        ranges.append((start, start + len(data.index)))
+        start += len(data.index)
+        index_dtypes.append(data.index.dtype)
+        for name, dtype in data.dtypes.items():
+            if columns is None or name in columns:
+                dtypes.setdefault(name, []).append(dtype)
+        component.release()
+    if not index_dtypes:
+        index_dtypes.append(np.dtype(np.int64))
+    for name in dtypes:
+        if len(dtypes[name]) < len(components):
+            dtypes[name].append(np.dtype(float))
+    shared = SharedFrame.allocate(start, stacked_dtype(index_dtypes),
+                                  [(name, stacked_dtype(d)) for name, d in dtypes.items()])
+    for component, (start, stop) in zip(components, ranges):
+        shared.write(start, component.data)
+        component.release()
+    shared.share_categories()
+    return shared, ranges
+
+
+def attach_shared(spec):
+    global _attached
+    _attached = SharedFrame.attach(spec)
+
+
+def process_range(task):
+    component, start, stop, returned_columns = task
+    component.data = _attached.rows(start, stop)
+    component.process()
+    component.pickle_columns = returned_columns
+    return component
+
+
+def process_shared(components, workers, chunk_size=None, columns=None, returned_columns=None, progress=None):
+    """
+    Process components in a pool of worker processes reading their rows from shared memory. Each task only carries
+    the component without its data and the row range of the component in the shared frame.
+
+    :param columns: data columns placed in shared memory
+    :param returned_columns: data columns sent back from the workers and applied with update_from
+    :param progress: ProgressTracker advanced for every processed component
+    """
+    shared, ranges = share_components(components, columns)
+    with shared:
+        tasks = []
+        for component, (start, stop) in zip(components, ranges):
+            stub = copy(component)
+            stub.data = None
+            stub.pickle_columns = None
+            tasks.append((stub, start, stop, returned_columns))
+        if chunk_size is None:
+            chunk_size = max(1, len(tasks) // (workers * 4))
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=attach_shared, initargs=(shared.spec,))
+        try:
+            for component, processed in zip(components, executor.map(process_range, tasks, chunksize=chunk_size)):
+                component.update_from(processed)
+                if progress is not None:
+                    progress.advance(rows=component.rows())
+        finally:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,43 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from glypnirO.common import GlypnirOComponent
+from glypnirO.shared import SharedFrame, share_components
+
+
+class SharedFrameCase(unittest.TestCase):
+    def test_rows(self):
+        frame = pd.DataFrame({"Area": [1.5, np.nan, 3.0, 4.0], "z": [2, 3, 2, 4],
+                              "Glycans": ["HexNAc(1)", None, "HexNAc(1)", "Hex(1)"]}, index=[7, 3, 9, 1])
+        with SharedFrame(frame, columns=["Area", "Glycans"]) as shared:
+            self.assertEqual(shared.columns, ["Area", "Glycans"])
+            attached = SharedFrame.attach(shared.spec)
+            rows = attached.rows(1, 3)
+            pd.testing.assert_frame_equal(rows, frame[["Area", "Glycans"]].iloc[1:3], check_index_type=False)
+            self.assertTrue(pd.isnull(rows.at[3, "Glycans"]))
+            attached.close()
+
+    def test_share_components(self):
+        frames = [pd.DataFrame({"Area": [1, 2], "z": np.array([2, 3], dtype=np.int8),
+                                "Glycans": pd.Categorical(["HexNAc(1)", "Hex(1)"])}, index=[4, 5]),
+                  pd.DataFrame({"Area": [np.nan], "z": np.array([300], dtype=np.int16), "Glycans": [None]}, index=[0]),
+                  pd.DataFrame({"z": np.array([2], dtype=np.int8), "Glycans": ["NeuAc(1)"]}, index=[1])]
+        components = [GlypnirOComponent.from_filtered(f, "R1", "A", "P1") for f in frames]
+        with mock.patch("glypnirO.shared.pd.concat", side_effect=AssertionError):
+            shared, ranges = share_components(components, columns=["Area", "z", "Glycans"])
+        with shared:
+            self.assertEqual(ranges, [(0, 2), (2, 3), (3, 4)])
+            self.assertNotIn("categories", shared.spec["columns"][2])
+            attached = SharedFrame.attach(shared.spec)
+            expected = pd.concat(frames)
+            expected["Glycans"] = expected["Glycans"].astype(object)
+            pd.testing.assert_frame_equal(attached.rows(), expected, check_index_type=False)
+            pd.testing.assert_frame_equal(attached.rows(1, 3), expected.iloc[1:3], check_index_type=False)
+            attached.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from glypnirO.common import sequence_column_name, glycans_column_name, starting_position_column_name, \
+    modifications_column_name, observed_mz, protein_column_name, rt
+from sequal.resources import AA_mass, glycan_block_dict, H, O, proton
+
+amino_acids = np.array(list("ACDEFGHIKLMNPQRSTVWY"))
+o_glycans = ["HexNAc(1)", "HexNAc(1)Hex(1)", "HexNAc(1)Hex(1)NeuAc(1)", "HexNAc(1)Hex(1)NeuAc(2)",
+             "HexNAc(2)Hex(2)", "HexNAc(2)Hex(2)NeuAc(1)"]
+n_glycans = ["HexNAc(2)Hex(5)", "HexNAc(2)Hex(6)", "HexNAc(4)Hex(5)NeuAc(2)", "HexNAc(4)Hex(5)Fuc(1)NeuAc(2)",
+             "HexNAc(4)Hex(5)Fuc(1)", "HexNAc(5)Hex(6)NeuAc(3)"]
+scan_template = "controllerType=0 controllerNumber=1 scan={}"
+
+
+def glycan_mass(glycan):
+    mass = 0
+    for block in glycan.split(")"):
+        if block:
+            name, number = block.split("(")
+            mass += glycan_block_dict[name] * int(number)
+    return mass
+
+
+def peptide_mass(stripped):
+    return sum(AA_mass[a] for a in stripped) + H * 2 + O
+
+
+def random_accession(rng):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    return "P{}{}{}".format(rng.integers(0, 10), "".join(rng.choice(list(letters), 3)), rng.integers(0, 10))
+
+
+def protein_headers(rng, proteins, contaminants=2):
+    headers = []
+    for i in range(proteins):
+        accession = random_accession(rng)
+        if rng.random() < 0.1:
+            accession += "-{}".format(rng.integers(2, 5))
+        headers.append(">sp|{}|SYN{}_HUMAN Synthetic protein {} OS=Homo sapiens OX=9606 GN=SYN{} PE=1 SV=1".format(
+            accession, i, i, i))
+    for i in range(contaminants):
+        headers.append(">sp|{}|CON{}_BOVIN Contaminant {} (Common contaminant protein)".format(
+            random_accession(rng), i, i))
+    return headers
+
+
+def peptide_variants(rng, headers, peptides_per_protein=8, glycoforms_per_peptide=4, analysis="O-glycan"):
+    """
+    Build the pool of distinct modified peptide strings PSMs are sampled from.
+    :return: DataFrame with one row per modified peptide variant
+    """
+    variants = []
+    glycan_list = o_glycans if analysis == "O-glycan" else n_glycans
+    for p, header in enumerate(headers):
+        protein_sequence = "".join(rng.choice(amino_acids, rng.integers(300, 800)))
+        for _ in range(peptides_per_protein):
+            length = int(rng.integers(7, 21))
+            start = int(rng.integers(1, len(protein_sequence) - length - 1))
+            stripped = list(protein_sequence[start: start + length])
+            if analysis == "O-glycan":
+                sites = [i for i, a in enumerate(stripped) if a in "ST"]
+                if not sites:
+                    stripped[length // 2] = "T"
+                    sites = [length // 2]
+            else:
+                site = int(rng.integers(0, length - 2))
+                stripped[site: site + 3] = ["N", "G", "S"]
+                sites = [site]
+            before = protein_sequence[start - 1]
+            after = protein_sequence[start + length]
+            base_mass = peptide_mass(stripped)
+            forms = [([], [])]
+            for _ in range(glycoforms_per_peptide):
+                number = min(len(sites), int(rng.integers(1, 3)))
+                chosen = sorted(rng.choice(sites, number, replace=False))
+                forms.append((chosen, list(rng.choice(glycan_list, number))))
+            for chosen, glycans in forms:
+                annotated = []
+                mods = []
+                for i, a in enumerate(stripped):
+                    annotated.append(a)
+                    if i in chosen:
+                        mass = glycan_mass(glycans[chosen.index(i)])
+                        annotated.append("[+{:.3f}]".format(mass))
+                        mods.append("{}[+{}]".format(a, int(round(mass))))
+                    elif a == "M" and rng.random() < 0.3:
+                        annotated.append("[+15.995]")
+                        mods.append("M[+16]")
+                variants.append({
+                    "protein": p,
+                    sequence_column_name: "{}.{}.{}".format(before, "".join(annotated), after),
+                    glycans_column_name: ",".join(glycans) if glycans else None,
+                    modifications_column_name: "; ".join(mods) if mods else None,
+                    starting_position_column_name: start + 1,
+                    "mass": base_mass + sum(glycan_mass(g) for g in glycans) + proton,
+                })
+    return pd.DataFrame(variants)
+
+
+def generate_run(rng, headers, variants, psms, raw_file="synthetic.raw", decoy_fraction=0.05,
+                 minimum_scan=1000):
+    """
+    Generate one Byonic Spectra sheet and its matching MSnSpectrumInfo area table.
+    """
+    chosen = rng.integers(0, len(variants.index), psms)
+    sample = variants.iloc[chosen].reset_index(drop=True)
+    proteins = np.array(headers, dtype=object)[sample["protein"].values]
+    decoy = rng.random(psms) < decoy_fraction
+    proteins[decoy] = np.array([">Reverse " + p.lstrip(">") for p in proteins[decoy]], dtype=object)
+    scans = rng.permutation(np.arange(minimum_scan, minimum_scan + psms * 2))[:psms]
+    z = rng.integers(2, 5, psms)
+    score = np.round(rng.gamma(4, 60, psms), 2)
+    score[decoy] = np.round(score[decoy] / 3, 2)
+    spectra = pd.DataFrame({
+        "Query #:z": ["{:05d}:{}".format(i, c) for i, c in zip(range(psms), z)],
+        "Protein\nRank": rng.integers(1, 20, psms),
+        sequence_column_name: sample[sequence_column_name].values,
+        glycans_column_name: sample[glycans_column_name].values,
+        modifications_column_name: sample[modifications_column_name].values,
+        "Observed\nm/z": np.round((sample["mass"].values + (z - 1) * proton) / z, 4),
+        "z": z,
+        observed_mz: np.round(sample["mass"].values, 4),
+        starting_position_column_name: sample[starting_position_column_name].values,
+        "Score": score,
+        protein_column_name: proteins,
+        "Comment": ["{}.{}.{}.{}".format(os.path.splitext(raw_file)[0], s, s, c) for s, c in zip(scans, z)],
+        "Scan #": [scan_template.format(s) for s in scans],
+        rt: np.round(scans / 400, 4),
+    })
+    unmatched = rng.choice(np.arange(1, minimum_scan), min(minimum_scan - 1, max(1, psms // 10)), replace=False)
+    area_scans = np.sort(np.concatenate([scans, unmatched]))
+    area = rng.lognormal(14, 2, len(area_scans))
+    area[rng.random(len(area_scans)) < 0.05] = np.nan
+    areas = pd.DataFrame({"First Scan": area_scans, "Spectrum File": raw_file, "Area": area})
+    return spectra, areas
+
+
+def generate_dataset(psms=1000, runs=1, proteins=None, seed=0, analysis="O-glycan", decoy_fraction=0.05):
+    """
+    Generate synthetic Byonic Spectra sheets and area tables.
+
+    :param psms: number of PSMs per run
+    :param runs: number of runs
+    :param proteins: number of target proteins, scaled with psms when not given
+    :param analysis: O-glycan or N-glycan, selecting the glycosylation motifs and glycan compositions
+    :return: list of dictionaries with spectra, area, replicate_id and condition_id for each run
+    """
+    rng = np.random.default_rng(seed)
+    if proteins is None:
+        proteins = max(5, psms // 200)
+    headers = protein_headers(rng, proteins)
+    variants = peptide_variants(rng, headers, analysis=analysis)
+    dataset = []
+    for i in range(runs):
+        condition_id = "AB"[i % 2]
+        replicate_id = "R{}".format(i // 2 + 1)
+        spectra, area = generate_run(rng, headers, variants, psms, "synthetic_{:02d}.raw".format(i),
+                                     decoy_fraction)
+        dataset.append({"spectra": spectra, "area": area, "replicate_id": replicate_id,
+                        "condition_id": condition_id})
+    return dataset
+
+
+def write_dataset(directory, psms=1000, runs=1, proteins=None, seed=0, analysis="O-glycan", decoy_fraction=0.05):
+    """
+    Generate a dataset and write it as Byonic xlsx exports and tab separated area files.
+    :return: component list that can be passed to GlypnirO.add_batch_component
+    """
+    os.makedirs(directory, exist_ok=True)
+    component_list = []
+    for i, run in enumerate(generate_dataset(psms, runs, proteins, seed, analysis, decoy_fraction)):
+        filename = os.path.join(directory, "synthetic_{:02d}_Byonic.xlsx".format(i))
+        area_filename = os.path.join(directory, "synthetic_{:02d}_MSnSpectrumInfo.txt".format(i))
+        run["spectra"].to_excel(filename, sheet_name="Spectra", index=False)
+        run["area"].to_csv(area_filename, sep="\t", index=False)
+        component_list.append({"filename": filename, "area_filename": area_filename,
+                               "replicate_id": run["replicate_id"], "condition_id": run["condition_id"]})
+    return component_list
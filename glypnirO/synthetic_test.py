@@ -0,0 +1,33 @@
+import unittest
+
+from glypnirO.common import sequence_column_name, glycans_column_name, protein_column_name, GlypnirOComponent
+from glypnirO.synthetic import generate_dataset
+
+
+class SyntheticTestCase(unittest.TestCase):
+    def test_generate_dataset(self):
+        dataset = generate_dataset(psms=400, runs=3, seed=1)
+        self.assertEqual([(r["condition_id"], r["replicate_id"]) for r in dataset],
+                         [("A", "R1"), ("B", "R1"), ("A", "R2")])
+        spectra = dataset[0]["spectra"]
+        self.assertEqual(len(spectra.index), 400)
+        self.assertTrue(spectra[protein_column_name].str.startswith(">Reverse").any())
+        self.assertTrue(spectra[protein_column_name].str.endswith("(Common contaminant protein)").any())
+        self.assertTrue(spectra[glycans_column_name].notnull().any())
+        self.assertTrue(spectra["Scan #"].str.extract(r"scan=(\d+)", expand=False).astype(int)
+                        .isin(dataset[0]["area"]["First Scan"]).all())
+        self.assertEqual(spectra[sequence_column_name].nunique() < 400, True)
+
+    def test_generated_glycans_are_assigned(self):
+        for analysis in ("O-glycan", "N-glycan"):
+            dataset = generate_dataset(psms=300, seed=2, analysis=analysis)
+            spectra = dataset[0]["spectra"]
+            protein = spectra[protein_column_name].iloc[0].lstrip(">").split(" ")[0]
+            component = GlypnirOComponent(spectra, dataset[0]["area"], "R1", "A", protein, trust_byonic=True)
+            component.process()
+            glycosylated = component.data[component.data[glycans_column_name].notnull()]
+            self.assertTrue((glycosylated["position_to_glycan"] != "").all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,11 @@
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from io import StringIO
+
 import requests
 import re
 
@@ -22,6 +30,14 @@ class UniprotSequence:
         return self.accession + self.isotype
 
 
+fasta_header_regex = re.compile("^(?P<db>sp|tr)\\|(?P<accession>[^|]+)\\|(?P<entry_name>\\S+)\\s*(?P<description>.*)$")
+fasta_field_regex = re.compile("\\s(OS|OX|GN|PE|SV)=")
+tab_columns = ["id", "entry name", "reviewed", "protein names", "genes", "organism", "length", "database(RefSeq)",
+               "organism-id", "go-id", "go(cellular component)", "comment(SUBCELLULAR LOCATION)",
+               "feature(TOPOLOGICAL_DOMAIN)", "feature(GLYCOSYLATION)", "comment(MASS SPECTROMETRY)",
+               "sequence", "feature(ALTERNATIVE SEQUENCE)", "comment(ALTERNATIVE PRODUCTS)"]
+
+
 class UniprotParser:
     base_url = "https://www.uniprot.org/uploadlists/"
     headers = {
@@ -51,10 +67,7 @@ class UniprotParser:
                 "format": format
             }
         if format == "tab":
-            base_dict["columns"] = "id,entry name,reviewed,protein names,genes,organism,length,database(RefSeq)," \
-                                   "organism-id,go-id,go(cellular component),comment(SUBCELLULAR LOCATION)," \
-                                   "feature(TOPOLOGICAL_DOMAIN),feature(GLYCOSYLATION),comment(MASS SPECTROMETRY)," \
-                                   "sequence,feature(ALTERNATIVE SEQUENCE),comment(ALTERNATIVE PRODUCTS) "
+            base_dict["columns"] = ",".join(tab_columns) + " "
         if include_isoform:
             base_dict["include"] = "yes"
         return base_dict
@@ -75,6 +88,300 @@ class UniprotParser:
             yield self.get(params).text
 
 
+class UniprotCache:
+    """
+    Persistent SQLite cache of UniProt tab records keyed by accession. Each record holds the tab columns requested
+    by UniprotParser.create_params and expires after ttl seconds. Accessions UniProt did not return, e.g. obsolete
+    ones, are stored as negative entries with the same expiry so they are not requested again.
+    """
+    def __init__(self, path, ttl=30*24*60*60):
+        """
+        :param path: SQLite database file, created if it does not exist
+        :param ttl: number of seconds a record is considered fresh, None for no expiry
+        """
+        self.path = path
+        self.ttl = ttl
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS records "
+                                "(accession TEXT PRIMARY KEY, data TEXT NOT NULL, fetched REAL NOT NULL)")
+        self.connection.commit()
+
+    def _oldest(self, now=None):
+        if self.ttl is None:
+            return 0
+        if now is None:
+            now = time.time()
+        return now - self.ttl
+
+    def get(self, acc_list, now=None):
+        """
+        Bulk lookup of fresh records.
+        :param acc_list: iterable of accessions
+        :return: dictionary of accession to record dictionary for every accession found in the cache, None for
+        negative entries
+        """
+        acc_list = list(set(str(a) for a in acc_list))
+        oldest = self._oldest(now)
+        result = {}
+        for i in range(0, len(acc_list), 500):
+            chunk = acc_list[i: i + 500]
+            rows = self.connection.execute(
+                "SELECT accession, data FROM records WHERE fetched >= ? AND accession IN ({})".format(
+                    ",".join("?" * len(chunk))), [oldest] + chunk)
+            for accession, data in rows:
+                result[accession] = json.loads(data)
+        return result
+
+    def missing(self, acc_list, now=None):
+        """
+        Return the accessions in acc_list without a fresh record, in input order.
+        """
+        found = self.get(acc_list, now)
+        return [a for a in acc_list if str(a) not in found]
+
+    def update(self, records, now=None):
+        """
+        :param records: iterable of (accession, record dictionary) pairs
+        """
+        if now is None:
+            now = time.time()
+        self.connection.executemany("INSERT OR REPLACE INTO records (accession, data, fetched) VALUES (?, ?, ?)",
+                                    ((str(a), json.dumps(r, default=str), now) for a, r in records))
+        self.connection.commit()
+
+    def update_missing(self, acc_list, now=None):
+        """
+        Store negative entries for accessions UniProt returned no record for.
+        """
+        self.update(((a, None) for a in acc_list), now)
+
+    def update_frame(self, frame, now=None):
+        """
+        Store every row of a parsed tab result. Rows are keyed by their Entry as well as every accession of the
+        query column so that secondary accessions and isoforms are also served from the cache.
+        """
+        records = []
+        for r in frame.to_dict("records"):
+            keys = set()
+            if isinstance(r.get("Entry"), str):
+                keys.add(r["Entry"])
+            if isinstance(r.get("query"), str):
+                keys.update(a.strip() for a in r["query"].split(",") if a.strip())
+            for k in keys:
+                records.append((k, r))
+        self.update(records, now)
+
+    def expire(self, now=None):
+        """
+        Delete records older than the ttl.
+        """
+        self.connection.execute("DELETE FROM records WHERE fetched < ?", [self._oldest(now)])
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def default_index_path(dump_path):
+    """
+    Index file next to the dump, or named after the absolute dump path in $XDG_CACHE_HOME/glypnirO, ~/.cache/glypnirO
+    by default, when the dump is in a read only or shared directory.
+    """
+    directory = os.path.dirname(os.path.abspath(dump_path))
+    if os.access(directory, os.W_OK):
+        return dump_path + ".index.sqlite"
+    cache_directory = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                                   "glypnirO")
+    os.makedirs(cache_directory, exist_ok=True)
+    digest = hashlib.sha256(os.path.abspath(dump_path).encode()).hexdigest()[:16]
+    return os.path.join(cache_directory, "{}.{}.index.sqlite".format(os.path.basename(dump_path), digest))
+
+
+class UniprotIndex:
+    """
+    Accession index over a local UniProt dump, either a tab separated download with an Entry column or a FASTA file
+    with UniProt style headers. The index is a SQLite file built once next to the dump and rebuilt whenever the dump
+    changes.
+    """
+    def __init__(self, dump_path, index_path=None, rebuild=False):
+        """
+        :param index_path: SQLite index file, next to the dump when its directory is writable and in the user cache
+        directory otherwise
+        """
+        self.dump_path = dump_path
+        if index_path is None:
+            index_path = default_index_path(dump_path)
+        self.index_path = index_path
+        self.connection = sqlite3.connect(index_path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS records (accession TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if rebuild or self._stale():
+            self.build()
+
+    def _signature(self):
+        stat = os.stat(self.dump_path)
+        return "{}:{}".format(stat.st_size, stat.st_mtime_ns)
+
+    def _stale(self):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        return row is None or row[0] != self._signature()
+
+    def build(self):
+        self.connection.execute("DELETE FROM records")
+        with open(self.dump_path, "rt") as dump:
+            first = dump.readline()
+            dump.seek(0)
+            if first.startswith(">"):
+                records = self._read_fasta(dump)
+            else:
+                records = self._read_tab(dump)
+            self.connection.executemany("INSERT OR REPLACE INTO records (accession, data) VALUES (?, ?)",
+                                        ((r["Entry"], json.dumps(r)) for r in records))
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)",
+                                [self._signature()])
+        self.connection.commit()
+
+    @staticmethod
+    def _read_tab(dump):
+        for r in csv.DictReader(dump, delimiter="\t"):
+            if r.get("Entry"):
+                yield r
+
+    @staticmethod
+    def _parse_fasta_header(header):
+        match = fasta_header_regex.search(header)
+        if not match:
+            return {"Entry": header.split()[0], "Protein names": header}
+        record = {"Entry": match.group("accession"), "Entry name": match.group("entry_name"),
+                  "Status": "reviewed" if match.group("db") == "sp" else "unreviewed"}
+        fields = fasta_field_regex.split(" " + match.group("description"))
+        record["Protein names"] = fields[0].strip()
+        for k, v in zip(fields[1::2], fields[2::2]):
+            v = v.strip()
+            if k == "OS":
+                record["Organism"] = v
+            elif k == "OX":
+                record["Organism ID"] = v
+            elif k == "GN":
+                record["Gene names"] = v
+        return record
+
+    def _read_fasta(self, dump):
+        record = None
+        sequence = []
+        for line in dump:
+            line = line.strip()
+            if line.startswith(">"):
+                if record:
+                    record["Sequence"] = "".join(sequence)
+                    record["Length"] = len(record["Sequence"])
+                    yield record
+                record = self._parse_fasta_header(line[1:])
+                sequence = []
+            elif line:
+                sequence.append(line)
+        if record:
+            record["Sequence"] = "".join(sequence)
+            record["Length"] = len(record["Sequence"])
+            yield record
+
+    def get(self, acc_list):
+        """
+        Bulk lookup of accessions. Isoform accessions missing from the dump fall back to their canonical entry.
+        :return: dictionary of queried accession to record dictionary
+        """
+        acc_list = [str(a) for a in acc_list]
+        keys = set(acc_list)
+        for a in acc_list:
+            match = acc_regex.search(a)
+            if match:
+                keys.add(match.group("accession"))
+        keys = list(keys)
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i: i + 500]
+            rows = self.connection.execute("SELECT accession, data FROM records WHERE accession IN ({})".format(
+                ",".join("?" * len(chunk))), chunk)
+            for accession, data in rows:
+                found[accession] = json.loads(data)
+        result = {}
+        for a in acc_list:
+            if a in found:
+                result[a] = found[a]
+            else:
+                match = acc_regex.search(a)
+                if match and match.group("accession") in found:
+                    result[a] = found[match.group("accession")]
+        return result
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class UniprotLocalParser(UniprotParser):
+    """
+    Drop-in replacement for UniprotParser answering from a UniprotIndex instead of uniprot.org. parse yields the same
+    tab text chunks, including the trailing query column, so it can be consumed exactly like the online results.
+    Accessions missing from the dump get a tab row with the accession as Entry and Protein names, and are collected in
+    missing so they can be told apart from real records.
+    """
+    def __init__(self, acc_list, unique=False, index=None):
+        super().__init__(acc_list, unique)
+        self.index = index
+        self.missing = set()
+
+    def get(self, params):
+        acc_list = params["query"].split()
+        found = self.index.get(acc_list)
+        entries = {}
+        for a in acc_list:
+            if a in found:
+                record = found[a]
+                if record["Entry"] not in entries:
+                    entries[record["Entry"]] = (record, [])
+                entries[record["Entry"]][1].append(a)
+        output = StringIO()
+        if params["format"] == "tab":
+            for a in acc_list:
+                if a not in found and a not in entries:
+                    entries[a] = ({"Entry": a, "Protein names": a}, [a])
+                    self.missing.add(a)
+            columns = ["Entry", "Protein names"]
+            for record, _ in entries.values():
+                for k in record:
+                    if k not in columns and k != "query":
+                        columns.append(k)
+            writer = csv.writer(output, delimiter="\t", lineterminator="\n")
+            writer.writerow(columns + ["yourlist"])
+            for record, queries in entries.values():
+                writer.writerow([record.get(c, "") for c in columns] + [",".join(queries)])
+        else:
+            for record, _ in entries.values():
+                output.write(">{}|{}|{} {}\n".format("sp" if record.get("Status") == "reviewed" else "tr",
+                                                    record["Entry"], record.get("Entry name", ""),
+                                                    record.get("Protein names", "")))
+                sequence = record.get("Sequence", "")
+                for i in range(0, len(sequence), 60):
+                    output.write(sequence[i: i + 60] + "\n")
+        return LocalResponse(output.getvalue())
+
+
+class LocalResponse:
+    def __init__(self, text):
+        self.text = text
+
 
 if __name__ == "__main__":
     import pandas as pd
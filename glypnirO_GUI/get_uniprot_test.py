@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from io import StringIO
+
+import pandas as pd
+
+from glypnirO_GUI.get_uniprot import UniprotCache, UniprotIndex, UniprotLocalParser
+
+fasta_dump = """>sp|P02649|APOE_HUMAN Apolipoprotein E OS=Homo sapiens OX=9606 GN=APOE PE=1 SV=1
+MKVLWAALLVTFLAGCQAKVEQAVETEPEPELRQQTEWQSGQRWELALGRFWDYLRWVQT
+LSEQVQEELLSSQVTQELRALMDETMKELKAYKSELEEQLTPVAEETRARLSKELQAAQA
+>tr|A0A024R161|A0A024R161_HUMAN Guanine nucleotide-binding protein subunit gamma OS=Homo sapiens OX=9606 GN=DNAJC25-GNG10 PE=3 SV=1
+MGAPLLSPGWGAGAAGRRWWMLLAPLLPALLLVRPAGALVEGLYCGTRDCYEVLGVSRSA
+"""
+
+
+class UniprotCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "uniprot.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_update_frame_and_get(self):
+        frame = pd.DataFrame([{"Entry": "P02649", "Protein names": "Apolipoprotein E", "Length": 317,
+                               "query": "P02649,P02649-2"}])
+        with UniprotCache(self.path) as cache:
+            cache.update_frame(frame)
+        with UniprotCache(self.path) as cache:
+            found = cache.get(["P02649", "P02649-2", "P01024"])
+            self.assertEqual(set(found), {"P02649", "P02649-2"})
+            self.assertEqual(found["P02649"]["Protein names"], "Apolipoprotein E")
+            self.assertEqual(cache.missing(["P02649", "P01024"]), ["P01024"])
+
+    def test_ttl(self):
+        with UniprotCache(self.path, ttl=10) as cache:
+            cache.update([("P02649", {"Entry": "P02649"})], now=100)
+            self.assertIn("P02649", cache.get(["P02649"], now=105))
+            self.assertNotIn("P02649", cache.get(["P02649"], now=111))
+            cache.expire(now=111)
+            self.assertEqual(cache.connection.execute("SELECT COUNT(*) FROM records").fetchone()[0], 0)
+
+
+class UniprotIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "wt") as f:
+            f.write(content)
+        return path
+
+    def test_fasta_index(self):
+        path = self.write("dump.fasta", fasta_dump)
+        with UniprotIndex(path) as index:
+            found = index.get(["P02649", "P02649-2", "A0A024R161", "P01024"])
+            self.assertEqual(set(found), {"P02649", "P02649-2", "A0A024R161"})
+            self.assertEqual(found["P02649"]["Protein names"], "Apolipoprotein E")
+            self.assertEqual(found["P02649"]["Gene names"], "APOE")
+            self.assertEqual(found["P02649"]["Length"], 120)
+            self.assertEqual(found["A0A024R161"]["Status"], "unreviewed")
+        self.assertTrue(os.path.exists(path + ".index.sqlite"))
+
+    def test_index_path(self):
+        path = self.write("dump.tab", "Entry\tProtein names\nP02649\tApolipoprotein E\n")
+        index_path = os.path.join(self.directory.name, "elsewhere.sqlite")
+        with UniprotIndex(path, index_path) as index:
+            self.assertIn("P02649", index.get(["P02649"]))
+        self.assertTrue(os.path.exists(index_path))
+        cache_directory = os.path.join(self.directory.name, "cache")
+        with mock.patch("glypnirO_GUI.get_uniprot.os.access", return_value=False), \
+                mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_directory}):
+            with UniprotIndex(path) as index:
+                self.assertIn("P02649", index.get(["P02649"]))
+                self.assertEqual(os.path.dirname(index.index_path), os.path.join(cache_directory, "glypnirO"))
+        self.assertFalse(os.path.exists(path + ".index.sqlite"))
+
+    def test_tab_index_rebuilds_on_change(self):
+        path = self.write("dump.tab", "Entry\tProtein names\nP02649\tApolipoprotein E\n")
+        UniprotIndex(path).close()
+        os.utime(path, ns=(0, 0))
+        self.write("dump.tab", "Entry\tProtein names\nP01024\tComplement C3\n")
+        with UniprotIndex(path) as index:
+            self.assertEqual(set(index.get(["P02649", "P01024"])), {"P01024"})
+
+    def test_local_parser_matches_online_format(self):
+        path = self.write("dump.fasta", fasta_dump)
+        with UniprotIndex(path) as index:
+            parser = UniprotLocalParser(["P02649", "P01024"], True, index)
+            frames = [pd.read_csv(StringIO(i), sep="\t") for i in parser.parse("tab")]
+        frame = frames[0].rename(columns={frames[0].columns[-1]: "query"})
+        self.assertEqual(list(frame["Entry"]), ["P02649", "P01024"])
+        self.assertEqual(list(frame["query"]), ["P02649", "P01024"])
+        self.assertEqual(list(frame["Protein names"]), ["Apolipoprotein E", "P01024"])
+
+    def test_local_parser_all_missing(self):
+        path = self.write("dump.fasta", fasta_dump)
+        with UniprotIndex(path) as index:
+            parser = UniprotLocalParser(["P01024", "Q99999"], True, index)
+            frame = pd.concat([pd.read_csv(StringIO(i), sep="\t") for i in parser.parse("tab")])
+        self.assertEqual(list(frame.columns), ["Entry", "Protein names", "yourlist"])
+        self.assertEqual(set(frame["Entry"]), {"P01024", "Q99999"})
+        self.assertEqual(set(frame["Protein names"]), {"P01024", "Q99999"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 from glypnirO.common import GlypnirO
 
 
-def create_experiment(fasta_file):
-    return GlypnirO(fasta_file)
\ No newline at end of file
+def create_experiment(*, trust_byonic=False, get_uniprot=False):
+    return GlypnirO(trust_byonic=trust_byonic, get_uniprot=get_uniprot)
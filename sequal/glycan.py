@@ -0,0 +1,207 @@
+import os
+import re
+import tempfile
+import zipfile
+
+import numpy as np
+
+from sequal.resources import glycan_block_dict
+
+composition_regex = re.compile(r"(\w+)\((\d+)\)")
+tolerance_units = {"ppm", "da"}
+default_bounds = {"HexNAc": (0, 7),
+                  "Hex": (0, 12),
+                  "Fuc": (0, 4),
+                  "NeuAc": (0, 4),
+                  "NeuGc": (0, 2),
+                  "Sulfo": (0, 2),
+                  "Phospho": (0, 2),
+                  "Pent": (0, 2)}
+
+
+def parse_composition(composition):
+    """
+    Monosaccharide counts of a composition string such as HexNAc(2)Hex(5)
+    :rtype: dict
+    """
+    counts = {}
+    for name, amount in composition_regex.findall(composition):
+        counts[name] = counts.get(name, 0) + int(amount)
+    return counts
+
+
+def composition_mass(composition, mass_dict=None):
+    """
+    Mass of a composition string from the monosaccharide masses of glycan_block_dict or mass_dict
+    """
+    if mass_dict is None:
+        mass_dict = glycan_block_dict
+    return sum(mass_dict[name]*int(amount) for name, amount in composition_regex.findall(composition))
+
+
+def tolerance_window(masses, tolerance, unit="ppm"):
+    """
+    Half width of the matching window around each mass.
+    :param unit: ppm of the mass or da for an absolute tolerance
+    """
+    unit = unit.lower()
+    if unit not in tolerance_units:
+        raise ValueError("Tolerance unit {} is not one of ppm or da.".format(unit))
+    masses = np.asarray(masses, dtype=float)
+    if unit == "ppm":
+        return np.abs(masses) * tolerance * 1e-6
+    return np.full(masses.shape, float(tolerance))
+
+
+def npz_path(path):
+    """
+    Path with the .npz suffix that numpy adds when saving to a path without it.
+    """
+    path = os.fspath(path)
+    if not path.endswith(".npz"):
+        path += ".npz"
+    return path
+
+
+class GlycanCompositionDatabase:
+    """
+    Every glycan composition within per monosaccharide count bounds, stored as a mass sorted array of masses and a
+    matching array of monosaccharide count vectors. Mass queries are answered for whole arrays of masses at once with
+    binary search. The database can be cached on disk as an npz file and is only rebuilt when its bounds change.
+    """
+    def __init__(self, bounds=None, mass_dict=None, max_mass=None, cache_path=None):
+        """
+        :param bounds: dictionary of monosaccharide name to (minimum, maximum) count, default_bounds when not given
+        :type bounds: dict
+        :param mass_dict: monosaccharide masses, glycan_block_dict when not given
+        :param max_mass: compositions heavier than this are left out
+        :param cache_path: npz file the database is loaded from, or written to when missing or built with other bounds,
+        .npz is added when the path lacks it
+        """
+        if bounds is None:
+            bounds = default_bounds
+        if mass_dict is None:
+            mass_dict = glycan_block_dict
+        for name, (low, high) in bounds.items():
+            if name not in mass_dict:
+                raise ValueError("Monosaccharide {} has no mass.".format(name))
+            if not 0 <= low <= high <= 255:
+                raise ValueError("Bounds of {} must satisfy 0 <= minimum <= maximum <= 255.".format(name))
+        self.names = list(bounds)
+        self.bounds = np.array([bounds[n] for n in self.names], dtype=np.int64).reshape(-1, 2)
+        self.block_masses = np.array([mass_dict[n] for n in self.names], dtype=float)
+        self.max_mass = max_mass
+        if cache_path is not None:
+            cache_path = npz_path(cache_path)
+        if cache_path is not None and os.path.exists(cache_path) and self.load(cache_path):
+            return
+        self.masses, self.counts = self.enumerate()
+        if cache_path is not None:
+            self.save(cache_path)
+
+    def enumerate(self):
+        """
+        Build the composition arrays one monosaccharide at a time, dropping partial compositions above max_mass as
+        soon as they exceed it. The empty composition is left out.
+        :return: mass sorted masses and count vectors
+        """
+        masses = np.zeros(1)
+        counts = np.zeros((1, 0), dtype=np.uint8)
+        for k, (low, high) in enumerate(self.bounds):
+            amounts = np.arange(low, high + 1, dtype=np.uint8)
+            masses = (masses[:, None] + amounts[None, :] * self.block_masses[k]).ravel()
+            counts = np.hstack([np.repeat(counts, len(amounts), axis=0),
+                                np.tile(amounts, len(counts))[:, None]])
+            if self.max_mass is not None:
+                keep = masses <= self.max_mass
+                masses = masses[keep]
+                counts = counts[keep]
+        keep = counts.any(axis=1)
+        masses = masses[keep]
+        counts = counts[keep]
+        order = np.argsort(masses, kind="stable")
+        return masses[order], counts[order]
+
+    def _signature(self):
+        max_mass = np.nan if self.max_mass is None else self.max_mass
+        return np.array(self.names), self.bounds, self.block_masses, np.array(max_mass, dtype=float)
+
+    def save(self, path):
+        """
+        Write the arrays to a temporary file next to path and move it into place, so a partly written file is never
+        loaded.
+        """
+        path = npz_path(path)
+        names, bounds, block_masses, max_mass = self._signature()
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, masses=self.masses, counts=self.counts, names=names, bounds=bounds,
+                                    block_masses=block_masses, max_mass=max_mass)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def load(self, path):
+        """
+        Load the arrays cached at path if they were built with the same monosaccharides, bounds and maximum mass.
+        :return: whether the cache was used
+        """
+        try:
+            cached = np.load(npz_path(path))
+        except (OSError, ValueError, zipfile.BadZipFile):
+            return False
+        with cached:
+            for key, value in zip(("names", "bounds", "block_masses", "max_mass"), self._signature()):
+                if key not in cached or not np.array_equal(cached[key], value, equal_nan=value.dtype.kind == "f"):
+                    return False
+            self.masses = cached["masses"]
+            self.counts = cached["counts"]
+        return True
+
+    def __len__(self):
+        return len(self.masses)
+
+    def composition(self, index):
+        """
+        Composition string of the composition at index, e.g. HexNAc(2)Hex(5)
+        """
+        return "".join("{}({})".format(n, c) for n, c in zip(self.names, self.counts[index]) if c)
+
+    def window(self, masses, tolerance, unit="ppm"):
+        """
+        Index range [lower, upper) of the compositions within the tolerance of each query mass.
+        """
+        masses = np.asarray(masses, dtype=float)
+        delta = tolerance_window(masses, tolerance, unit)
+        lower = np.searchsorted(self.masses, masses - delta, side="left")
+        upper = np.searchsorted(self.masses, masses + delta, side="right")
+        return lower, upper
+
+    def query(self, masses, tolerance, unit="ppm"):
+        """
+        Every (query, composition) pair within the tolerance.
+        :return: query index and composition index arrays of the same length, ordered by query then mass
+        """
+        lower, upper = self.window(masses, tolerance, unit)
+        lengths = upper - lower
+        query = np.repeat(np.arange(len(lengths)), lengths)
+        starts = np.repeat(lower - np.cumsum(lengths) + lengths, lengths)
+        return query, starts + np.arange(len(query))
+
+    def closest(self, masses, tolerance, unit="ppm"):
+        """
+        Index of the composition closest in mass to each query mass, -1 where none is within the tolerance.
+        """
+        masses = np.asarray(masses, dtype=float)
+        closest = np.full(len(masses), -1, dtype=np.int64)
+        if len(self.masses) == 0:
+            return closest
+        position = np.searchsorted(self.masses, masses)
+        left = np.clip(position - 1, 0, len(self.masses) - 1)
+        right = np.clip(position, 0, len(self.masses) - 1)
+        pick = np.where(np.abs(self.masses[left] - masses) <= np.abs(self.masses[right] - masses), left, right)
+        found = np.abs(self.masses[pick] - masses) <= tolerance_window(masses, tolerance, unit)
+        closest[found] = pick[found]
+        return closest
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from sequal.glycan import GlycanCompositionDatabase, composition_mass, parse_composition
+
+bounds = {"HexNAc": (0, 4), "Hex": (0, 6), "Fuc": (0, 2), "NeuAc": (0, 2)}
+
+
+class GlycanCompositionDatabaseCase(unittest.TestCase):
+    def test_enumerate(self):
+        db = GlycanCompositionDatabase(bounds)
+        self.assertEqual(len(db), 5 * 7 * 3 * 3 - 1)
+        self.assertTrue(np.all(np.diff(db.masses) >= 0))
+        for i in (0, 100, len(db) - 1):
+            self.assertAlmostEqual(composition_mass(db.composition(i)), db.masses[i])
+        limited = GlycanCompositionDatabase(bounds, max_mass=1000)
+        self.assertEqual(len(limited), np.sum(db.masses <= 1000))
+        self.assertEqual(parse_composition("HexNAc(2)Hex(5)"), {"HexNAc": 2, "Hex": 5})
+
+    def test_query(self):
+        db = GlycanCompositionDatabase(bounds)
+        masses = np.array([composition_mass("HexNAc(2)Hex(5)"), composition_mass("HexNAc(1)Hex(1)NeuAc(1)") + 0.5,
+                           100.0])
+        query, found = db.query(masses, 10, "ppm")
+        expected = [(q, i) for q in range(len(masses)) for i in range(len(db))
+                    if abs(db.masses[i] - masses[q]) <= masses[q] * 10e-6]
+        self.assertEqual(list(zip(query, found)), expected)
+        self.assertEqual(db.composition(db.closest(masses, 10)[0]), "HexNAc(2)Hex(5)")
+        self.assertEqual(list(db.closest(masses, 10)[1:]), [-1, -1])
+        self.assertNotEqual(db.closest(masses, 0.6, "da")[1], -1)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "glycans.npz")
+            db = GlycanCompositionDatabase(bounds, cache_path=path)
+            self.assertTrue(os.path.exists(path))
+            cached = GlycanCompositionDatabase(bounds, cache_path=path)
+            np.testing.assert_array_equal(db.counts, cached.counts)
+            smaller = GlycanCompositionDatabase({"HexNAc": (0, 2)}, cache_path=path)
+            self.assertEqual(len(smaller), 2)
+
+    def test_cache_path_without_suffix(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "glycans")
+            db = GlycanCompositionDatabase(bounds, cache_path=path)
+            self.assertEqual(os.listdir(directory), ["glycans.npz"])
+            with mock.patch.object(GlycanCompositionDatabase, "enumerate") as enumerate:
+                cached = GlycanCompositionDatabase(bounds, cache_path=path)
+            enumerate.assert_not_called()
+            np.testing.assert_array_equal(db.masses, cached.masses)
+            with open(path + ".npz", "wb") as f:
+                f.write(b"partial")
+            rebuilt = GlycanCompositionDatabase(bounds, cache_path=path)
+            np.testing.assert_array_equal(db.masses, rebuilt.masses)
+
+
+if __name__ == '__main__':
+    unittest.main()
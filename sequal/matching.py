@@ -0,0 +1,164 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from sequal import resources
+from sequal.glycan import composition_regex, composition_mass, tolerance_window
+from sequal.mass_spectrometry import by
+from sequal.sequence import Sequence, parse_sequence
+
+water = resources.H*2 + resources.O
+# m/z shift of each ion type from the b (left) or y (right) ion of the same cleavage
+ion_offsets = {"a": -27.9949146, "b": 0.0, "c": 17.0265491, "x": 25.9792649, "y": 0.0, "z": -17.0265491}
+result_fields = ["matched", "ions", "matched_intensity", "total_intensity"]
+
+
+def modification_mass(mod):
+    """
+    Mass of a modification, its value is used as the mass when no mass is set and the value is a number such as the
+    +203.079 of a Byonic peptide, or a glycan composition such as HexNAc(1)
+    """
+    if mod.mass:
+        return mod.mass
+    try:
+        return float(mod.value)
+    except (TypeError, ValueError):
+        if isinstance(mod.value, str) and composition_regex.search(mod.value):
+            return composition_mass(mod.value)
+        raise ValueError("Modification {} has no mass.".format(mod.value))
+
+
+def residue_masses(sequence, keep_labile=True):
+    """
+    Mass of every residue of a sequence with its modifications.
+    :param keep_labile: count labile modifications, they are left out when the fragments are expected to lose them
+    """
+    masses = np.empty(len(sequence))
+    for n, aa in enumerate(sequence):
+        if not aa.mass:
+            raise ValueError("Block {} mass is not available.".format(aa.value))
+        mass = aa.mass
+        for mod in aa.mods:
+            if keep_labile or not mod.labile:
+                mass += modification_mass(mod)
+        masses[n] = mass
+    return masses
+
+
+def fragment_ladder(sequence, fragment_type=by, charges=(1,), keep_labile=True):
+    """
+    Theoretical m/z of the fragment ions of every cleavage, the same values as Ion.mz_calculate of the ions from
+    fragment_non_labile, without water for the left ions and with water for the right ions, computed with cumulative
+    sums instead of one Ion per fragment.
+    :param sequence: Sequence or sequence string
+    :param fragment_type: pair of left and right ion types such as by
+    :return: m/z array ordered by charge, ion type then fragment number
+    """
+    if not isinstance(sequence, Sequence):
+        sequence = parse_sequence(sequence)
+    masses = residue_masses(sequence, keep_labile)
+    left = np.cumsum(masses)[:-1]
+    right = masses.sum() - left + water
+    ladders = []
+    for charge in charges:
+        for ion_type, neutral in ((fragment_type[0], left), (fragment_type[1], right[::-1])):
+            ladders.append((neutral + ion_offsets[ion_type] + charge*resources.proton)/charge)
+    return np.concatenate(ladders) if ladders else np.array([])
+
+
+def match_peaks(theoretical, mz, tolerance=20, unit="ppm"):
+    """
+    Closest peak to every theoretical m/z within the tolerance.
+    :param mz: sorted peak m/z array
+    :return: peak index of each theoretical m/z, -1 where no peak is within the tolerance
+    """
+    theoretical = np.asarray(theoretical, dtype=float)
+    matched = np.full(len(theoretical), -1, dtype=np.int64)
+    if len(mz) == 0:
+        return matched
+    position = np.searchsorted(mz, theoretical)
+    left = np.clip(position - 1, 0, len(mz) - 1)
+    right = np.clip(position, 0, len(mz) - 1)
+    pick = np.where(np.abs(mz[left] - theoretical) <= np.abs(mz[right] - theoretical), left, right)
+    found = np.abs(mz[pick] - theoretical) <= tolerance_window(theoretical, tolerance, unit)
+    matched[found] = pick[found]
+    return matched
+
+
+def _peaks(spectrum):
+    if isinstance(spectrum, tuple):
+        mz, intensity = spectrum
+    else:
+        mz, intensity = spectrum.mz, spectrum.intensity
+    mz = np.asarray(mz, dtype=float)
+    intensity = np.asarray(intensity, dtype=float)
+    if len(mz) > 1 and np.any(np.diff(mz) < 0):
+        order = np.argsort(mz, kind="stable")
+        mz = mz[order]
+        intensity = intensity[order]
+    return mz, intensity
+
+
+def score_candidate(sequence, spectrum, fragment_type=by, charges=(1,), tolerance=20, unit="ppm", keep_labile=True):
+    """
+    Match the fragment ladder of a candidate peptide to a spectrum.
+    :param spectrum: Spectrum or (mz, intensity) tuple
+    :return: matched ion count, theoretical ion count, intensity of the matched peaks and total intensity
+    """
+    mz, intensity = _peaks(spectrum)
+    theoretical = fragment_ladder(sequence, fragment_type, charges, keep_labile)
+    matched = match_peaks(theoretical, mz, tolerance, unit)
+    peaks = np.unique(matched[matched >= 0])
+    return int(np.sum(matched >= 0)), len(theoretical), float(intensity[peaks].sum()), float(intensity.sum())
+
+
+def _score_chunk(args):
+    candidates, options = args
+    return [score_candidate(sequence, spectrum, **options) for sequence, spectrum in candidates]
+
+
+def candidate_spectra(scans, spectra):
+    """
+    Spectrum of every candidate from a stream of spectra in any order, e.g. SpectrumIndex.fetch of the candidate
+    scans, which yields every scan once and in file order.
+    :param scans: scan number of each candidate
+    :param spectra: iterable of Spectrum objects with scan numbers
+    :return: list in candidate order, None where the scan was not found
+    """
+    by_scan = {spectrum.scan: spectrum for spectrum in spectra}
+    return [by_scan.get(int(scan)) if scan is not None and scan == scan else None for scan in scans]
+
+
+def match_candidates(sequences, spectra, fragment_type=by, charges=(1,), tolerance=20, unit="ppm", keep_labile=True,
+                     workers=None, chunk_size=1000):
+    """
+    Score a batch of candidate peptides against their spectra, in a process pool when workers is given.
+    :param sequences: candidate sequence strings or Sequence objects
+    :param spectra: Spectrum or (mz, intensity) of each candidate in candidate order, None where the spectrum is
+    missing, see candidate_spectra for spectra streamed from a file
+    :param chunk_size: candidates sent to a worker at a time
+    :return: dictionary of result_fields to arrays in candidate order
+    """
+    options = {"fragment_type": fragment_type, "charges": charges, "tolerance": tolerance, "unit": unit,
+               "keep_labile": keep_labile}
+    sequences = list(sequences)
+    spectra = list(spectra)
+    if len(spectra) != len(sequences):
+        raise ValueError("{} spectra were given for {} candidates.".format(len(spectra), len(sequences)))
+    present = [n for n, p in enumerate(spectra) if p is not None]
+    # repeated peptides end up in the same chunk, so every worker parses a peptide string once
+    present.sort(key=lambda n: str(sequences[n]))
+    candidates = [(sequences[n], spectra[n]) for n in present]
+    chunks = [(candidates[i:i + chunk_size], options) for i in range(0, len(candidates), chunk_size)]
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            scores = [s for chunk in executor.map(_score_chunk, chunks) for s in chunk]
+    else:
+        scores = [s for chunk in chunks for s in _score_chunk(chunk)]
+    result = {"matched": np.zeros(len(sequences), dtype=np.int64), "ions": np.zeros(len(sequences), dtype=np.int64),
+              "matched_intensity": np.zeros(len(sequences)), "total_intensity": np.zeros(len(sequences))}
+    if scores:
+        scores = np.array(scores, dtype=float)
+        for n, field in enumerate(result_fields):
+            result[field][present] = scores[:, n]
+    return result
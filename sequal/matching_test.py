@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from sequal.matching import candidate_spectra, fragment_ladder, match_candidates, match_peaks, modification_mass, \
+    score_candidate
+from sequal.mass_spectrometry import fragment_non_labile
+from sequal.modification import Modification
+from sequal.sequence import Sequence
+from sequal.spectra import SpectrumIndex
+
+propiona = Modification("Propionamide", regex_pattern="C", mod_type="static", mass=71.03711)
+
+
+class MatchingCase(unittest.TestCase):
+    def test_ladder_matches_ions(self):
+        seq = Sequence("TECSNTT", mods={2: [propiona]})
+        expected = [[], []]
+        for b, y in fragment_non_labile(seq, "by"):
+            expected[0].append(b.mz_calculate(1))
+            expected[1].append(y.mz_calculate(1, with_water=True))
+        np.testing.assert_allclose(fragment_ladder(seq), expected[0] + expected[1][::-1])
+        self.assertEqual(len(fragment_ladder("TECSNTT", charges=(1, 2))), 24)
+        np.testing.assert_allclose(fragment_ladder("TEN[+203.079]ST")[2] - fragment_ladder("TENST")[2], 203.079)
+
+    def test_match_peaks(self):
+        mz = np.array([100.0, 200.0, 200.003, 300.0])
+        np.testing.assert_array_equal(match_peaks([200.002, 300.01, 50.0], mz, 20), [2, -1, -1])
+        np.testing.assert_array_equal(match_peaks([300.01], mz, 0.02, "da"), [3])
+
+    def test_candidates(self):
+        ladder = fragment_ladder("TEN[+203.079]ST")
+        spectrum = (np.concatenate([ladder[::-2], [1000.0]]), np.ones(len(ladder[::-2]) + 1))
+        matched, ions, matched_intensity, total = score_candidate("TEN[+203.079]ST", spectrum)
+        self.assertEqual((matched, ions, matched_intensity, total), (4, 8, 4.0, 5.0))
+        result = match_candidates(["TEN[+203.079]ST", "TENST", "TEN[+203.079]ST"], [spectrum, spectrum, None],
+                                  chunk_size=1)
+        np.testing.assert_array_equal(result["matched"], [4, 2, 0])
+        parallel = match_candidates(["TEN[+203.079]ST", "TENST", "TEN[+203.079]ST"], [spectrum, spectrum, None],
+                                    workers=2, chunk_size=1)
+        for field in result:
+            np.testing.assert_array_equal(result[field], parallel[field])
+        with self.assertRaises(ValueError):
+            match_candidates(["TENST"], [spectrum, spectrum])
+        with self.assertRaises(ValueError):
+            modification_mass(Modification(None))
+
+    def test_spectrum_index_candidates(self):
+        ladders = {scan: fragment_ladder(peptide)[::2] for scan, peptide in ((205, "TENST"), (101, "PEPTIDE"))}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spectra.mgf")
+            with open(path, "wt") as f:
+                for scan, mz in sorted(ladders.items()):
+                    f.write("BEGIN IONS\nSCANS={}\n".format(scan))
+                    f.writelines("{} 1\n".format(m) for m in sorted(mz))
+                    f.write("END IONS\n")
+            index = SpectrumIndex(path)
+            peptides = ["TENST", "PEPTIDE", "TENST", "TENST"]
+            scans = [205, 101, 205, 999]
+            result = match_candidates(peptides, candidate_spectra(scans, index.fetch(scans)))
+            streamed = match_candidates(peptides, (index.get(s) if s in index else None for s in scans))
+        np.testing.assert_array_equal(result["matched"], [4, 6, 4, 0])
+        for field in result:
+            np.testing.assert_array_equal(result[field], streamed[field])
+
+
+if __name__ == '__main__':
+    unittest.main()
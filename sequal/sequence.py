@@ -1,4 +1,8 @@
 import re
+import threading
+import warnings
+from collections import OrderedDict
+from collections.abc import Mapping
 from typing import Set, Any, List
 
 from sequal.amino_acid import AminoAcid
@@ -62,16 +66,10 @@ class Sequence:
         return self.seq_length
 
     def __repr__(self):
-        a = ""
-        for i in self.seq:
-            a += str(i)
-        return a
+        return "".join(str(i) for i in self.seq)
 
     def __str__(self):
-        a = ""
-        for i in self.seq:
-            a += str(i)
-        return a
+        return "".join(str(i) for i in self.seq)
 
     def sequence_parse(self, current_mod, current_position, mod_position, mods, seq):
         """
@@ -158,15 +156,21 @@ class Sequence:
                 block = ""
 
     def __iter__(self):
-        self.current_iter_count = 0
-        return self
+        return iter(self.seq)
 
     def __next__(self):
-        if self.current_iter_count == self.seq_length:
+        """
+        Deprecated, the sequence used to be its own iterator. Steps through the blocks from the start or from the
+        last next call, use iter(sequence) instead.
+        """
+        warnings.warn("Calling next on a Sequence is deprecated, use iter(sequence) instead.", DeprecationWarning,
+                      stacklevel=2)
+        count = getattr(self, "current_iter_count", 0)
+        if count >= self.seq_length:
+            self.current_iter_count = 0
             raise StopIteration
-        result = self.seq[self.current_iter_count]
-        self.current_iter_count += 1
-        return result
+        self.current_iter_count = count + 1
+        return self.seq[count]
 
     def add_modifications(self, mod_dict):
         for aa in self.seq:
@@ -179,10 +183,7 @@ class Sequence:
         Return string of the sequence without any modification annotation
         :return: str
         """
-        seq = ""
-        for i in self.seq:
-            seq += i.value
-        return seq
+        return "".join(i.value for i in self.seq)
 
     def to_string_customize(self, data, annotation_placement="right", block_separator="", annotation_enclose_characters=("[", "]"),
                             individual_annotation_enclose=False, individual_annotation_enclose_characters=("[", "]"),
@@ -250,6 +251,224 @@ class Sequence:
     def count(self, char, start, end):
         return self.to_stripped_string().count(char, start, end)
 
+
+class FrozenBlock:
+    """
+    Read only block of a FrozenSequence, mixed into the block class by freeze_block. Setting attributes or adding
+    modifications raises AttributeError and the modifications are kept as a tuple of frozen modifications.
+    """
+    thawed_type = None
+
+    def __setattr__(self, key, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("{} is immutable".format(type(self).__name__))
+        super().__setattr__(key, value)
+
+    def __delattr__(self, key):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("{} is immutable".format(type(self).__name__))
+        super().__delattr__(key)
+
+    def set_modification(self, i):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    def __reduce__(self):
+        return freeze_block, (thaw_block(self),)
+
+
+frozen_block_types = {}
+
+
+def freeze_block(block):
+    """
+    Read only copy of a block and its modifications.
+    """
+    if isinstance(block, FrozenBlock):
+        return block
+    block_type = type(block)
+    if block_type not in frozen_block_types:
+        frozen_block_types[block_type] = type("Frozen" + block_type.__name__, (FrozenBlock, block_type),
+                                              {"thawed_type": block_type})
+    frozen = object.__new__(frozen_block_types[block_type])
+    state = deepcopy({k: v for k, v in block.__dict__.items() if k != "mods"})
+    if "mods" in block.__dict__:
+        state["mods"] = tuple(freeze_block(m) for m in block.mods)
+    state["_frozen"] = True
+    frozen.__dict__.update(state)
+    return frozen
+
+
+def thaw_block(block):
+    """
+    Mutable copy of a block and its modifications.
+    """
+    if not isinstance(block, FrozenBlock):
+        return deepcopy(block)
+    thawed = object.__new__(block.thawed_type)
+    state = deepcopy({k: v for k, v in block.__dict__.items() if k not in ("mods", "_frozen")})
+    if "mods" in block.__dict__:
+        state["mods"] = [thaw_block(m) for m in block.mods]
+    thawed.__dict__.update(state)
+    return thawed
+
+
+class FrozenMods(Mapping):
+    """
+    Read only modification positions of a FrozenSequence, every value is a frozen modification or a tuple of them.
+    """
+    def __init__(self, mods):
+        self._mods = {}
+        for position, mod in mods.items():
+            if isinstance(mod, (list, tuple)):
+                self._mods[position] = tuple(freeze_block(m) for m in mod)
+            else:
+                self._mods[position] = freeze_block(mod)
+
+    def __getitem__(self, position):
+        return self._mods[position]
+
+    def __iter__(self):
+        return iter(self._mods)
+
+    def __len__(self):
+        return len(self._mods)
+
+    def __repr__(self):
+        return repr(self._mods)
+
+    def thaw(self):
+        """
+        Mutable dictionary copy with lists of mutable modifications.
+        """
+        return {position: [thaw_block(m) for m in mod] if isinstance(mod, tuple) else thaw_block(mod)
+                for position, mod in self._mods.items()}
+
+
+class FrozenSequence(Sequence):
+    """
+    Sequence that can no longer be changed once parsed. The stripped and annotated strings are computed once, the
+    hash and equality follow the annotated string so frozen sequences can be used as dictionary or cache keys, and
+    the blocks, their modifications and the modification positions are frozen as well so a frozen sequence can be
+    shared between threads.
+    """
+    def __init__(self, seq, encoder=AminoAcid, mods=None, parse=True, parser_ignore=None, mod_position="right"):
+        if isinstance(seq, Sequence):
+            for k, v in seq.__dict__.items():
+                if not k.startswith("_"):
+                    setattr(self, k, deepcopy(v))
+            if not hasattr(self, "mods"):
+                self.mods = {}
+        else:
+            super().__init__(seq, encoder, mods, parse, parser_ignore, mod_position)
+        self.seq = tuple(freeze_block(b) for b in self.seq)
+        self.mods = FrozenMods(self.mods)
+        self.parser_ignore = tuple(self.parser_ignore)
+        self.seq_length = len(self.seq)
+        self._stripped = super().to_stripped_string()
+        self._string = super().__str__()
+        self._hash = hash(self._string)
+        self._frozen = True
+
+    def __setattr__(self, key, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("FrozenSequence is immutable")
+        super().__setattr__(key, value)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return list(self.seq[key])
+        return self.seq[key]
+
+    def __repr__(self):
+        return self._string
+
+    def __str__(self):
+        return self._string
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenSequence):
+            return self._string == other._string
+        return NotImplemented
+
+    def to_stripped_string(self):
+        return self._stripped
+
+    def count(self, char, start, end):
+        return self._stripped.count(char, start, end)
+
+    def add_modifications(self, mod_dict):
+        raise AttributeError("FrozenSequence is immutable")
+
+    def __next__(self):
+        raise TypeError("FrozenSequence is shared and cannot be its own iterator, use iter(sequence) instead.")
+
+    def thaw(self):
+        """
+        Mutable Sequence copy of the frozen sequence.
+        """
+        seq = Sequence("", encoder=self.encoder, mods=self.mods.thaw(), parse=False,
+                       parser_ignore=list(self.parser_ignore))
+        seq.seq = [thaw_block(b) for b in self.seq]
+        seq.seq_length = self.seq_length
+        return seq
+
+
+class ParseCache:
+    """
+    Least recently used cache of FrozenSequence parses keyed on the sequence string, modification position and
+    encoder. Repeated peptide strings share one parse. Safe to use from several threads.
+    """
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._parses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, seq, mod_position="right", encoder=AminoAcid):
+        key = (seq, mod_position, encoder)
+        with self._lock:
+            parsed = self._parses.get(key)
+            if parsed is not None:
+                self._parses.move_to_end(key)
+                self.hits += 1
+                return parsed
+            self.misses += 1
+        parsed = FrozenSequence(seq, encoder=encoder, mod_position=mod_position)
+        with self._lock:
+            self._parses[key] = parsed
+            self._parses.move_to_end(key)
+            while len(self._parses) > self.maxsize:
+                self._parses.popitem(last=False)
+        return parsed
+
+    def stats(self):
+        """
+        Hit and miss counts, current size and maximum size of the cache.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._parses), "maxsize": self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._parses.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+parse_cache = ParseCache()
+
+
+def parse_sequence(seq, mod_position="right", encoder=AminoAcid):
+    """
+    Parse a sequence string through the module parse cache, the returned FrozenSequence is shared between callers.
+    """
+    return parse_cache.get(seq, mod_position, encoder)
+
+
 def count_unique_elements(seq):
     elements = {}
     for i in seq:
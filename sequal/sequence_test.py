@@ -1,7 +1,9 @@
+import pickle
 import unittest
 
+from sequal.amino_acid import AminoAcid
 from sequal.modification import Modification
-from sequal.sequence import Sequence, ModdedSequenceGenerator
+from sequal.sequence import Sequence, FrozenSequence, ModdedSequenceGenerator, ParseCache, parse_sequence
 
 nsequon = Modification("HexNAc",regex_pattern="N[^P][S|T]", mod_type="variable", labile=True)
 osequon = Modification("Mannose",regex_pattern="[S|T]", mod_type="variable", labile=True)
@@ -43,6 +45,74 @@ class TestAASequence(unittest.TestCase):
         print(seq.to_string_customize(a, individual_annotation_enclose=False, individual_annotation_separator="."))
 
 
+class TestSequenceIteration(unittest.TestCase):
+    def test_deprecated_next(self):
+        seq = Sequence("TEN")
+        with self.assertWarns(DeprecationWarning):
+            self.assertEqual([str(next(seq)) for _ in range(3)], ["T", "E", "N"])
+        with self.assertWarns(DeprecationWarning), self.assertRaises(StopIteration):
+            next(seq)
+        self.assertEqual([str(aa) for aa in seq], ["T", "E", "N"])
+        with self.assertRaises(TypeError):
+            next(FrozenSequence("TEN"))
+
+
+class TestFrozenSequence(unittest.TestCase):
+    def test_frozen_sequence(self):
+        seq = FrozenSequence("TEN[HexNAc]ST")
+        self.assertEqual(str(seq), "TEN[HexNAc]ST")
+        self.assertEqual(seq.to_stripped_string(), "TENST")
+        self.assertEqual(seq, FrozenSequence(Sequence("TEN[HexNAc]ST")))
+        self.assertEqual({seq: 1}[FrozenSequence("TEN[HexNAc]ST")], 1)
+        self.assertNotEqual(seq, FrozenSequence("TENST"))
+        self.assertEqual(len([(a, b) for a in seq for b in seq]), 25)
+        with self.assertRaises(AttributeError):
+            seq.seq = []
+        thawed = seq.thaw()
+        thawed[0].set_modification(propiona)
+        self.assertEqual(str(seq), "TEN[HexNAc]ST")
+
+    def test_frozen_mods(self):
+        seq = FrozenSequence("TENST", mods={2: Modification("HexNAc"), 3: [osequon]})
+        self.assertEqual(str(seq), "TEN[HexNAc]S[Mannose]T")
+        with self.assertRaises(TypeError):
+            seq.mods[0] = propiona
+        with self.assertRaises(AttributeError):
+            seq.mods[2].value = "Hex"
+        self.assertIsInstance(seq.mods[3], tuple)
+        self.assertEqual(str(pickle.loads(pickle.dumps(seq))), "TEN[HexNAc]S[Mannose]T")
+        thawed = seq.thaw()
+        thawed.mods[0] = propiona
+        thawed.mods[3].append(propiona)
+        self.assertEqual(len(seq.mods), 2)
+        self.assertEqual(len(seq.mods[3]), 1)
+
+
+class TestParseCache(unittest.TestCase):
+    def test_parse_cache(self):
+        cache = ParseCache(maxsize=2)
+        seq = cache.get("TEN[HexNAc]ST")
+        self.assertIs(cache.get("TEN[HexNAc]ST"), seq)
+        self.assertIsNot(cache.get("TE[HexNAc]NST", mod_position="left"), cache.get("TE[HexNAc]NST"))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 3, "size": 2, "maxsize": 2})
+        self.assertIsNot(cache.get("TEN[HexNAc]ST"), seq)
+
+    def test_shared_blocks_are_read_only(self):
+        seq = parse_sequence("TEN[HexNAc]ST")
+        for block in (seq[2], next(iter(seq)), seq[1:3][1], seq[2].mods[0]):
+            with self.assertRaises(AttributeError):
+                block.value = "X"
+        with self.assertRaises(AttributeError):
+            seq[2].set_modification(propiona)
+        with self.assertRaises(AttributeError):
+            seq[2].mods.append(propiona)
+        reparsed = parse_sequence("TEN[HexNAc]ST")
+        self.assertEqual(str(reparsed), "TEN[HexNAc]ST")
+        self.assertEqual([str(m) for m in reparsed[2].mods], ["HexNAc"])
+        self.assertIsInstance(reparsed[2], AminoAcid)
+        self.assertEqual(str(pickle.loads(pickle.dumps(reparsed))), "TEN[HexNAc]ST")
+
+
 class TestModdedSequence(unittest.TestCase):
     def test_variable_mod_generator(self):
         seq = "TESNSTT"
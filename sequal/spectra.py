@@ -0,0 +1,310 @@
+import base64
+import os
+import re
+import zlib
+from xml.etree import ElementTree
+
+import numpy as np
+
+scan_regex = re.compile(r"scan=(\d+)")
+comment_scan_regex = re.compile(r"\.(\d+)\.\d+\.\d+$")
+spectrum_start = b"<spectrum "
+spectrum_end = b"</spectrum>"
+mgf_start = b"BEGIN IONS"
+mgf_end = b"END IONS"
+spectrum_formats = {".mgf": "mgf", ".mzml": "mzml"}
+
+# mzML controlled vocabulary accessions
+mz_array = "MS:1000514"
+intensity_array = "MS:1000515"
+float_32 = "MS:1000521"
+float_64 = "MS:1000523"
+zlib_compression = "MS:1000574"
+ms_level = "MS:1000511"
+selected_ion_mz = "MS:1000744"
+charge_state = "MS:1000041"
+scan_start_time = "MS:1000016"
+minute_unit = "UO:0000031"
+
+
+class Spectrum:
+    def __init__(self, scan, mz, intensity, precursor_mz=None, charge=None, rt=None, title=None, ms_level=None):
+        """
+        :param scan: scan number, None when the spectrum does not carry one
+        :param mz: peak m/z values
+        :type mz: numpy.ndarray
+        :param intensity: peak intensities in the order of mz
+        :type intensity: numpy.ndarray
+        :param rt: retention time in seconds
+        """
+        self.scan = scan
+        self.mz = mz
+        self.intensity = intensity
+        self.precursor_mz = precursor_mz
+        self.charge = charge
+        self.rt = rt
+        self.title = title
+        self.ms_level = ms_level
+
+    def __len__(self):
+        return len(self.mz)
+
+    def __repr__(self):
+        return "Spectrum(scan={}, peaks={}, precursor_mz={})".format(self.scan, len(self.mz), self.precursor_mz)
+
+
+def detect_spectrum_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in spectrum_formats:
+        raise ValueError("Spectrum file {} is not mgf or mzML.".format(filename))
+    return spectrum_formats[extension]
+
+
+def _mgf_scan(headers):
+    if "SCANS" in headers:
+        return int(headers["SCANS"].split("-")[0].split(",")[0])
+    title = headers.get("TITLE", "")
+    search = scan_regex.search(title) or comment_scan_regex.search(title.split(" ")[0])
+    if search:
+        return int(search.group(1))
+    return None
+
+
+def _mgf_spectrum(headers, peaks):
+    peaks = np.array(peaks, dtype=float).reshape(-1, 2)
+    precursor_mz = None
+    if "PEPMASS" in headers:
+        precursor_mz = float(headers["PEPMASS"].split()[0])
+    charge = None
+    if "CHARGE" in headers:
+        charge = int(headers["CHARGE"].split(",")[0].strip().rstrip("+-"))
+    rt = None
+    if "RTINSECONDS" in headers:
+        rt = float(headers["RTINSECONDS"])
+    return Spectrum(_mgf_scan(headers), peaks[:, 0], peaks[:, 1], precursor_mz, charge, rt, headers.get("TITLE"), 2)
+
+
+def _parse_mgf(lines):
+    """
+    Spectra of the MGF lines, one at a time.
+    """
+    headers = None
+    peaks = []
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in "#;!/":
+            continue
+        if line == "BEGIN IONS":
+            headers = {}
+            peaks = []
+        elif line == "END IONS":
+            if headers is not None:
+                yield _mgf_spectrum(headers, peaks)
+            headers = None
+        elif headers is not None:
+            if line[0].isdigit():
+                peaks.extend(line.split()[:2])
+            elif "=" in line:
+                key, value = line.split("=", 1)
+                headers[key.upper()] = value
+
+
+def read_mgf(filename):
+    """
+    Stream the spectra of an MGF file, only the spectrum being read is held in memory.
+    """
+    with open(filename, "rt") as f:
+        yield from _parse_mgf(f)
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _cv_params(element):
+    return {p.get("accession"): p for p in element if _local(p.tag) == "cvParam"}
+
+
+def _decode_array(binary_data_array):
+    params = {}
+    text = ""
+    for child in binary_data_array:
+        tag = _local(child.tag)
+        if tag == "cvParam":
+            params[child.get("accession")] = child
+        elif tag == "binary":
+            text = child.text or ""
+    data = base64.b64decode(text)
+    if zlib_compression in params:
+        data = zlib.decompress(data)
+    dtype = np.float32 if float_32 in params else np.float64
+    array = np.frombuffer(data, dtype=dtype).astype(float)
+    if mz_array in params:
+        return "mz", array
+    if intensity_array in params:
+        return "intensity", array
+    return None, array
+
+
+def _mzml_spectrum(element):
+    arrays = {}
+    precursor_mz = None
+    charge = None
+    rt = None
+    for child in element.iter():
+        tag = _local(child.tag)
+        if tag == "binaryDataArray":
+            name, array = _decode_array(child)
+            if name:
+                arrays[name] = array
+        elif tag == "selectedIon":
+            params = _cv_params(child)
+            if selected_ion_mz in params:
+                precursor_mz = float(params[selected_ion_mz].get("value"))
+            if charge_state in params:
+                charge = int(params[charge_state].get("value"))
+        elif tag == "scan":
+            params = _cv_params(child)
+            if scan_start_time in params:
+                rt = float(params[scan_start_time].get("value"))
+                if params[scan_start_time].get("unitAccession") == minute_unit:
+                    rt *= 60
+    level = _cv_params(element).get(ms_level)
+    search = scan_regex.search(element.get("id", ""))
+    return Spectrum(int(search.group(1)) if search else None, arrays.get("mz", np.array([])),
+                    arrays.get("intensity", np.array([])), precursor_mz, charge, rt, element.get("id"),
+                    int(level.get("value")) if level is not None else None)
+
+
+def read_mzml(filename):
+    """
+    Stream the spectra of a plain or indexed mzML file, every spectrum element is removed from the tree once read.
+    """
+    parents = []
+    for event, element in ElementTree.iterparse(filename, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        tag = _local(element.tag)
+        if tag in ("spectrum", "chromatogram"):
+            if tag == "spectrum":
+                yield _mzml_spectrum(element)
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+
+
+def read_spectrum_file(filename, format=None):
+    """
+    Stream the spectra of an MGF or mzML file.
+    :param format: mgf or mzml, from the file extension when not given
+    """
+    if format is None:
+        format = detect_spectrum_format(filename)
+    if format == "mgf":
+        return read_mgf(filename)
+    return read_mzml(filename)
+
+
+class SpectrumIndex:
+    """
+    Byte offsets of the spectra of an MGF or mzML file by scan number, built with one pass over the file, so single
+    spectra can be read by seeking instead of parsing the whole file.
+    """
+    def __init__(self, filename, format=None):
+        if format is None:
+            format = detect_spectrum_format(filename)
+        self.filename = filename
+        self.format = format
+        self.offsets = {}
+        if format == "mgf":
+            self._index_mgf()
+        else:
+            self._index_mzml()
+
+    def _index_mgf(self):
+        with open(self.filename, "rb") as f:
+            offset = f.tell()
+            line = f.readline()
+            start = None
+            headers = {}
+            while line:
+                stripped = line.strip()
+                if stripped == mgf_start:
+                    start = offset
+                    headers = {}
+                elif stripped == mgf_end:
+                    scan = _mgf_scan(headers)
+                    if start is not None and scan is not None:
+                        self.offsets.setdefault(scan, start)
+                    start = None
+                elif start is not None and b"=" in stripped and not stripped[:1].isdigit():
+                    key, value = stripped.decode().split("=", 1)
+                    if key.upper() in ("SCANS", "TITLE"):
+                        headers[key.upper()] = value
+                offset = f.tell()
+                line = f.readline()
+
+    def _index_mzml(self):
+        with open(self.filename, "rb") as f:
+            offset = f.tell()
+            line = f.readline()
+            while line:
+                position = line.find(spectrum_start)
+                while position >= 0:
+                    tag_end = line.find(b">", position)
+                    search = scan_regex.search(line[position:tag_end if tag_end >= 0 else None].decode(errors="ignore"))
+                    if search:
+                        self.offsets.setdefault(int(search.group(1)), offset + position)
+                    position = line.find(spectrum_start, position + 1)
+                offset = f.tell()
+                line = f.readline()
+
+    def __contains__(self, scan):
+        return int(scan) in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _read(self, f, scan):
+        f.seek(self.offsets[int(scan)])
+        lines = []
+        end = mgf_end if self.format == "mgf" else spectrum_end
+        for line in f:
+            if self.format == "mzml" and end in line:
+                lines.append(line[:line.index(end) + len(end)])
+                break
+            lines.append(line)
+            if self.format == "mgf" and line.strip() == end:
+                break
+        text = b"".join(lines).decode()
+        if self.format == "mgf":
+            return next(_parse_mgf(text.splitlines()))
+        return _mzml_spectrum(ElementTree.fromstring(text))
+
+    def get(self, scan):
+        """
+        Spectrum of a scan number, KeyError when the file has no such scan.
+        """
+        with open(self.filename, "rb") as f:
+            return self._read(f, scan)
+
+    def fetch(self, scans, missing="skip"):
+        """
+        Stream the spectra of the scan numbers, e.g. the Scan number column of a GlypnirOComponent, in file order with
+        the file opened once.
+        :param missing: skip leaves out scans not in the file, raise raises KeyError for them
+        """
+        wanted = []
+        for scan in scans:
+            if scan is None or (isinstance(scan, float) and np.isnan(scan)):
+                continue
+            if int(scan) in self.offsets:
+                wanted.append(int(scan))
+            elif missing == "raise":
+                raise KeyError(scan)
+        wanted = sorted(set(wanted), key=self.offsets.get)
+        with open(self.filename, "rb") as f:
+            for scan in wanted:
+                yield self._read(f, scan)
@@ -0,0 +1,99 @@
+import base64
+import os
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+
+from sequal.spectra import SpectrumIndex, read_spectrum_file
+
+mgf = """BEGIN IONS
+TITLE=sample.101.101.2
+PEPMASS=500.25 1000
+CHARGE=2+
+RTINSECONDS=60.5
+100.1 10
+200.2 20
+END IONS
+
+BEGIN IONS
+TITLE=controllerType=0 controllerNumber=1 scan=205
+PEPMASS=600.3
+CHARGE=3+
+150.5 5
+END IONS
+"""
+
+
+def binary_array(values, accession, dtype, compress):
+    data = np.asarray(values, dtype=dtype).tobytes()
+    params = '<cvParam cvRef="MS" accession="{}" name="{}-bit float"/>'.format(
+        "MS:1000521" if dtype == np.float32 else "MS:1000523", 32 if dtype == np.float32 else 64)
+    if compress:
+        data = zlib.compress(data)
+        params += '<cvParam cvRef="MS" accession="MS:1000574" name="zlib compression"/>'
+    return ('<binaryDataArray encodedLength="0">{}<cvParam cvRef="MS" accession="{}" name="array"/>'
+            '<binary>{}</binary></binaryDataArray>').format(params, accession, base64.b64encode(data).decode())
+
+
+def mzml_spectrum(scan, mz, intensity, compress):
+    return ('<spectrum index="0" id="controllerType=0 controllerNumber=1 scan={}" defaultArrayLength="{}">\n'
+            '<cvParam cvRef="MS" accession="MS:1000511" name="ms level" value="2"/>\n'
+            '<scanList count="1"><scan><cvParam cvRef="MS" accession="MS:1000016" name="scan start time" '
+            'value="1.5" unitCvRef="UO" unitAccession="UO:0000031" unitName="minute"/></scan></scanList>\n'
+            '<precursorList count="1"><precursor><selectedIonList count="1"><selectedIon>'
+            '<cvParam cvRef="MS" accession="MS:1000744" name="selected ion m/z" value="700.5"/>'
+            '<cvParam cvRef="MS" accession="MS:1000041" name="charge state" value="2"/>'
+            '</selectedIon></selectedIonList></precursor></precursorList>\n'
+            '<binaryDataArrayList count="2">{}{}</binaryDataArrayList>\n</spectrum>\n').format(
+        scan, len(mz), binary_array(mz, "MS:1000514", np.float64, compress),
+        binary_array(intensity, "MS:1000515", np.float32, compress))
+
+
+mzml = ('<?xml version="1.0" encoding="utf-8"?>\n<mzML xmlns="http://psi.hupo.org/ms/mzml" version="1.1.0">\n'
+        '<run id="run"><spectrumList count="2">\n{}{}</spectrumList></run>\n</mzML>\n').format(
+    mzml_spectrum(7, [110.5, 220.25, 330.125], [1, 2, 3], False), mzml_spectrum(9, [120.0], [4], True))
+
+
+class SpectraCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.mgf = os.path.join(self.directory.name, "sample.mgf")
+        self.mzml = os.path.join(self.directory.name, "sample.mzML")
+        with open(self.mgf, "wt") as f:
+            f.write(mgf)
+        with open(self.mzml, "wt") as f:
+            f.write(mzml)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_mgf(self):
+        spectra = list(read_spectrum_file(self.mgf))
+        self.assertEqual([s.scan for s in spectra], [101, 205])
+        np.testing.assert_array_equal(spectra[0].mz, [100.1, 200.2])
+        np.testing.assert_array_equal(spectra[0].intensity, [10, 20])
+        self.assertEqual((spectra[0].precursor_mz, spectra[0].charge, spectra[0].rt), (500.25, 2, 60.5))
+
+    def test_read_mzml(self):
+        spectra = list(read_spectrum_file(self.mzml))
+        self.assertEqual([s.scan for s in spectra], [7, 9])
+        np.testing.assert_array_equal(spectra[0].mz, [110.5, 220.25, 330.125])
+        np.testing.assert_array_equal(spectra[1].intensity, [4])
+        self.assertEqual((spectra[0].precursor_mz, spectra[0].charge, spectra[0].rt, spectra[0].ms_level),
+                         (700.5, 2, 90.0, 2))
+
+    def test_index(self):
+        for path, scans in ((self.mgf, [205, 101]), (self.mzml, [9, 7])):
+            index = SpectrumIndex(path)
+            self.assertEqual(len(index), 2)
+            self.assertEqual(index.get(scans[0]).scan, scans[0])
+            fetched = list(index.fetch(scans + [float(scans[0]), np.nan, 1000]))
+            self.assertEqual([s.scan for s in fetched], scans[::-1])
+            with self.assertRaises(KeyError):
+                list(index.fetch([1000], missing="raise"))
+
+
+if __name__ == '__main__':
+    unittest.main()